@@ -0,0 +1,78 @@
+# benchmarks/bench_display_analysis.py
+"""
+Script run time and payload of display_analysis for a large analysis, using
+Streamlit's AppTest harness (no browser or server needed).
+
+Payload is the serialized size of every element the run sends, which is
+what goes over the websocket on each full rerun.
+
+Run from the repository root:
+    python -m benchmarks.bench_display_analysis
+    python -m benchmarks.bench_display_analysis --components 30 --runs 5
+"""
+import argparse
+import statistics
+import time
+
+from streamlit.testing.v1 import AppTest
+
+
+def app(component_count: int):
+    import sys
+    sys.path.insert(0, '.')
+    import streamlit_app
+    from utils.models import Analysis
+
+    component = {
+        "name": "Service",
+        "purpose": "Handles one slice of the request path with retries and idempotency keys",
+        "steps": [
+            {"step": str(i), "action": f"Action {i}", "details": ["Detail with configuration", "Another detail"]}
+            for i in range(1, 5)
+        ],
+        "technologies": [
+            {"name": f"Tech {i}", "purpose": "Does the work", "configuration": "replicas=3, timeout=2s"}
+            for i in range(3)
+        ],
+        "data_flow": {"input": "Request", "process": "Validate and persist", "output": "Event"},
+    }
+    analysis = Analysis.from_dict({
+        "overview": "Benchmark analysis",
+        "components": [dict(component, name=f"Service {n}") for n in range(component_count)],
+        "flow_steps": [],
+        "diagram": "graph TD\n    A[Client] --> B[Service 0]",
+    })
+    streamlit_app.display_analysis(analysis)
+
+
+def elements(node):
+    """Every element and container under node"""
+    yield node
+    for child in getattr(node, 'children', {}).values():
+        yield from elements(child)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--components", type=int, default=30)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    at = AppTest.from_function(app, args=(args.components,), default_timeout=60)
+    at.secrets['GROQ_API_KEY'] = 'bench'
+    times = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        at.run()
+        times.append((time.perf_counter() - start) * 1000)
+        if at.exception:
+            raise SystemExit(at.exception[0].message)
+
+    nodes = [node for node in elements(at._tree) if getattr(node, 'proto', None) is not None]
+    payload = sum(node.proto.ByteSize() for node in nodes)
+    print(f"{args.components} components: {len(nodes)} elements and containers, {payload / 1024:.1f} KiB per run")
+    print(f"run median {statistics.median(times):.1f} ms (first {times[0]:.1f} ms, min {min(times):.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
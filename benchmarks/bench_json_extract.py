@@ -0,0 +1,89 @@
+# benchmarks/bench_json_extract.py
+"""
+Micro-benchmark for utils.json_extract against the previous regex chain.
+
+"repaired" has one broken region, the backtick diagram, as most model
+output does; "scattered" also has a trailing comma and a stray quote in
+every component, which defeats the copy-valid-subtrees fast path. The
+legacy chain cannot parse "scattered" at all.
+
+Run from the repository root:
+    python -m benchmarks.bench_json_extract
+"""
+import json
+import re
+import timeit
+
+from utils.json_extract import extract_json, repair_json
+
+SIZES = [10 * 1024, 100 * 1024, 1024 * 1024]
+
+
+def make_response(target_size):
+    """Build a fenced LLM-style response with a backtick diagram of roughly target_size bytes"""
+    component = {
+        "name": "API Gateway",
+        "purpose": "Routes and throttles incoming requests",
+        "steps": [{"step": "1", "action": "Validate token", "details": ["JWT with RS256", "Redis cache with 1 hour TTL"]}],
+        "technologies": [{"name": "Kong 3.4", "purpose": "Gateway", "configuration": "rate-limit 100 rps"}],
+        "data_flow": {"input": "HTTPS request", "process": "Auth and routing", "output": "Upstream call"},
+    }
+    edge = "    N{i}[Service {i}] -->|Call| N{j}[Service {j}]\n"
+
+    components = []
+    diagram_lines = ["graph TD\n"]
+    size = 0
+    i = 0
+    while size < target_size:
+        components.append(component)
+        diagram_lines.append(edge.format(i=i, j=i + 1))
+        size += len(json.dumps(component, indent=2)) + len(diagram_lines[-1])
+        i += 1
+
+    body = json.dumps({"overview": "Synthetic system", "components": components}, indent=2)
+    # Splice in the diagram as a backtick string the way models often emit it
+    body = body[:-2] + ',\n  "diagram": `' + ''.join(diagram_lines) + '`\n}'
+    return "Here is the design:\n```json\n" + body + "\n```\n"
+
+
+def scatter_errors(response_text):
+    """Every component gets a trailing comma and an unescaped quote"""
+    return (response_text
+            .replace('"output": "Upstream call"\n', '"output": "Upstream call",\n')
+            .replace('Routes and throttles', 'Routes "and" throttles'))
+
+
+def legacy_parse(response_text):
+    """The regex chain previously used by AIProcessor._parse_response"""
+    cleaned_text = re.sub(r'```(?:json|mermaid)?\s*|\s*```', '', response_text)
+    cleaned_text = re.sub(r':\s*`\s*(graph TD[\s\S]*?)`\s*([,}])', r': "\1"\2', cleaned_text)
+    json_str = cleaned_text[cleaned_text.find("{"):cleaned_text.rfind("}") + 1]
+    json_str = re.sub(r'\s+', ' ', json_str)
+    json_str = json_str.replace('\\"', '"')
+    json_str = json_str.replace('""', '"')
+    return json.loads(json_str)
+
+
+def bench(func, text, number):
+    return min(timeit.repeat(lambda: func(text), number=number, repeat=3)) / number
+
+
+def main():
+    print(f"{'size':>10} {'clean':>10} {'repaired':>10} {'scattered':>10} {'legacy':>10}  diagram newlines")
+    for size in SIZES:
+        text = make_response(size)
+        clean = json.dumps(json.loads(repair_json(text)))
+        number = max(1, (200 * 1024) // size)
+        clean_time = bench(extract_json, clean, number)
+        repaired_time = bench(extract_json, text, number)
+        scattered_time = bench(extract_json, scatter_errors(text), number)
+        legacy_time = bench(legacy_parse, text, number)
+        expected = text.count('-->') + 1
+        kept = extract_json(text)['diagram'].count('\n')
+        lost = legacy_parse(text)['diagram'].count('\n')
+        print(f"{len(text) // 1024:>8}KB {clean_time * 1000:>8.2f}ms {repaired_time * 1000:>8.2f}ms "
+              f"{scattered_time * 1000:>8.2f}ms {legacy_time * 1000:>8.2f}ms  {kept}/{expected} kept (legacy: {lost})")
+
+
+if __name__ == "__main__":
+    main()
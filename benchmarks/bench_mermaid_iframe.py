@@ -0,0 +1,140 @@
+# benchmarks/bench_mermaid_iframe.py
+"""
+Compares the Mermaid iframe with the vendored bundle inlined into every
+page, as the browser renderer first shipped, against the page the app
+builds now, which references the bundle under app/static/.
+
+Always reports what each render sends to the browser: the srcdoc is part
+of the element and is re-sent on every rerun and fragment interaction.
+With playwright installed it also times each page in headless Chromium
+until the diagram's <svg> is on the page. The static page is served by a
+local HTTP server that, like Streamlit's, sends Last-Modified and ETag; the
+first run uses a fresh browser context (cold cache) and the rest reuse it.
+
+Run from the repository root after python -m scripts.vendor_mermaid:
+    python -m benchmarks.bench_mermaid_iframe
+    python -m benchmarks.bench_mermaid_iframe --browser-runs 5
+"""
+import argparse
+import functools
+import http.server
+import re
+import statistics
+import threading
+import time
+
+from utils.mermaid_assets import (STATIC_ROOT, MermaidAssetError, load_mermaid_bundle,
+                                  mermaid_iframe_html, mermaid_script_tag)
+
+DIAGRAM = """graph TD
+    Client[Client] -->|HTTPS| AG[API Gateway]
+    AG -->|Auth| Auth[Auth Service]
+    AG -->|Route| Orders[Order Service]
+    Orders -->|Write| DB[(Orders DB)]
+    Orders -->|Publish| Bus[[Event Bus]]
+    Bus -->|Consume| Billing[Billing Service]
+    Bus -->|Consume| Notify[Notification Service]
+    Billing -->|Write| Ledger[(Ledger DB)]"""
+
+_CLOSING_SCRIPT = re.compile(r'</(script)', re.IGNORECASE)
+
+
+def inline_script_tag(bundle: bytes) -> str:
+    source = _CLOSING_SCRIPT.sub(r'<\\/\1', bundle.decode("utf-8"))
+    return f"<script>{source}</script>"
+
+
+class AppHandler(http.server.SimpleHTTPRequestHandler):
+    """/ is the page under test and /app/static/ maps to STATIC_ROOT, as in the app"""
+
+    page = ""
+
+    def do_GET(self):
+        if self.path == "/":
+            body = self.page.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if not self.path.startswith("/app/static/"):
+            self.send_error(404)
+            return
+        self.path = self.path[len("/app/static"):]
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+def browser_times(html, runs, served):
+    """Milliseconds from navigation until mermaid has drawn the <svg>"""
+    from playwright.sync_api import sync_playwright
+
+    server = None
+    if served:
+        AppHandler.page = html
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(AppHandler, directory=STATIC_ROOT))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    times = []
+    try:
+        with sync_playwright() as p:
+            browser = p.chromium.launch()
+            context = browser.new_context()
+            for _ in range(runs):
+                page = context.new_page()
+                start = time.perf_counter()
+                if served:
+                    page.goto(url, wait_until="commit")
+                else:
+                    page.set_content(html, wait_until="commit")
+                page.wait_for_selector(".mermaid svg", timeout=30000)
+                times.append((time.perf_counter() - start) * 1000)
+                page.close()
+            browser.close()
+    finally:
+        if server is not None:
+            server.shutdown()
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--browser-runs", type=int, default=3)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        bundle, _ = load_mermaid_bundle()
+    except MermaidAssetError as e:
+        raise SystemExit(str(e))
+    load_ms = (time.perf_counter() - start) * 1000
+    print(f"bundle read and verified in {load_ms:.1f} ms ({len(bundle) / 1024:.0f} KiB); the app does this once per process")
+
+    pages = {
+        "inline": mermaid_iframe_html(DIAGRAM, inline_script_tag(bundle)),
+        "static": mermaid_iframe_html(DIAGRAM, mermaid_script_tag()),
+    }
+    for name, html in pages.items():
+        print(f"{name:<8} srcdoc per render {len(html.encode('utf-8')) / 1024:8.1f} KiB")
+
+    try:
+        import playwright  # noqa: F401
+    except ImportError:
+        print("playwright is not installed; skipping browser render times")
+        return
+    for name, html in pages.items():
+        try:
+            times = browser_times(html, args.browser_runs, served=name == "static")
+        except Exception as e:
+            print(f"{name:<8} render failed: {e}")
+            continue
+        warm = times[1:] or times
+        print(f"{name:<8} render first {times[0]:8.1f} ms   later median {statistics.median(warm):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# scripts/stub_groq_server.py
+"""
+Minimal OpenAI-compatible chat completions server for exercising the app and
+the batch CLI offline. Every completion returns a small canned analysis.
+
+Usage:
+    python scripts/stub_groq_server.py --port 8000 --delay 0.5
+    python -m utils.batch requirements.jsonl --api-key stub --base-url http://127.0.0.1:8000
+"""
+import argparse
+import json
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_ANALYSIS = {
+    "overview": "Stub analysis returned by the local test server",
+    "components": [
+        {
+            "name": "API Gateway",
+            "purpose": "Entry point that authenticates and routes requests",
+            "steps": [{"step": "1", "action": "Validate request", "details": ["JWT validation", "Rate limiting"]}],
+            "technologies": [{"name": "Amazon API Gateway", "purpose": "Managed routing", "configuration": "100 rps burst"}],
+            "data_flow": {"input": "HTTPS request", "process": "Auth and routing", "output": "Backend call"},
+        },
+        {
+            "name": "Storage Service",
+            "purpose": "Persists records",
+            "steps": [{"step": "1", "action": "Write record", "details": ["Conditional put"]}],
+            "technologies": [{"name": "DynamoDB", "purpose": "Key-value storage", "configuration": "On-demand capacity"}],
+            "data_flow": {"input": "Validated record", "process": "Persist", "output": "Record id"},
+        },
+    ],
+    "flow_steps": [],
+    "diagram": "graph TD\n    Client[Client] -->|Request| AG[API Gateway]\n    AG -->|Write| DB[(DynamoDB)]",
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    delay = 0.0
+    truncate = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self._send_json({"object": "list", "data": [{"id": "stub-model", "object": "model"}]})
+        else:
+            self._send_json({"error": {"message": "not found"}}, status=404)
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json({"error": {"message": "not found"}}, status=404)
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        time.sleep(self.delay)
+
+        content = json.dumps(CANNED_ANALYSIS, indent=2)
+        finish_reason = "stop"
+
+        # Continue from an assistant prefix the way a real model would
+        messages = request.get("messages", [])
+        if messages and messages[-1].get("role") == "assistant":
+            prefix = messages[-1].get("content", "")
+            if content.startswith(prefix):
+                content = content[len(prefix):]
+        if self.truncate and len(content) > self.truncate:
+            content = content[:self.truncate]
+            finish_reason = "length"
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = request.get("model", "stub-model")
+        usage = {"prompt_tokens": 1000, "completion_tokens": len(content) // 4,
+                 "total_tokens": 1000 + len(content) // 4}
+
+        if request.get("stream"):
+            self._stream(completion_id, model, content, usage, finish_reason)
+            return
+
+        self._send_json({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": finish_reason,
+            }],
+            "usage": usage,
+        })
+
+    def _stream(self, completion_id, model, content, usage, finish_reason):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+
+        def send(delta, finish_reason=None, extra=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            chunk.update(extra or {})
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        for i in range(0, len(content), 64):
+            send({"content": content[i:i + 64]})
+        send({}, finish_reason=finish_reason, extra={"x_groq": {"usage": usage}})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub for the Groq chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds to wait before each completion")
+    parser.add_argument("--truncate", type=int, default=0,
+                        help="cut each completion after this many characters with finish_reason=length")
+    args = parser.parse_args()
+
+    StubHandler.delay = args.delay
+    StubHandler.truncate = args.truncate
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"Stub server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# scripts/vendor_mermaid.py
+"""
+Fetch a mermaid release from the npm registry into static/vendor/mermaid/.
+
+The tarball is checked against the sha512 integrity the registry publishes
+for it, then dist/mermaid.min.js is written next to a manifest.json holding
+its sha384 SRI hash. utils.mermaid_assets refuses to serve a bundle that no
+longer matches that hash.
+
+Usage:
+    python -m scripts.vendor_mermaid
+    python -m scripts.vendor_mermaid --version 9.3.0 --registry https://registry.npmjs.org
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tarfile
+import time
+import urllib.request
+
+from utils.mermaid_assets import (BUNDLE_NAME, MANIFEST_NAME, MERMAID_VERSION, VENDOR_ROOT, sri_hash,
+                                  verify_integrity)
+
+TARBALL_MEMBER = f"package/dist/{BUNDLE_NAME}"
+
+
+def fetch(url: str, timeout: float) -> bytes:
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return response.read()
+
+
+def vendor(version: str, registry: str, output: str, timeout: float = 60.0) -> dict:
+    metadata = json.loads(fetch(f"{registry.rstrip('/')}/mermaid/{version}", timeout))
+    dist = metadata["dist"]
+    tarball = fetch(dist["tarball"], timeout)
+    if not verify_integrity(tarball, dist["integrity"]):
+        raise SystemExit(f"{dist['tarball']} does not match the registry integrity {dist['integrity']}")
+
+    with tarfile.open(fileobj=io.BytesIO(tarball), mode="r:gz") as archive:
+        bundle = archive.extractfile(TARBALL_MEMBER).read()
+
+    directory = os.path.join(output, version)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, BUNDLE_NAME), "wb") as handle:
+        handle.write(bundle)
+    manifest = {
+        "package": "mermaid",
+        "version": version,
+        "file": BUNDLE_NAME,
+        "integrity": sri_hash(bundle),
+        "size": len(bundle),
+        "source": dist["tarball"],
+        "source_integrity": dist["integrity"],
+        "fetched_at": int(time.time()),
+    }
+    with open(os.path.join(directory, MANIFEST_NAME), "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=2)
+        handle.write("\n")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--version", default=MERMAID_VERSION,
+                        help="mermaid release to fetch; the app loads MERMAID_VERSION")
+    parser.add_argument("--registry", default="https://registry.npmjs.org")
+    parser.add_argument("--output", default=VENDOR_ROOT)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    manifest = vendor(args.version, args.registry, args.output, args.timeout)
+    print(f"Vendored mermaid {manifest['version']} ({manifest['size']} bytes, {manifest['integrity']})")
+    if args.version != MERMAID_VERSION:
+        print(f"Note: utils/mermaid_assets.py still loads {MERMAID_VERSION}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,23 @@
 # streamlit_app.py
 import streamlit as st
-from utils.ai_processor import AIProcessor
+from utils.ai_processor import AIProcessor, ProcessorConfig, Reporter
 from utils.diagram_generator import DiagramGenerator
+from utils.models import Analysis, Component
+from utils.analysis_store import AnalysisStore
+from utils.history import AnalysisHistory
+from utils.pipeline import AnalysisPipeline
+from utils.mermaid_lint import LintResult, lint_diagram
+from utils.diagram_svg import RENDERER_VERSION, DiagramTooLarge, render_svg
+from utils.diagram_lod import cluster_diagram
+from utils.mermaid_assets import MermaidAssetError, mermaid_iframe_html, mermaid_script_tag
 import streamlit.components.v1 as components
-import re
+import datetime
+import hashlib
+import json
+import time
+
+SERVER_RENDERER = "Server SVG"
+BROWSER_RENDERER = "Mermaid in browser"
 
 def setup_page():
     st.set_page_config(
@@ -13,61 +27,271 @@ def setup_page():
         initial_sidebar_state="expanded"
     )
     
-    if 'current_analysis' not in st.session_state:
-        st.session_state.current_analysis = None
+    # Sessions only hold a key; the analysis itself lives in the shared store
+    if 'current_analysis_key' not in st.session_state:
+        st.session_state.current_analysis_key = None
+
+def streamlit_event_handler(event, data):
+    """
+    Streamlit adapter for AIProcessor events; renders into whichever session
+    triggered the event
+    """
+    if event == "raw_response":
+        # Kept so the history entry can include the raw model output
+        st.session_state.last_raw_response = data['text']
+        st.write("Raw response received:")
+        st.code(data['text'][:200] + "...", language="text")
+    elif event == "diagram":
+        st.write("Diagram code:")
+        st.code(data['diagram'], language="mermaid")
+    elif event == "parse_error":
+        st.error(data['error'])
+        st.write("Response text that caused the error:")
+        st.code(data['text'][:500] + "...", language="text")
+    elif event == "missing_components":
+        st.warning("Missing Components:")
+        for category, keywords in data['missing'].items():
+            st.write(f"- {category}: {', '.join(keywords)}")
+    elif event == "similar_match":
+        st.session_state.similar_match = data
+        st.info(f"Showing the saved design of an earlier request that is {data['similarity']:.0%} "
+                f"similar to yours. Use Regenerate below for a fresh one.")
+    elif event == "diagram_lint":
+        if data['repaired'] and not data['needs_repair']:
+            st.info("The diagram had errors that could not be fixed automatically; it was regenerated on its own.")
+        elif data['needs_repair']:
+            st.warning("The diagram still has errors after regenerating it; showing the closest valid version.")
+
+def request_regenerate():
+    # Button callback; the next run generates with the caches bypassed
+    st.session_state.force_regenerate = True
+
+@st.cache_resource
+def get_ai_processor():
+    """
+    Process-wide AIProcessor shared by every session and rerun, so the Groq
+    client and its keep-alive connection pool are built only once
+    """
+    settings = dict(st.secrets.get("groq_client", {}))
+    warm_up = settings.pop("warm_up", True)
+    config = ProcessorConfig(api_key=st.secrets["GROQ_API_KEY"], **settings)
+
+    reporter = Reporter()
+    reporter.subscribe(streamlit_event_handler)
+    processor = AIProcessor(config, reporter=reporter)
+    if warm_up:
+        processor.warm_up()
+    return processor
+
+@st.cache_resource
+def get_analysis_store():
+    """
+    Process-wide store of parsed analyses and rendered diagrams, bounded by
+    the optional [analysis_store] secrets section
+    """
+    settings = dict(st.secrets.get("analysis_store", {}))
+    return AnalysisStore(**settings)
+
+@st.cache_resource
+def get_mermaid_script():
+    """
+    <script> for the vendored mermaid.js, checked against its manifest hash
+    once per process; the pinned CDN copy while nothing is vendored or
+    static serving is off. Raises MermaidAssetError for a vendored bundle
+    that fails its check rather than quietly loading something else.
+    """
+    return mermaid_script_tag(static_serving=st.get_option("server.enableStaticServing"))
+
+@st.cache_resource
+def get_history():
+    """Process-wide SQLite history of generated designs"""
+    return AnalysisHistory(**dict(st.secrets.get("history", {})))
+
+def render_history_sidebar(history):
+    """
+    Lists or searches past designs; opening one replays it without calling
+    the API
+    """
+    with st.sidebar.expander("History", expanded=True):
+        query = st.text_input("Search designs", placeholder="e.g. kafka dynamodb")
+        facets = {}
+        with st.popover("Filter by preferences", use_container_width=True):
+            for facet, values in history.facet_values().items():
+                choice = st.selectbox(facet.replace('_', ' ').title(), ["Any"] + values, key=f"history_{facet}")
+                if choice != "Any":
+                    facets[facet] = choice
+        
+        if query.strip() or facets:
+            recent = history.search(query, facets, limit=50)
+            if not recent:
+                st.caption("No matching designs")
+                return
+        else:
+            recent = history.list_recent(limit=50)
+            if not recent:
+                st.caption("No designs generated yet")
+                return
+        
+        def label(item):
+            created = datetime.datetime.fromtimestamp(item['created_at']).strftime("%Y-%m-%d %H:%M")
+            return f"{created} · {item['title'][:60]}"
+        
+        selected = st.selectbox(
+            "Past designs",
+            recent,
+            format_func=label,
+            label_visibility="collapsed"
+        )
+        st.caption(f"{history.count()} designs stored")
+        if st.button("Open design", use_container_width=True):
+            record = history.get(selected['id'])
+            if record is not None:
+                st.session_state.current_analysis_key = get_analysis_store().put_analysis(record['analysis'])
+                st.session_state.replay_analysis = True
+
+def render_stats_sidebar(processor):
+    """Shows how many API calls the response cache and request coalescing saved"""
+    cache_stats = processor.cache.stats()
+    inflight_stats = processor.inflight.stats()
+    with st.sidebar.expander("Request statistics", expanded=False):
+        st.metric("Cache hits", cache_stats['hits'])
+        st.metric("Cache misses", cache_stats['misses'])
+        st.metric("Coalesced requests", inflight_stats['coalesced'])
+        st.caption(f"{cache_stats['entries']} cached designs, {inflight_stats['in_flight']} in flight")
+
+def render_store_sidebar(store):
+    """Admin view of the shared analysis store's occupancy and evictions"""
+    stats = store.stats()
+    with st.sidebar.expander("Analysis store", expanded=False):
+        used_mb = stats['bytes'] / (1024 * 1024)
+        budget_mb = stats['max_bytes'] / (1024 * 1024)
+        st.progress(min(1.0, stats['bytes'] / stats['max_bytes']) if stats['max_bytes'] else 0.0,
+                    text=f"{used_mb:.1f} / {budget_mb:.0f} MB in {stats['entries']} entries")
+        col1, col2 = st.columns(2)
+        col1.metric("Hits", stats['hits'])
+        col2.metric("Misses", stats['misses'])
+        col1.metric("Evictions", stats['evictions'])
+        col2.metric("Spill reloads", stats['spill_hits'])
+        if 'spilled_entries' in stats:
+            st.caption(f"{stats['spilled_entries']} entries spilled to disk "
+                       f"({stats['spilled_bytes'] / 1024:.0f} of {stats['max_spill_bytes'] / 1024:.0f} KB compressed, "
+                       f"{stats['spill_deletes']} deleted)")
+
+def _render_overview(overview):
+    st.markdown("## System Flow Analysis")
+    st.markdown(overview)
+
+@st.cache_data(max_entries=2048, show_spinner=False)
+def _component_markdown(component):
+    """One pre-built markdown body per component instead of a delta per line"""
+    blocks = [f"**Purpose**: {component.purpose}", "### Implementation Steps"]
+    for step in component.steps:
+        blocks.append('\n'.join([f"**Step {step.step}: {step.action}**", ""] +
+                                 [f"- {detail}" for detail in step.details]))
+    blocks.append("### Technologies Used")
+    for tech in component.technologies:
+        blocks.append(f"**{tech.name}**\n\n- Purpose: {tech.purpose}\n- Configuration: {tech.configuration}")
+    blocks.append("### Data Flow")
+    blocks.append(f"1. **Input**: {component.data_flow.input}\n"
+                  f"2. **Process**: {component.data_flow.process}\n"
+                  f"3. **Output**: {component.data_flow.output}")
+    return '\n\n'.join(blocks)
+
+@st.fragment
+def _render_component(component, index):
+    """
+    Collapsed, and its body is only built and sent once opened; as a
+    fragment, opening or closing it reruns just this section
+    """
+    digest = hashlib.sha256(component.name.encode('utf-8')).hexdigest()[:12]
+    section = st.expander(f"📍 {component.name}", key=f"component_{index}_{digest}", on_change="rerun")
+    if section.open:
+        section.markdown(_component_markdown(component))
+
+def _render_diagram(diagram):
+    st.markdown("## System Flow Diagram")
+    render_mermaid(diagram)
 
-def display_analysis(analysis_data):
+def display_analysis(analysis):
     try:
         # Display the system overview
-        st.markdown("## System Flow Analysis")
-        st.markdown(analysis_data['overview'])
+        _render_overview(analysis.overview)
         
-                        # Display each component
-        for component in analysis_data['components']:
-            with st.expander(f"📍 {component['name']}", expanded=True):
-                st.markdown(f"**Purpose**: {component['purpose']}")
-                
-                # Display Steps
-                st.markdown("### Implementation Steps")
-                for step in component['steps']:
-                    st.markdown(f"**Step {step['step']}: {step['action']}**")
-                    for detail in step['details']:
-                        st.markdown(f"- {detail}")
-                
-                # Display Technologies
-                st.markdown("### Technologies Used")
-                for tech in component['technologies']:
-                    st.markdown(f"**{tech['name']}**")
-                    st.markdown(f"- Purpose: {tech['purpose']}")
-                    st.markdown(f"- Configuration: {tech['configuration']}")
-                
-                # Display Data Flow
-                st.markdown("### Data Flow")
-                st.markdown(f"1. **Input**: {component['data_flow']['input']}")
-                st.markdown(f"2. **Process**: {component['data_flow']['process']}")
-                st.markdown(f"3. **Output**: {component['data_flow']['output']}")
+        # Display each component
+        for index, component in enumerate(analysis.components):
+            _render_component(component, index)
         
         # # Display Flow Steps
         # st.markdown("## System Flow")
-        # for step in analysis_data['flow_steps']:
-        #     st.markdown(f"### Step {step['step']}: {step['title']}")
-        #     st.markdown(step['description'])
+        # for step in analysis.flow_steps:
+        #     st.markdown(f"### Step {step.step}: {step.title}")
+        #     st.markdown(step.description)
         #     st.markdown("**Technical Details:**")
-        #     for detail in step['technical_details']:
+        #     for detail in step.technical_details:
         #         st.markdown(f"- {detail}")
         
         # Display the system flow diagram
-        st.markdown("## System Flow Diagram")
-        render_mermaid(analysis_data['diagram'])
+        _render_diagram(analysis.diagram)
         
     except Exception as e:
         st.error(f"Error displaying analysis: {str(e)}")
 
+def display_analysis_stream(events):
+    """
+    Renders analysis parts as they arrive from AIProcessor.analyze_process_stream
+    and returns the final parsed Analysis
+    """
+    analysis = None
+    component_count = 0
+    for kind, value in events:
+        try:
+            if kind == 'overview':
+                _render_overview(value)
+            elif kind == 'component':
+                _render_component(Component.from_dict(value), component_count)
+                component_count += 1
+            elif kind == 'diagram':
+                _render_diagram(value)
+            elif kind == 'analysis':
+                analysis = Analysis.from_dict(value)
+        except Exception as e:
+            st.error(f"Error displaying {kind}: {str(e)}")
+    return analysis
+
+def _inputs_key(requirements, generation_mode):
+    """Stable key for everything that decides what a generated design looks like"""
+    payload = json.dumps(
+        {
+            "description": ' '.join(requirements['description'].split()),
+            "preferences": requirements['preferences'],
+            "mode": generation_mode,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:24]
+
+def _remember_inputs(analyses_by_inputs, inputs_key, analysis_key, limit=32):
+    # Per session, so only the newest few input sets are worth keeping
+    analyses_by_inputs.pop(inputs_key, None)
+    analyses_by_inputs[inputs_key] = analysis_key
+    while len(analyses_by_inputs) > limit:
+        analyses_by_inputs.pop(next(iter(analyses_by_inputs)))
+
 def main():
     setup_page()
     
     st.title("🔄 System Design Analyzer")
     
+    render_history_sidebar(get_history())
+    render_store_sidebar(get_analysis_store())
+    
+    # Build the shared processor (and warm its connection pool) at app start
+    try:
+        render_stats_sidebar(get_ai_processor())
+    except Exception as e:
+        st.error(f"Could not initialize the AI client: {str(e)}")
+    
     with st.container():
         st.markdown("""
         ### Design Your System
@@ -111,39 +335,144 @@ def main():
                 ["Redis", "Memcached", "CDN"],
                 index=0
             )
+        bypass_cache = st.checkbox(
+            "Bypass response cache",
+            value=False,
+            help="Always request a fresh design instead of reusing a cached one"
+        )
+        generation_mode = st.radio(
+            "Generation mode",
+            ["Streaming", "Single request", "Parallel pipeline", "Structured output"],
+            index=0,
+            horizontal=True,
+            help="Streaming shows parts as they are generated; Parallel pipeline details every "
+                 "component concurrently; Structured output uses JSON mode with schema validation"
+        )
+        st.radio(
+            "Diagram renderer",
+            [SERVER_RENDERER, BROWSER_RENDERER],
+            index=0,
+            horizontal=True,
+            key="diagram_renderer",
+            help="Server SVG lays the diagram out in Python once and caches the image; "
+                 "Mermaid in browser runs mermaid.js in an iframe on every view"
+        )
+    
+    # Process the input with technical preferences
+    requirements = {
+        "description": process_input,
+        "preferences": {
+            "frontend": frontend,
+            "database": database,
+            "cloud_provider": cloud_provider,
+            "cache_strategy": cache_strategy
+        }
+    }
+    inputs_key = _inputs_key(requirements, generation_mode)
+    analyses_by_inputs = st.session_state.setdefault('analyses_by_inputs', {})
     
-    if st.button("Generate Design", type="primary"):
+    generate = st.button("Generate Design", type="primary")
+    regenerate = st.session_state.pop('force_regenerate', False)
+    if generate or regenerate:
+        bypass_cache = bypass_cache or regenerate
         if not process_input.strip():
             st.warning("Please enter system requirements")
             return
+        
+        # Same inputs as a design this session already has: show it again
+        # rather than going back to the processor
+        stored_key = None if bypass_cache else analyses_by_inputs.get(inputs_key)
+        analysis_result = get_analysis_store().get(stored_key) if stored_key else None
+        if analysis_result is not None:
+            st.session_state.current_analysis_key = stored_key
+            st.session_state.shown_inputs = inputs_key
+            display_analysis(analysis_result)
+            return
             
         try:
             with st.spinner("Analyzing system requirements..."):
-                # Initialize processors
-                ai_processor = AIProcessor()
+                # Shared processor with a pooled client
+                ai_processor = get_ai_processor()
+                started = time.perf_counter()
+                partial = False
+                st.session_state.last_raw_response = None
+                st.session_state.similar_match = None
                 
-                # Process the input with technical preferences
-                requirements = {
-                    "description": process_input,
-                    "preferences": {
-                        "frontend": frontend,
-                        "database": database,
-                        "cloud_provider": cloud_provider,
-                        "cache_strategy": cache_strategy
-                    }
-                }
+                if generation_mode == "Parallel pipeline":
+                    # Skeleton first, then concurrent per-component and diagram requests
+                    analysis_data = AnalysisPipeline(ai_processor).analyze(requirements, bypass_cache=bypass_cache)
+                    partial = analysis_data.get('partial', False)
+                    if partial:
+                        st.warning("Some component details could not be generated. This design was not saved; "
+                                   "Generate Design again to retry.")
+                    analysis_result = Analysis.from_dict(analysis_data)
+                    display_analysis(analysis_result)
+                elif generation_mode == "Structured output":
+                    # JSON mode, schema-validated; only invalid parts are re-requested
+                    analysis_data = ai_processor.analyze_process_structured(requirements, bypass_cache=bypass_cache)
+                    analysis_result = Analysis.from_dict(analysis_data)
+                    display_analysis(analysis_result)
+                elif generation_mode == "Streaming":
+                    # Render each part as soon as it is generated
+                    events = ai_processor.analyze_process_stream(requirements, bypass_cache=bypass_cache)
+                    analysis_result = display_analysis_stream(events)
+                else:
+                    # Get the analysis, decoded once into the typed model
+                    analysis_data = ai_processor.analyze_process(requirements, bypass_cache=bypass_cache)
+                    analysis_result = Analysis.from_dict(analysis_data)
+                    
+                    # Display the analysis
+                    display_analysis(analysis_result)
                 
-                # Get the analysis
-                analysis_result = ai_processor.analyze_process(requirements)
-                
-                # Store in session state
-                st.session_state.current_analysis = analysis_result
-                
-                # Display the analysis
-                display_analysis(analysis_result)
+                # Store in the shared store; the session keeps only the key
+                if analysis_result is not None:
+                    st.session_state.current_analysis_key = get_analysis_store().put_analysis(analysis_result)
+                    st.session_state.shown_inputs = inputs_key
+                if analysis_result is not None and not partial:
+                    # A partial design stays on screen but is neither replayed nor kept in history
+                    _remember_inputs(analyses_by_inputs, inputs_key, st.session_state.current_analysis_key)
+                    # Cache hits and near-duplicate matches map onto the record already there
+                    get_history().record(
+                        requirements,
+                        analysis_result,
+                        raw_response=st.session_state.get('last_raw_response'),
+                        duration_s=time.perf_counter() - started,
+                        mode=generation_mode
+                    )
+            
+            if st.session_state.similar_match:
+                st.button("Regenerate", on_click=request_regenerate,
+                          help="Ignore the similar saved design and generate one for these exact requirements")
                 
         except Exception as e:
             st.error(f"Analysis failed: {str(e)}")
+    
+    elif st.session_state.pop('replay_analysis', False):
+        # Instant replay of a design opened from the history sidebar
+        st.session_state.shown_inputs = inputs_key
+        analysis_result = get_analysis_store().get(st.session_state.current_analysis_key)
+        if analysis_result is not None:
+            display_analysis(analysis_result)
+    
+    else:
+        # Any other rerun (a widget changed): keep showing the current design
+        # from the store. Inputs changed back to ones already generated in
+        # this session switch to that design, still without an API call.
+        stored_key = analyses_by_inputs.get(inputs_key)
+        if stored_key and inputs_key != st.session_state.get('shown_inputs'):
+            st.session_state.current_analysis_key = stored_key
+        st.session_state.shown_inputs = inputs_key
+        
+        current_key = st.session_state.get('current_analysis_key')
+        analysis_result = get_analysis_store().get(current_key) if current_key else None
+        if analysis_result is not None:
+            if current_key != stored_key:
+                st.info("This design was generated for different requirements or settings. "
+                        "Press Generate Design to update it.")
+            elif st.session_state.get('similar_match'):
+                st.button("Regenerate", on_click=request_regenerate,
+                          help="Ignore the similar saved design and generate one for these exact requirements")
+            display_analysis(analysis_result)
 
 # streamlit_app.py (consolidated render_mermaid function)
 # def render_mermaid(mermaid_code):
@@ -276,84 +605,95 @@ def main():
 #         st.error(f"Error in HTML component: {str(e)}")
 #         st.code(mermaid_code, language="mermaid")
 
-def render_mermaid(mermaid_code):
+def _lint_mermaid(mermaid_code):
+    """Linted, fixed and formatted diagram with its diagnostics, shared across sessions"""
+    store = get_analysis_store()
+    artifact_key = "mermaid-lint-" + hashlib.sha256(mermaid_code.encode('utf-8')).hexdigest()[:24]
+    cached = store.get(artifact_key)
+    if cached is not None:
+        return LintResult.from_dict(json.loads(cached))
+    result = lint_diagram(mermaid_code)
+    store.put(artifact_key, json.dumps(result.to_dict()))
+    return result
+
+def _diagram_svg(diagram):
+    """Server-rendered SVG of a linted diagram, shared across sessions; None if it is not a flowchart"""
+    store = get_analysis_store()
+    artifact_key = f"svg-{RENDERER_VERSION}-" + hashlib.sha256(diagram.encode('utf-8')).hexdigest()[:24]
+    svg = store.get(artifact_key)
+    if svg is None:
+        svg = render_svg(diagram) or ''
+        store.put(artifact_key, svg)
+    return svg or None
+
+def _render_diagnostics(result):
+    problems = [d for d in result.diagnostics if d.severity == "error" and not d.fixed]
+    label = f"Diagram checks: {len(result.diagnostics)} found, {len(problems)} unfixed"
+    with st.expander(label, expanded=bool(problems)):
+        for diagnostic in result.diagnostics:
+            st.markdown(f"- {'✅' if diagnostic.fixed else '⚠️'} {diagnostic}")
+
+@st.fragment
+def _render_diagram_view(formatted_code):
     """
-    Renders a Mermaid diagram with proper formatting and line breaks
+    Draws a linted diagram. Large ones start as an overview of clusters and
+    open one cluster at a time; as a fragment, picking one reruns only this
     """
     try:
-        # First format the diagram code
-        lines = mermaid_code.split('%%')
-        formatted_lines = []
-        
-        for line in lines:
-            if line.strip():
-                # Handle the graph TD line specially
-                if 'graph TD' in line:
-                    formatted_lines.append('graph TD')
-                    continue
-                
-                # Add %% for comments except for the first line
-                if formatted_lines:
-                    line = f'%%{line}'
-                
-                # Split connections into separate lines
-                connections = re.split(r'([A-Za-z0-9_-]+\s*-->.*?(?=\s*[A-Za-z0-9_-]+\s*-->|$))', line)
-                for conn in connections:
-                    if '-->' in conn:
-                        formatted_lines.append(conn.strip())
-                    elif conn.strip():
-                        formatted_lines.append(conn.strip())
-        
-        formatted_code = '\n'.join(formatted_lines)
+        clustered = cluster_diagram(formatted_code)
+        if clustered is not None:
+            options = [None] + [cluster.id for cluster in clustered.clusters]
+            digest = hashlib.sha256(formatted_code.encode('utf-8')).hexdigest()[:12]
+            selected = st.selectbox(
+                f"Detail ({len(clustered.chart.nodes)} nodes in {len(clustered.clusters)} groups)",
+                options,
+                format_func=lambda cluster_id: "Overview" if cluster_id is None else clustered.title(cluster_id),
+                key=f"diagram_detail_{digest}",
+            )
+            formatted_code = clustered.expand(selected)
         
         # Show the formatted code for debugging
         st.code(formatted_code, language="mermaid")
         
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <script src="https://cdn.jsdelivr.net/npm/mermaid@9.3.0/dist/mermaid.min.js"></script>
-            <style>
-                .mermaid {{
-                    background: white;
-                    padding: 20px;
-                    border-radius: 10px;
-                    box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-                    margin: 10px 0;
-                    overflow: auto;
-                }}
-                .mermaid svg {{
-                    max-width: 100%;
-                    height: auto;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="mermaid">
-                {formatted_code}
-            </div>
-            <script>
-                mermaid.initialize({{
-                    startOnLoad: true,
-                    securityLevel: 'loose',
-                    theme: 'neutral',
-                    flowchart: {{
-                        htmlLabels: true,
-                        curve: 'basis',
-                        useMaxWidth: true,
-                        padding: 20,
-                        rankSpacing: 50,
-                        nodeSpacing: 50,
-                        diagramPadding: 20
-                    }}
-                }});
-            </script>
-        </body>
-        </html>
-        """
+        if st.session_state.get('diagram_renderer', SERVER_RENDERER) == SERVER_RENDERER:
+            # Laid out once per diagram and then served from the store
+            try:
+                svg = _diagram_svg(formatted_code)
+            except DiagramTooLarge as e:
+                svg = None
+                st.caption(f"Drawn with Mermaid in the browser: {e}")
+            if svg is not None:
+                st.image(svg)
+                return
+        
+        # The page only references the bundle (vendored, or the pinned CDN copy), which the browser caches
+        try:
+            script_tag = get_mermaid_script()
+        except MermaidAssetError as e:
+            st.error(f"Mermaid in browser is unavailable: {e}")
+            st.code(formatted_code, language="mermaid")
+            return
+        html = mermaid_iframe_html(formatted_code, script_tag)
+        
+        components.html(html, height=800, scrolling=True)
+        
+    except Exception as e:
+        st.error(f"Error rendering diagram: {str(e)}")
+        st.code(formatted_code, language="mermaid")
+
+def render_mermaid(mermaid_code):
+    """
+    Renders a Mermaid diagram with proper formatting and line breaks
+    """
+    try:
+        # Checked before it reaches the browser; fixes are applied and anything
+        # left is listed instead of surfacing as a failed render
+        result = _lint_mermaid(mermaid_code)
+        formatted_code = result.diagram
+        if result.diagnostics:
+            _render_diagnostics(result)
         
-        return components.html(html, height=800, scrolling=True)
+        _render_diagram_view(formatted_code)
         
     except Exception as e:
         st.error(f"Error rendering diagram: {str(e)}")
@@ -0,0 +1,90 @@
+# tests/test_analysis_store.py
+import os
+
+from utils.analysis_store import AnalysisStore, analysis_key
+from utils.models import Analysis
+
+
+def text(n):
+    # Random-looking, so every spill file compresses to roughly the same size
+    return os.urandom(600).hex() + str(n)
+
+
+def spilled_files(directory):
+    return sorted(path.stem for path in directory.glob('*.z'))
+
+
+def test_lru_eviction_keeps_recent_entries():
+    store = AnalysisStore(max_bytes=3000)
+    for n in range(5):
+        store.put(f"k{n}", text(n))
+    store.get("k3")
+    store.put("k5", text(5))
+    assert "k5" in store and "k3" in store and "k0" not in store
+    assert store.stats()['bytes'] <= 3000
+
+
+def test_evicted_entries_reload_from_spill(tmp_path):
+    store = AnalysisStore(max_bytes=3000, spill_dir=tmp_path)
+    values = {f"k{n}": text(n) for n in range(4)}
+    for key, value in values.items():
+        store.put(key, value)
+    assert spilled_files(tmp_path) == ["k0", "k1"]
+    assert store.get("k0") == values["k0"]
+    assert store.stats()['spill_hits'] == 1
+
+
+def test_spill_dir_is_bounded_lru(tmp_path):
+    store = AnalysisStore(max_bytes=1500, spill_dir=tmp_path, max_spill_bytes=2000)
+    for n in range(8):
+        store.put(f"k{n}", text(n))
+    stats = store.stats()
+    assert stats['spilled_bytes'] <= 2000 and stats['spill_deletes'] > 0
+    # Counters agree with the directory without globbing it
+    assert stats['spilled_entries'] == len(spilled_files(tmp_path))
+    assert stats['spilled_bytes'] == sum(path.stat().st_size for path in tmp_path.glob('*.z'))
+    assert "k0" not in store and store.get("k0") is None
+
+
+def test_unchanged_reloads_are_not_written_again(tmp_path):
+    store = AnalysisStore(max_bytes=1500, spill_dir=tmp_path)
+    for n in range(3):
+        store.put(f"k{n}", text(n))
+    spills = store.stats()['spills']
+    store.get("k0")
+    store.put("k3", text(3))
+    # Only k2 was written when k0 came back; k3 then pushed out k0, whose file was still good
+    assert store.stats()['spills'] == spills + 1
+
+
+def test_new_value_replaces_stale_spill_file(tmp_path):
+    store = AnalysisStore(max_bytes=1500, spill_dir=tmp_path)
+    store.put("a", text(0))
+    store.put("b", text(1))
+    assert "a" in spilled_files(tmp_path)
+    store.put("a", "fresh")
+    assert "a" not in spilled_files(tmp_path)
+    assert store.get("a") == "fresh"
+
+
+def test_spill_index_survives_a_restart(tmp_path):
+    first = AnalysisStore(max_bytes=1500, spill_dir=tmp_path)
+    values = [text(n) for n in range(3)]
+    for n, value in enumerate(values):
+        first.put(f"k{n}", value)
+
+    second = AnalysisStore(max_bytes=1500, spill_dir=tmp_path)
+    assert second.stats()['spilled_entries'] == 2
+    assert second.get("k1") == values[1]
+
+    trimmed = AnalysisStore(spill_dir=tmp_path, max_spill_bytes=1)
+    assert trimmed.stats()['spilled_entries'] == 0 and spilled_files(tmp_path) == []
+
+
+def test_analyses_round_trip_through_spill(tmp_path):
+    store = AnalysisStore(max_bytes=1, spill_dir=tmp_path)
+    analysis = Analysis.from_dict({"overview": "o", "components": [], "flow_steps": [], "diagram": "graph TD"})
+    key = store.put_analysis(analysis)
+    assert key == analysis_key(analysis)
+    store.put("other", "x")
+    assert store.get(key) == analysis
@@ -0,0 +1,131 @@
+# tests/test_async_processor.py
+import asyncio
+import threading
+from http.server import ThreadingHTTPServer
+from types import SimpleNamespace
+
+import groq
+import httpx
+import pytest
+
+from scripts.stub_groq_server import StubHandler
+from utils.ai_processor import AsyncAIProcessor, ProcessorConfig, ResponseCache
+
+REQUIREMENTS = {"description": "Design a URL shortener", "preferences": {"database": "DynamoDB"}}
+BROKEN_DIAGRAM = "graph TD\n    A -->|x B"
+
+
+class CountingHandler(StubHandler):
+    delay = 0.05
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+    requests = 0
+
+    def do_POST(self):
+        cls = type(self)
+        with cls.lock:
+            cls.requests += 1
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            super().do_POST()
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+
+@pytest.fixture
+def server():
+    CountingHandler.active = CountingHandler.peak = CountingHandler.requests = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), CountingHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+def make_processor(tmp_path, base_url, **options):
+    config = ProcessorConfig(api_key="stub", base_url=base_url, **options)
+    return AsyncAIProcessor(config, cache=ResponseCache(tmp_path / "cache.sqlite3"))
+
+
+def test_structured_analysis_is_awaited(tmp_path, server):
+    processor = make_processor(tmp_path, server)
+    result = asyncio.run(processor.analyze_process_structured(REQUIREMENTS))
+    assert result['components'][0]['name'] == "API Gateway"
+    # Cached under the structured template, so a second call makes no request
+    asyncio.run(processor.analyze_process_structured(REQUIREMENTS))
+    assert CountingHandler.requests == 1
+
+
+def test_streaming_is_refused(tmp_path, server):
+    with pytest.raises(TypeError):
+        make_processor(tmp_path, server).analyze_process_stream(REQUIREMENTS)
+
+
+def test_requests_stay_under_max_concurrency(tmp_path, server):
+    processor = make_processor(tmp_path, server, max_concurrency=2)
+    batch = [dict(REQUIREMENTS, description=f"Design service {n}") for n in range(6)]
+    results = asyncio.run(processor.analyze_many(batch))
+    assert not [r for r in results if isinstance(r, Exception)]
+    assert CountingHandler.peak <= 2
+
+
+def test_diagram_repair_waits_for_the_semaphore(tmp_path, server):
+    processor = make_processor(tmp_path, server, max_concurrency=1)
+
+    async def scenario():
+        await processor._semaphore.acquire()
+        task = asyncio.create_task(processor._check_diagram(REQUIREMENTS, {"diagram": BROKEN_DIAGRAM}))
+        await asyncio.sleep(0.2)
+        held = CountingHandler.requests
+        processor._semaphore.release()
+        await task
+        return held
+
+    assert asyncio.run(scenario()) == 0
+    assert CountingHandler.requests == 1
+
+
+class FailingCompletions:
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    async def create(self, **options):
+        self.calls += 1
+        raise self.error
+
+
+def rate_limit_error():
+    request = httpx.Request("POST", "http://stub/openai/v1/chat/completions")
+    return groq.RateLimitError("rate limited", response=httpx.Response(429, request=request), body=None)
+
+
+@pytest.mark.parametrize("error", [rate_limit_error(), ConnectionError("reset")])
+def test_failed_attempts_are_credited_back(tmp_path, error):
+    processor = make_processor(tmp_path, "http://stub", tokens_per_minute=60000, requests_per_minute=None,
+                               max_rate_limit_retries=0)
+    completions = FailingCompletions(error)
+    processor.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    with pytest.raises(type(error)):
+        asyncio.run(processor._create_completion([], estimated_tokens=5000))
+    assert completions.calls == 1
+    assert processor.limiter.tokens.level == pytest.approx(60000)
+
+
+def test_cache_io_runs_off_the_event_loop(tmp_path, server):
+    processor = make_processor(tmp_path, server)
+    threads = []
+    lookup, remember = processor.lookup, processor.remember
+
+    def recording(method):
+        def call(*args):
+            threads.append(threading.current_thread())
+            return method(*args)
+        return call
+
+    processor.lookup, processor.remember = recording(lookup), recording(remember)
+    asyncio.run(processor.analyze_process(REQUIREMENTS))
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
@@ -0,0 +1,51 @@
+# tests/test_batch.py
+import json
+
+from utils.ai_processor import Reporter
+from utils.batch import load_requirements, percentile, run_batch
+
+
+class FakeProcessor:
+    """Answers every request; descriptions starting with "dup" count as near-duplicate hits"""
+
+    def __init__(self):
+        self.reporter = Reporter()
+
+    def analyze_process(self, requirements, bypass_cache=False):
+        if requirements['description'].startswith("dup"):
+            self.reporter.emit("similar_match", similarity=0.97, key="original-key")
+        return {"overview": requirements['description'], "diagram": "graph TD\n    A --> B"}
+
+
+def test_similar_matches_are_recorded(tmp_path):
+    records = [
+        {"id": "fresh", "description": "fresh design", "preferences": {}},
+        {"id": "reused", "description": "dup design", "preferences": {}},
+    ]
+    stats = run_batch(FakeProcessor(), records, tmp_path, concurrency=2)
+
+    assert stats['completed'] == 2
+    assert stats['similar_matches'] == {"reused": {"similar_to": "original-key", "similarity": 0.97}}
+    assert json.loads((tmp_path / "reused" / "source.json").read_text())['similar_to'] == "original-key"
+    assert not (tmp_path / "fresh" / "source.json").exists()
+
+
+def test_finished_records_are_skipped(tmp_path):
+    records = [{"id": "done", "description": "x", "preferences": {}}]
+    run_batch(FakeProcessor(), records, tmp_path)
+    assert run_batch(FakeProcessor(), records, tmp_path)['skipped'] == 1
+
+
+def test_load_requirements_fills_preferences_and_ids(tmp_path):
+    path = tmp_path / "in.jsonl"
+    path.write_text('{"description": "a b", "id": "x/y"}\n\n{"description": "c"}\n')
+    records = load_requirements(path)
+    assert records[0]['id'] == "x_y"
+    assert records[0]['preferences']['database'] == "DynamoDB"
+    assert len(records[1]['id']) == 16
+
+
+def test_percentile():
+    assert percentile([], 50) == 0.0
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile([1, 2, 3, 4], 100) == 4
@@ -0,0 +1,83 @@
+# tests/test_component_classifier.py
+import random
+from collections import Counter
+
+from utils.component_classifier import ComponentClassifier, KeywordAutomaton, normalize_text
+from utils.diagram_generator import DiagramGenerator
+from utils.models import Component
+
+
+def brute_force(keywords, text):
+    """Every whole-word occurrence of every keyword, found by scanning each start"""
+    words = normalize_text(text)
+    hits = []
+    for index, keyword in enumerate(keywords):
+        start = words.find(keyword)
+        while start != -1:
+            end = start + len(keyword)
+            if (start == 0 or words[start - 1] == ' ') and (end == len(words) or words[end] == ' '):
+                hits.append(index)
+            start = words.find(keyword, start + 1)
+    return hits
+
+
+def component(name, purpose="", technologies=()):
+    return Component.from_dict({"name": name, "purpose": purpose,
+                                "technologies": [{"name": tech} for tech in technologies]})
+
+
+def test_whole_words_only():
+    automaton = KeywordAutomaton(["ui", "db", "api"])
+    assert automaton.find("build the feedback loop") == []
+    assert [automaton.keywords[i] for i in automaton.find("UI talks to the API, then DB.")] == ["ui", "api", "db"]
+
+
+def test_multi_word_and_overlapping_keywords():
+    automaton = KeywordAutomaton(["fast access", "access", "fast", "api gateway", "gateway", "Fast-Access"])
+    # Duplicates after normalizing are kept once
+    assert automaton.keywords == ["fast access", "access", "fast", "api gateway", "gateway"]
+    found = [automaton.keywords[i] for i in automaton.find("Fast  access via the API-Gateway")]
+    assert Counter(found) == Counter(["fast", "fast access", "access", "api gateway", "gateway"])
+
+
+def test_matches_agree_with_a_brute_force_scan():
+    rng = random.Random(7)
+    alphabet = "ab "
+    for _ in range(300):
+        keywords = [''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 5))) for _ in range(rng.randint(1, 8))]
+        text = ''.join(rng.choice(alphabet + "-") for _ in range(rng.randint(0, 40)))
+        automaton = KeywordAutomaton(keywords)
+        assert Counter(automaton.find(text)) == Counter(brute_force(automaton.keywords, text)), (keywords, text)
+
+
+def test_scores_weight_names_over_prose_and_ties_go_to_the_first_category():
+    classifier = ComponentClassifier({"api": ["gateway", "service"], "lambda": ["worker", "service"]})
+    result = classifier.classify(component("Order worker", "Gateway facing"))
+    assert result.category == "lambda" and result.scores == {"lambda": 3, "api": 1}
+    assert result.categories == ("lambda", "api")
+    # "service" counts for both; equal scores go to the category listed first
+    assert classifier.classify(component("Billing service")).category == "api"
+    assert classifier.classify(component("Billing", technologies=["Worker"])).scores == {"lambda": 2}
+    assert classifier.classify(component("Unrelated")).category is None
+
+
+def test_edge_rules_for_a_small_design():
+    analysis = {"components": [
+        {"name": "Web UI", "purpose": "React frontend"},
+        {"name": "API Gateway", "purpose": "Routes requests"},
+        {"name": "Orders Lambda", "purpose": "Serverless handler"},
+        {"name": "Orders DB", "purpose": "DynamoDB table"},
+        {"name": "Session Cache", "purpose": "Redis"},
+    ]}
+    generator = DiagramGenerator()
+    ids = {name: generator._generate_node_id(name)
+           for name in ("Web UI", "API Gateway", "Orders Lambda", "Orders DB", "Session Cache")}
+    edges = [line.strip() for line in generator.generate_diagram(analysis).splitlines() if "-->" in line]
+    expected = [
+        ("Web UI", "API Gateway"),             # listed order, also frontend -> api
+        ("API Gateway", "Orders Lambda"),      # listed order, also api -> lambda
+        ("Orders Lambda", "Orders DB"),        # lambda -> database
+        ("Orders Lambda", "Session Cache"),    # lambda -> cache
+        ("Orders DB", "Session Cache"),        # listed order
+    ]
+    assert edges == [f"{ids[source]} --> {ids[target]}" for source, target in expected]
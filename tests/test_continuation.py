@@ -0,0 +1,124 @@
+# tests/test_continuation.py
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from utils.ai_processor import AIProcessor, ProcessorConfig, ResponseCache
+
+REQUIREMENTS = {"description": "Design a URL shortener", "preferences": {"database": "DynamoDB"}}
+
+ANALYSIS = {
+    "overview": "A URL shortener with a cache in front of the key-value store",
+    "components": [
+        {
+            "name": name,
+            "purpose": f"{name} does its part of the request path",
+            "steps": [{"step": "1", "action": "Handle", "details": ["Validate input", "Emit metrics"]}],
+            "technologies": [{"name": "Lambda", "purpose": "Compute", "configuration": "512 MB, 10 s timeout"}],
+            "data_flow": {"input": "Request", "process": "Shorten", "output": "Code"},
+        }
+        for name in ("API", "Shortener", "Store")
+    ],
+    "flow_steps": [],
+    "diagram": "graph TD\n    API --> Shortener\n    Shortener --> Store",
+}
+TEXT = json.dumps(ANALYSIS, indent=2)
+
+
+class FakeCompletions:
+    """Answers each create() with the next (text, finish_reason), streamed in small chunks if asked"""
+
+    def __init__(self, replies, chunk_size=7):
+        self.replies = list(replies)
+        self.chunk_size = chunk_size
+        self.requests = []
+
+    def create(self, messages, stream=False, **options):
+        self.requests.append(messages)
+        text, finish_reason = self.replies.pop(0)
+        if not stream:
+            message = SimpleNamespace(content=text)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason=finish_reason)])
+        pieces = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        chunks = [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece), finish_reason=None)])
+                  for piece in pieces]
+        # Usage-only chunks carry no choices
+        chunks.append(SimpleNamespace(choices=[]))
+        chunks.append(SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None),
+                                                               finish_reason=finish_reason)]))
+        return iter(chunks)
+
+
+def make_processor(tmp_path, replies, **config):
+    processor = AIProcessor(ProcessorConfig(api_key="test", **config), cache=ResponseCache(tmp_path / "cache.sqlite3"))
+    completions = FakeCompletions(replies)
+    processor.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return processor, completions
+
+
+def split_replies(cut, overlap):
+    """TEXT cut off after cut characters; the continuation repeats the last overlap characters"""
+    return [(TEXT[:cut], "length"), (TEXT[cut - overlap:], "stop")]
+
+
+def run_stream(processor):
+    events = list(processor.analyze_process_stream(REQUIREMENTS))
+    return events, events[-1][1]
+
+
+@pytest.mark.parametrize("overlap", [0, 40, 200])
+def test_sync_continuation_is_stitched(tmp_path, overlap):
+    processor, completions = make_processor(tmp_path, split_replies(len(TEXT) // 2, overlap))
+    assert processor.analyze_process(REQUIREMENTS)["components"] == ANALYSIS["components"]
+    first, second = completions.requests
+    # The cut-off text goes back as an assistant prefix
+    assert second[-1] == {"role": "assistant", "content": TEXT[:len(TEXT) // 2]}
+    assert len(first) == 1
+
+
+@pytest.mark.parametrize("overlap", [0, 40, 200])
+@pytest.mark.parametrize("cut", [150, len(TEXT) - 120])
+def test_streamed_continuation_is_stitched(tmp_path, overlap, cut):
+    # A continuation shorter than the held-back head is flushed at the end of the stream
+    processor, completions = make_processor(tmp_path, split_replies(cut, min(overlap, cut)))
+    events, result = run_stream(processor)
+    assert result["components"] == ANALYSIS["components"]
+    assert [value["name"] for kind, value in events if kind == "component"] == ["API", "Shortener", "Store"]
+    assert completions.requests[1][-1]["content"] == TEXT[:cut]
+
+
+def test_continuations_stop_when_exhausted(tmp_path):
+    cut = len(TEXT) // 3
+    replies = [(TEXT[:cut], "length"), (TEXT[cut:2 * cut], "length"), (TEXT[2 * cut:], "stop")]
+    processor, completions = make_processor(tmp_path, replies, max_continuations=1)
+    with pytest.raises(Exception, match="Analysis error"):
+        processor.analyze_process(REQUIREMENTS)
+    assert len(completions.requests) == 2
+
+    processor, completions = make_processor(tmp_path, replies, max_continuations=1)
+    with pytest.raises(Exception, match="Analysis error"):
+        run_stream(processor)
+    assert len(completions.requests) == 2
+
+
+def test_truncated_text_is_continued_without_a_length_finish(tmp_path):
+    # Some providers report "stop" on a cut-off response
+    processor, completions = make_processor(tmp_path, [(TEXT[:200], "stop"), (TEXT[200:], "stop")])
+    assert processor.analyze_process(REQUIREMENTS)["overview"] == ANALYSIS["overview"]
+    assert len(completions.requests) == 2
+
+
+def test_stitch_and_needs_continuation():
+    stitch = AIProcessor._stitch
+    assert stitch("", "abc") == "abc"
+    assert stitch('{"overview": "hello wor', 'overview": "hello world"}') == '{"overview": "hello world"}'
+    # Overlaps shorter than 16 characters could be coincidence and are kept
+    assert stitch("abc def", "def ghi") == "abc defdef ghi"
+    assert stitch("x" * 10 + "0123456789abcdefghij", "0123456789abcdefghij!") == "x" * 10 + "0123456789abcdefghij!"
+
+    needs = AIProcessor._needs_continuation
+    assert needs(TEXT, "length")
+    assert not needs(TEXT, "stop")
+    assert needs(TEXT[:100], "stop")
+    assert not needs("No JSON here", "stop")
@@ -0,0 +1,112 @@
+# tests/test_diagram_generator.py
+import re
+
+import pytest
+
+from utils import diagram_generator
+from utils.component_classifier import ComponentClassifier
+from utils.diagram_generator import DiagramGenerator
+from utils.models import Analysis
+
+ANALYSIS = {"components": [
+    {"name": "Web UI", "purpose": "React frontend"},
+    {"name": "API Gateway", "purpose": "Routes requests"},
+    {"name": "Orders Lambda", "purpose": "Serverless handler"},
+    {"name": "Orders DB", "purpose": "DynamoDB table"},
+    {"name": "Session Cache", "purpose": "Redis"},
+    {"name": "Audit Lambda", "purpose": "Serverless worker"},
+]}
+
+
+@pytest.fixture(autouse=True)
+def empty_memo():
+    diagram_generator._memo.clear()
+    yield
+    diagram_generator._memo.clear()
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    """Counts the diagrams actually built rather than served from the memo"""
+    calls = []
+    build = DiagramGenerator._build
+
+    def counting(self, analysis):
+        calls.append(analysis)
+        return build(self, analysis)
+
+    monkeypatch.setattr(DiagramGenerator, "_build", counting)
+    return calls
+
+
+def edges(diagram):
+    return re.findall(r'^    (\S+) --> (\S+)$', diagram, re.MULTILINE)
+
+
+def test_output_is_identical_across_instances_and_calls():
+    first = DiagramGenerator().generate_diagram(ANALYSIS)
+    diagram_generator._memo.clear()
+    second = DiagramGenerator().generate_diagram(dict(ANALYSIS))
+    assert first.encode('utf-8') == second.encode('utf-8')
+    assert DiagramGenerator().generate_diagram(ANALYSIS) == first
+
+
+def test_node_ids_are_stable_hashes_of_the_name():
+    assert DiagramGenerator._generate_node_id("API Gateway") == "n4dff79_api_gateway"
+    # Names that clean up the same still get distinct ids
+    assert DiagramGenerator._generate_node_id("API-Gateway") == "n358d0b_api_gateway"
+    diagram = DiagramGenerator().generate_diagram(ANALYSIS)
+    assert "    n4dff79_api_gateway[API Gateway]" in diagram
+
+
+def test_edges_are_written_in_canonical_order():
+    diagram = DiagramGenerator().generate_diagram(ANALYSIS)
+    order = {DiagramGenerator._generate_node_id(c["name"]): i for i, c in enumerate(ANALYSIS["components"])}
+    positions = [(order[source], order[target]) for source, target in edges(diagram)]
+    assert positions == sorted(set(positions))
+    # Both lambdas reach the database and the cache through the rules
+    assert (5, 3) in positions and (5, 4) in positions and (2, 3) in positions
+
+
+def test_repeat_renders_hit_the_memo(builds):
+    generator = DiagramGenerator()
+    first = generator.generate_diagram(ANALYSIS)
+    assert DiagramGenerator().generate_diagram(ANALYSIS) == first
+    assert len(builds) == 1
+    # Only what the diagram depends on is part of the key
+    generator.generate_diagram(dict(ANALYSIS, overview="Something else", diagram="graph LR"))
+    assert len(builds) == 1
+    generator.generate_diagram({"components": ANALYSIS["components"][:-1]})
+    assert len(builds) == 2
+
+
+def test_memo_is_bounded(builds, monkeypatch):
+    monkeypatch.setattr(diagram_generator, "MEMO_SIZE", 2)
+    generator = DiagramGenerator()
+    for n in range(3):
+        generator.generate_diagram({"components": [{"name": f"Service {n}"}]})
+    assert len(diagram_generator._memo) == 2
+    generator.generate_diagram({"components": [{"name": "Service 0"}]})
+    assert len(builds) == 4
+
+
+def test_changed_rules_or_keywords_miss_the_memo(builds):
+    base = DiagramGenerator()
+    diagram = base.generate_diagram(ANALYSIS)
+
+    no_rules = DiagramGenerator()
+    no_rules.edge_rules = {}
+    assert no_rules.content_key(Analysis.from_dict(ANALYSIS)) != base.content_key(Analysis.from_dict(ANALYSIS))
+    # Only the listed order is left
+    assert len(edges(no_rules.generate_diagram(ANALYSIS))) == len(ANALYSIS["components"]) - 1
+
+    class NoCacheGenerator(DiagramGenerator):
+        def __init__(self):
+            super().__init__()
+            self.component_keywords = dict(self.component_keywords, cache=["memcached"])
+            self.classifier = ComponentClassifier(self.component_keywords)
+
+    without_cache = NoCacheGenerator().generate_diagram(ANALYSIS)
+    assert len(builds) == 3
+    assert len(edges(without_cache)) < len(edges(diagram))
+    assert base.generate_diagram(ANALYSIS) == diagram and len(builds) == 3
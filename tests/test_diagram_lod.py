@@ -0,0 +1,88 @@
+# tests/test_diagram_lod.py
+from utils.diagram_lod import LOD_THRESHOLD, OTHER_TITLE, _split, cluster_diagram
+from utils.mermaid import parse_flowchart
+
+
+def two_communities(extra=""):
+    """Two groups of 25 densely linked nodes joined by a single labelled edge"""
+    lines = ["graph TD"]
+    for group in "AB":
+        for i in range(25):
+            lines += [f"    {group}{i} --> {group}{j}" for j in range(i + 1, min(i + 4, 25))]
+    lines.append("    A0 -->|bridge| B0")
+    return "\n".join(lines) + extra
+
+
+def teams(count=3, size=15):
+    lines = ["graph LR"]
+    for g in range(count):
+        lines.append(f"  subgraph G{g}[Team {g}]")
+        lines += [f"    G{g}n{i}[n{i}] --> G{g}n{i + 1}" for i in range(size)]
+        lines.append("  end")
+    lines += ["  G0n0 --> G1n0", "  G0n1 --> G1n1"]
+    return "\n".join(lines)
+
+
+def test_small_and_non_flowchart_diagrams_are_not_clustered():
+    assert cluster_diagram("graph TD\n    A --> B") is None
+    assert cluster_diagram("sequenceDiagram\n    A->>B: hi") is None
+    assert cluster_diagram(teams(), threshold=100) is None
+
+
+def test_top_level_subgraphs_become_clusters():
+    clustered = cluster_diagram(teams())
+    assert [(c.title, len(c.nodes)) for c in clustered.clusters] == [("Team 0", 16), ("Team 1", 16), ("Team 2", 16)]
+    overview = clustered.overview()
+    assert overview == ('graph LR\n    cluster1[["Team 0 (16)"]]\n    cluster2[["Team 1 (16)"]]\n'
+                        '    cluster3[["Team 2 (16)"]]\n    cluster1 -->|2 links| cluster2')
+
+
+def test_communities_are_found_without_subgraphs():
+    clustered = cluster_diagram(two_communities("\n    X[Lonely]"))
+    groups = [set(c.nodes) for c in clustered.clusters]
+    # No cluster mixes the two halves, and the isolated node is pooled
+    assert all(len({node[0] for node in group}) == 1 for group in groups)
+    assert clustered.clusters[-1].title == OTHER_TITLE and clustered.clusters[-1].nodes == ["X"]
+    assert sum(len(group) for group in groups) == 51
+    assert "bridge" in clustered.overview()
+
+
+def test_expand_opens_one_cluster_only():
+    clustered = cluster_diagram(two_communities())
+    first, *others = clustered.clusters
+    view = parse_flowchart(clustered.expand(first.id))
+    assert view.subgraphs[0].nodes == first.nodes
+    assert set(view.nodes) == set(first.nodes) | {c.id for c in others}
+    assert not view.issues
+    assert clustered.title(first.id) == f"{first.title} ({len(first.nodes)})"
+
+
+def test_cluster_ids_avoid_existing_nodes():
+    clustered = cluster_diagram(teams() + "\n  G0n0 --> cluster1")
+    assert "cluster1" not in [c.id for c in clustered.clusters]
+    assert clustered.clusters[0].id == "cluster1_"
+
+
+def test_long_chain_is_split_into_connected_pieces():
+    chart = parse_flowchart("graph TD\n" + "\n".join(f"    N{i} --> N{i + 1}" for i in range(99)))
+    pieces = _split(chart, list(chart.nodes))
+    assert [len(piece) for piece in pieces] == [34, 34, 32]
+    assert pieces[0][:3] == ["N0", "N1", "N2"]
+    assert _split(chart, ["N0", "N1"]) == [["N0", "N1"]]
+
+
+def test_oversized_subgraph_is_split_into_parts():
+    diagram = teams(count=1, size=99) + "\n  subgraph Small[Small]\n    S1 --> S2\n  end"
+    clustered = cluster_diagram(diagram)
+    assert [(c.title, len(c.nodes)) for c in clustered.clusters] == [
+        ("Team 0, part 1", 34), ("Team 0, part 2", 34), ("Team 0, part 3", 32), ("Small", 2)]
+    for cluster in clustered.clusters:
+        view = parse_flowchart(clustered.expand(cluster.id))
+        assert len(view.nodes) <= LOD_THRESHOLD + len(clustered.clusters)
+
+
+def test_pool_of_isolated_nodes_is_split():
+    diagram = two_communities("\n" + "\n".join(f"    X{i}[Lonely {i}]" for i in range(90)))
+    pools = [c for c in cluster_diagram(diagram).clusters if c.title.startswith(OTHER_TITLE)]
+    assert [len(c.nodes) for c in pools] == [30, 30, 30]
+    assert pools[0].title == f"{OTHER_TITLE}, part 1"
@@ -0,0 +1,30 @@
+# tests/test_diagram_svg.py
+import pytest
+
+from utils.diagram_svg import MAX_EDGES, MAX_NODES, DiagramTooLarge, render_svg
+
+
+def chain(nodes, extra_edges=0):
+    lines = ["graph TD"] + [f"    N{i}[Node {i}] --> N{i + 1}[Node {i + 1}]" for i in range(nodes - 1)]
+    lines += [f"    N0 --> N{i % nodes}" for i in range(extra_edges)]
+    return "\n".join(lines)
+
+
+def test_renders_flowcharts_only():
+    svg = render_svg("graph LR\n    A[Client] -->|HTTPS| B[(Orders DB)]")
+    assert svg.startswith("<svg") and "Client" in svg and "HTTPS" in svg
+    assert render_svg("sequenceDiagram\n    A->>B: hi") is None
+
+
+def test_label_markup_is_stripped_and_escaped():
+    svg = render_svg('graph TD\n    A["<b>x</b> & y"] --> B')
+    assert "x &amp; y" in svg and "<b>" not in svg
+
+
+def test_limits():
+    assert render_svg(chain(MAX_NODES)) is not None
+    with pytest.raises(DiagramTooLarge) as excinfo:
+        render_svg(chain(MAX_NODES + 1))
+    assert excinfo.value.nodes == MAX_NODES + 1
+    with pytest.raises(DiagramTooLarge):
+        render_svg(chain(10, extra_edges=MAX_EDGES))
@@ -0,0 +1,79 @@
+# tests/test_history.py
+import sqlite3
+
+from utils.history import AnalysisHistory
+from utils.models import Analysis
+
+
+def make_analysis(name="API Gateway", diagram="graph TD\n    A[Client] --> B[API Gateway]"):
+    return Analysis.from_dict({
+        "overview": "Overview",
+        "components": [{
+            "name": name,
+            "purpose": "Routes requests",
+            "steps": [{"step": "1", "action": "Validate tokens", "details": ["JWT checks"]}],
+            "technologies": [{"name": "Amazon API Gateway", "purpose": "Routing", "configuration": "burst 100"}],
+            "data_flow": {"input": "Request", "process": "Route", "output": "Call"},
+        }],
+        "flow_steps": [],
+        "diagram": diagram,
+    })
+
+
+REQUIREMENTS = {"description": "Design a URL shortener", "preferences": {"database": "DynamoDB"}}
+
+
+def test_record_and_get(tmp_path):
+    history = AnalysisHistory(tmp_path / "history.sqlite3")
+    design_id = history.record(REQUIREMENTS, make_analysis(), raw_response="{}", duration_s=1.5, mode="Streaming")
+    record = history.get(design_id)
+    assert record['analysis'] == make_analysis()
+    assert record['preferences'] == {"database": "DynamoDB"} and record['mode'] == "Streaming"
+    assert history.list_recent()[0]['title'] == "Design a URL shortener"
+
+
+def test_same_analysis_is_recorded_once(tmp_path):
+    history = AnalysisHistory(tmp_path / "history.sqlite3")
+    first = history.record(REQUIREMENTS, make_analysis(), mode="Single request")
+    # A cache hit, or a near-duplicate match for other wording, returns the same analysis
+    again = history.record(dict(REQUIREMENTS, description="Design a URL shortener."), make_analysis())
+    assert again == first and history.count() == 1
+    assert history.record(REQUIREMENTS, make_analysis(name="Edge Proxy")) != first
+    assert history.count() == 2
+
+
+def test_old_histories_are_backfilled(tmp_path):
+    path = tmp_path / "history.sqlite3"
+    history = AnalysisHistory(path)
+    first = history.record(REQUIREMENTS, make_analysis())
+    history._conn.execute("UPDATE designs SET analysis_key = NULL")
+    history._conn.commit()
+    history._conn.close()
+
+    reopened = AnalysisHistory(path)
+    assert reopened.record(REQUIREMENTS, make_analysis()) == first
+    assert sqlite3.connect(path).execute("SELECT COUNT(*) FROM designs WHERE analysis_key IS NULL").fetchone() == (0,)
+
+
+def test_search_ranks_and_filters(tmp_path):
+    history = AnalysisHistory(tmp_path / "history.sqlite3")
+    gateway = history.record(REQUIREMENTS, make_analysis())
+    cache = history.record(
+        {"description": "Design a leaderboard", "preferences": {"database": "PostgreSQL"}},
+        make_analysis(name="Redis Cache", diagram="graph TD\n    A[Client] --> R[(Redis Cache)]"),
+    )
+    assert [r['id'] for r in history.search("redis")] == [cache]
+    # The last word matches as a prefix while typing
+    assert [r['id'] for r in history.search("shorte")] == [gateway]
+    assert [r['id'] for r in history.search("client", facets={"database": "PostgreSQL"})] == [cache]
+    assert {r['id'] for r in history.search("", facets={"database": "DynamoDB"})} == {gateway}
+    # FTS5 syntax in user input is treated as text
+    assert history.search('"AND* OR (') == []
+    assert history.facet_values()['database'] == ["DynamoDB", "PostgreSQL"]
+
+
+def test_delete_removes_from_search(tmp_path):
+    history = AnalysisHistory(tmp_path / "history.sqlite3")
+    design_id = history.record(REQUIREMENTS, make_analysis())
+    history.delete(design_id)
+    assert history.search("gateway") == [] and history.get(design_id) is None
@@ -0,0 +1,67 @@
+# tests/test_json_extract.py
+import json
+
+import pytest
+
+from utils.json_extract import (FAST_PATH_FAILURES, JSONExtractionError, TruncatedJSONError, extract_json,
+                                is_truncated, repair_json)
+
+DIAGRAM = "graph TD\n    A[Client] -->|HTTPS| B[API]\n    B --> C[(DB)]"
+
+
+def test_clean_json_with_prose_around_it():
+    assert extract_json('Here you go: {"a": [1, 2]} hope it helps') == {"a": [1, 2]}
+
+
+def test_fenced_object():
+    assert extract_json('```json\n{"a": 1}\n```') == {"a": 1}
+
+
+def test_backtick_diagram_keeps_its_newlines():
+    text = '```json\n{"overview": "x", "diagram": `' + DIAGRAM + '`}\n```'
+    assert extract_json(text)['diagram'] == DIAGRAM
+
+
+def test_raw_control_characters_in_strings():
+    assert extract_json('{"a": "line1\nline2\tend"}') == {"a": "line1\nline2\tend"}
+    assert json.loads(repair_json('{"a": "line1\nline2"}')) == {"a": "line1\nline2"}
+
+
+def test_unescaped_quotes_inside_strings():
+    assert extract_json('{"a": "say "hi" twice", "b": 1}') == {"a": 'say "hi" twice', "b": 1}
+
+
+def test_invalid_escapes():
+    assert extract_json(r'{"path": "C:\windows\temp", "ok": "\n"}') == {"path": "C:\\windows\temp", "ok": "\n"}
+
+
+def test_trailing_and_missing_commas():
+    assert extract_json('{"a": [1, 2,], "b": {"c": 1,},}') == {"a": [1, 2], "b": {"c": 1}}
+    assert extract_json('{"a": 1 "b": "x" "c": [1] "d": {}}') == {"a": 1, "b": "x", "c": [1], "d": {}}
+
+
+def test_valid_nested_values_are_copied_verbatim():
+    text = '{"bad": `x`, "good": {"k": "v\\u00e9", "n": [1.5e3, true, null]}}'
+    assert '{"k": "v\\u00e9", "n": [1.5e3, true, null]}' in repair_json(text)
+    assert extract_json(text)['good'] == {"k": "v\u00e9", "n": [1500.0, True, None]}
+
+
+def test_errors_everywhere_still_repair():
+    items = ', '.join('{"name": "say "hi" now", "tags": ["a",],}' for _ in range(FAST_PATH_FAILURES * 2))
+    data = extract_json('{"items": [' + items + '], "diagram": `graph TD`}')
+    assert len(data['items']) == FAST_PATH_FAILURES * 2
+    assert data['items'][-1] == {"name": 'say "hi" now', "tags": ["a"]}
+
+
+def test_truncation():
+    assert is_truncated('{"a": {"b": [1, 2')
+    assert is_truncated('{"a": "unterminated')
+    assert not is_truncated('{"a": 1}')
+    assert not is_truncated('no json here')
+    with pytest.raises(TruncatedJSONError):
+        extract_json('{"a": [1, 2')
+
+
+def test_no_object():
+    with pytest.raises(JSONExtractionError):
+        extract_json('nothing to see')
@@ -0,0 +1,57 @@
+# tests/test_mermaid.py
+import time
+
+from utils.mermaid import label_needs_quotes, parse_flowchart
+
+
+def test_shapes_labels_comments_and_class_defs():
+    chart = parse_flowchart("graph LR\n  A[Client] -->|HTTPS| B((Gate)) --> C[(DB)]\n  %% note\n"
+                            "  classDef hot fill:#f00\n  class B hot\n")
+    assert chart.direction == "LR"
+    assert [(n.id, n.label, n.shape) for n in chart.nodes.values()] == [
+        ("A", "Client", "rect"), ("B", "Gate", "circle"), ("C", "DB", "cylinder")]
+    assert [(e.source, e.target, e.label) for e in chart.edges] == [("A", "B", "HTTPS"), ("B", "C", "")]
+    assert chart.successors("B") == ["C"] and chart.predecessors("B") == ["A"]
+    assert chart.to_mermaid() == ("graph LR\n    A[Client] -->|HTTPS| B((Gate))\n    B --> C[(DB)]\n"
+                                  "    %% note\n    classDef hot fill:#f00;\n    class B hot;")
+
+
+def test_printing_is_deterministic():
+    collapsed = parse_flowchart("graph TD;A-->B;B-->C").to_mermaid()
+    assert collapsed == "graph TD\n    A --> B\n    B --> C"
+    assert parse_flowchart(collapsed).to_mermaid() == collapsed
+
+
+def test_subgraphs_and_quoted_labels():
+    text = 'graph TD\n subgraph S[Group]\n A --> B\n end\n B -.-> C["x (y)"]\n'
+    chart = parse_flowchart(text)
+    assert chart.subgraphs[0].title == "Group" and chart.subgraphs[0].nodes == ["A", "B"]
+    assert chart.edges[1].arrow == "-.->"
+    assert chart.nodes["C"].label == "x (y)" and label_needs_quotes("x (y)")
+    assert chart.to_mermaid() == ('graph TD\n    subgraph S[Group]\n        A --> B\n    end\n'
+                                  '    B -.-> C["x (y)"]')
+
+
+def test_problems_are_reported_as_issues():
+    chart = parse_flowchart("A --> B")
+    assert [issue.code for issue in chart.issues] == ["missing-header"]
+    chart = parse_flowchart("graph TD\n A[one\n B --> C")
+    assert [(issue.code, issue.line) for issue in chart.issues] == [("unclosed-label", 2)]
+    assert chart.nodes["A"].label == "one"
+
+
+def test_other_diagram_types_pass_through():
+    chart = parse_flowchart("sequenceDiagram\n A->>B: hi")
+    assert chart.source is not None and not chart.nodes
+    assert chart.to_mermaid() == "sequenceDiagram\n A->>B: hi"
+
+
+def test_large_single_line_diagram_is_linear():
+    text = "graph TD; " + "; ".join(f"N{i}[Node {i}] -->|step {i}| N{i + 1}" for i in range(2000))
+    start = time.perf_counter()
+    chart = parse_flowchart(text)
+    formatted = chart.to_mermaid()
+    elapsed = time.perf_counter() - start
+    assert len(chart.edges) == 2000 and len(chart.nodes) == 2001
+    assert formatted.count("\n") == 2000
+    assert elapsed < 1.0
@@ -0,0 +1,69 @@
+# tests/test_mermaid_assets.py
+import json
+
+import pytest
+
+from utils.mermaid_assets import (BUNDLE_NAME, CDN_URL, MANIFEST_NAME, MERMAID_VERSION, STATIC_ROOT,
+                                  AssetIntegrityError, BundleNotFoundError, load_mermaid_bundle, mermaid_iframe_html,
+                                  mermaid_script_tag, sri_hash, static_url, verify_integrity)
+
+BUNDLE = b"var mermaid={initialize:function(){}};"
+
+
+def vendor(directory, data=BUNDLE, integrity=None):
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / BUNDLE_NAME).write_bytes(data)
+    (directory / MANIFEST_NAME).write_text(json.dumps({"integrity": integrity or sri_hash(data)}))
+    return str(directory)
+
+
+def test_missing_bundle_fails_loudly(tmp_path):
+    with pytest.raises(BundleNotFoundError, match="scripts.vendor_mermaid"):
+        load_mermaid_bundle(str(tmp_path))
+
+
+def test_missing_bundle_falls_back_to_the_pinned_cdn(tmp_path):
+    tag = mermaid_script_tag(str(tmp_path))
+    assert f'src="{CDN_URL}"' in tag and f"mermaid@{MERMAID_VERSION}/" in CDN_URL
+    assert "integrity" not in tag
+    # A committed manifest pins the CDN copy as well
+    (tmp_path / MANIFEST_NAME).write_text(json.dumps({"integrity": sri_hash(BUNDLE)}))
+    assert f'integrity="{sri_hash(BUNDLE)}"' in mermaid_script_tag(str(tmp_path))
+
+
+def test_cdn_is_used_when_static_serving_is_off(tmp_path):
+    tag = mermaid_script_tag(vendor(tmp_path / "9.3.0"), static_serving=False)
+    assert f'src="{CDN_URL}" integrity="{sri_hash(BUNDLE)}"' in tag
+
+
+def test_tampered_bundle_is_refused(tmp_path):
+    directory = vendor(tmp_path / "9.3.0", integrity=sri_hash(b"something else"))
+    with pytest.raises(AssetIntegrityError):
+        load_mermaid_bundle(directory)
+    # Never swapped for the CDN copy
+    with pytest.raises(AssetIntegrityError):
+        mermaid_script_tag(directory)
+
+
+def test_missing_manifest_is_refused(tmp_path):
+    directory = vendor(tmp_path / "9.3.0")
+    (tmp_path / "9.3.0" / MANIFEST_NAME).unlink()
+    with pytest.raises(AssetIntegrityError, match="manifest"):
+        load_mermaid_bundle(directory)
+
+
+def test_unsupported_integrity_algorithm():
+    with pytest.raises(AssetIntegrityError):
+        verify_integrity(BUNDLE, "md5-abc")
+
+
+def test_script_tag_references_the_bundle_instead_of_inlining_it(tmp_path):
+    directory = vendor(tmp_path / "9.3.0")
+    tag = mermaid_script_tag(directory)
+    assert f'integrity="{sri_hash(BUNDLE)}"' in tag
+    assert 'src="app/static/' in tag and BUNDLE.decode() not in tag
+    assert len(mermaid_iframe_html("graph TD\n    A --> B", tag)) < 2048
+
+
+def test_static_url_is_relative_to_the_static_root():
+    assert static_url(f"{STATIC_ROOT}/vendor/mermaid/9.3.0/{BUNDLE_NAME}") == f"app/static/vendor/mermaid/9.3.0/{BUNDLE_NAME}"
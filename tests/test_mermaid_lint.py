@@ -0,0 +1,69 @@
+# tests/test_mermaid_lint.py
+from utils.mermaid_lint import LintResult, lint_diagram
+
+
+def codes(result):
+    return [(d.line, d.code, d.fixed) for d in result.diagnostics]
+
+
+def test_front_matter_is_removed():
+    result = lint_diagram("---\nconfig:\n  theme: dark\n---\ngraph TD\n A --> B")
+    assert result.diagram == "graph TD\n    A --> B"
+    assert codes(result) == [(1, "front-matter", True)]
+    assert not result.needs_repair
+
+
+def test_unclosed_label_is_closed_at_the_end_of_the_line():
+    result = lint_diagram("graph TD\n A[one\n B --> C")
+    assert result.diagram == "graph TD\n    A[one]\n    B --> C"
+    assert codes(result) == [(2, "unclosed-label", True)]
+
+
+def test_dangling_arrow_is_removed():
+    result = lint_diagram("graph TD\n --> B\n A --> B")
+    assert result.diagram == "graph TD\n    B\n    A --> B"
+    assert codes(result) == [(2, "dangling-arrow", True)]
+
+
+def test_unclosed_edge_label_needs_repair():
+    result = lint_diagram("graph TD\n    A -->|x B")
+    assert result.needs_repair
+    assert [d for d in result.problems if d.severity == "error"]
+
+
+def test_reserved_and_clashing_ids_are_renamed():
+    assert lint_diagram("graph TD\n A --> end").diagram == "graph TD\n    A --> EndNode[end]"
+    result = lint_diagram("graph TD\n subgraph A\n A --> B\n end")
+    assert result.diagram == "graph TD\n    subgraph A_group[A]\n        A --> B\n    end"
+    assert codes(result) == [(2, "duplicate-id", True)]
+
+
+def test_ids_with_spaces_are_joined():
+    result = lint_diagram("graph TD\n Client --> API Gateway")
+    assert result.diagram == "graph TD\n    Client --> API_Gateway[API Gateway]"
+    assert codes(result) == [(2, "id-with-spaces", True)]
+
+
+def test_labels_with_syntax_characters_are_quoted():
+    result = lint_diagram('graph TD\n A[Say "hi"] --> B[a (b)]')
+    assert result.diagram == 'graph TD\n    A["Say #quot;hi#quot;"] --> B["a (b)"]'
+    assert [d.code for d in result.diagnostics] == ["label-chars", "label-chars"]
+
+
+def test_misspelled_references_use_the_defined_id():
+    result = lint_diagram("graph TD\n api-gw --> B\n API_GW[Gateway] --> C")
+    assert result.diagram == "graph TD\n    API_GW[Gateway] --> B\n    API_GW --> C"
+    assert codes(result) == [(2, "undefined-id", True)]
+
+
+def test_unclosed_subgraph_and_empty_diagram():
+    assert lint_diagram("graph TD\n subgraph S\n A --> B").diagram.endswith("\n    end")
+    result = lint_diagram("graph TD\n")
+    assert result.needs_repair and codes(result) == [(1, "empty", False)]
+
+
+def test_other_diagrams_are_left_alone_and_results_serialize():
+    assert lint_diagram("sequenceDiagram\n A->>B: hi").diagnostics == []
+    result = lint_diagram("graph TD\n A[one\n B --> C")
+    assert LintResult.from_dict(result.to_dict()) == result
+    assert str(result.diagnostics[0]).startswith("line 2: error:")
@@ -0,0 +1,61 @@
+# tests/test_models.py
+import json
+
+import pytest
+
+from utils.models import Analysis, Component
+
+DATA = {
+    "overview": "Order pipeline",
+    "components": [{
+        "name": "API",
+        "purpose": "Entry point",
+        "steps": [{"step": 1, "action": "Receive", "details": ["TLS", "Auth"]}],
+        "technologies": [{"name": "Nginx", "purpose": "Proxy", "configuration": "workers=4"}],
+        "data_flow": {"input": "Request", "process": "Route", "output": "Response"},
+    }],
+    "flow_steps": [{"step": "1", "title": "Start", "description": "Client calls", "technical_details": ["HTTPS"]}],
+    "diagram": "graph TD\n    A --> B",
+}
+
+
+def test_from_dict_gives_typed_attribute_access():
+    analysis = Analysis.from_dict(DATA)
+    component = analysis.components[0]
+    assert component.steps[0].step == "1"
+    assert component.steps[0].details == ("TLS", "Auth")
+    assert component.technologies[0].configuration == "workers=4"
+    assert component.data_flow.input == "Request"
+    assert analysis.flow_steps[0].technical_details == ("HTTPS",)
+    assert not hasattr(component, "__dict__")
+
+
+def test_missing_and_malformed_values_are_normalized():
+    component = Component.from_dict({"name": "Queue", "steps": "none", "technologies": [None],
+                                     "data_flow": ["wrong"]})
+    assert component.purpose == ""
+    assert component.steps == ()
+    assert component.technologies[0].name == ""
+    assert component.data_flow.output == ""
+    analysis = Analysis.from_dict({"components": [None]})
+    assert analysis.overview == "" and analysis.flow_steps == ()
+    assert analysis.components[0].name == ""
+
+
+def test_non_object_is_rejected():
+    with pytest.raises(ValueError, match="got list"):
+        Analysis.from_dict([DATA])
+
+
+def test_to_dict_round_trips_normalized_data():
+    analysis = Analysis.from_dict(DATA)
+    assert Analysis.from_dict(analysis.to_dict()) == analysis
+    assert analysis.to_dict()["components"][0]["steps"][0]["step"] == "1"
+
+
+def test_compact_round_trip_is_smaller():
+    analysis = Analysis.from_dict(dict(DATA, overview="Überblick"))
+    compact = analysis.to_compact()
+    assert Analysis.from_compact(compact) == analysis
+    assert "Überblick" in compact
+    assert len(compact) < len(json.dumps(analysis.to_dict()))
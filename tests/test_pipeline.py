@@ -0,0 +1,115 @@
+# tests/test_pipeline.py
+import threading
+
+import pytest
+
+from utils.ai_processor import AIProcessor, ProcessorConfig, ResponseCache
+from utils.pipeline import AnalysisPipeline
+
+REQUIREMENTS = {"description": "Design a URL shortener", "preferences": {"database": "DynamoDB"}}
+
+SKELETON = {
+    "overview": "Shortener",
+    "components": [{"name": "API", "purpose": "Routes"}, {"name": "Store", "purpose": "Persists"}],
+    "flow_steps": [],
+}
+DETAILS = {
+    "steps": [{"step": "1", "action": "Handle", "details": ["Validate"]}],
+    "technologies": [{"name": "Lambda", "purpose": "Compute", "configuration": "512 MB"}],
+    "data_flow": {"input": "Request", "process": "Shorten", "output": "Code"},
+}
+DIAGRAM = {"diagram": "graph TD\n    API[API] --> Store[(Store)]"}
+
+
+def make_pipeline(tmp_path, answer, **config):
+    processor = AIProcessor(ProcessorConfig(api_key="test", **config), cache=ResponseCache(tmp_path / "cache.sqlite3"))
+    processor.request_json = lambda prompt, max_tokens=None: answer(prompt)
+    return AnalysisPipeline(processor)
+
+
+def answers(skeleton=SKELETON, details=DETAILS, broken=()):
+    def answer(prompt):
+        if prompt.startswith("Analyze"):
+            return skeleton
+        if prompt.startswith("Draw"):
+            return DIAGRAM
+        name = prompt.split("Component: ", 1)[1].split("\n", 1)[0]
+        return {"steps": "not a list"} if name in broken else details
+    return answer
+
+
+def test_fans_out_and_merges(tmp_path):
+    result = make_pipeline(tmp_path, answers()).analyze(REQUIREMENTS)
+    assert [c['name'] for c in result['components']] == ["API", "Store"]
+    assert result['components'][1]['technologies'][0]['name'] == "Lambda"
+    assert result['diagram'].startswith("graph TD")
+
+
+def test_workers_follow_max_concurrency(tmp_path):
+    assert make_pipeline(tmp_path, answers(), max_concurrency=3).max_workers == 3
+
+
+def test_malformed_skeleton_fails_before_fanning_out(tmp_path):
+    requests = []
+
+    def answer(prompt):
+        requests.append(prompt)
+        return {"overview": "x", "components": ["API", "Store"]}
+
+    with pytest.raises(Exception, match=r"components\[0\]"):
+        make_pipeline(tmp_path, answer).analyze(REQUIREMENTS)
+    assert len(requests) == 1
+
+
+def test_malformed_details_degrade_one_component(tmp_path):
+    result = make_pipeline(tmp_path, answers(broken={"Store"})).analyze(REQUIREMENTS)
+    api, store = result['components']
+    assert api['steps'] and not store['steps']
+    assert "Schema validation failed" in store['data_flow']['process']
+
+
+def test_fan_out_is_concurrent(tmp_path):
+    barrier = threading.Barrier(3, timeout=5)
+
+    def answer(prompt):
+        if not prompt.startswith("Analyze"):
+            # Both components and the diagram must be in flight together
+            barrier.wait()
+        return answers()(prompt)
+
+    assert make_pipeline(tmp_path, answer).analyze(REQUIREMENTS)['components']
+
+
+def test_degraded_result_is_not_cached(tmp_path):
+    requests = []
+
+    def answer(prompt):
+        requests.append(prompt)
+        return answers(broken={"Store"})(prompt)
+
+    pipeline = make_pipeline(tmp_path, answer)
+    result = pipeline.analyze(REQUIREMENTS)
+    assert result['partial']
+    # The initial attempt and one retry for Store, each time
+    assert sum("Component: Store" in prompt for prompt in requests) == 2
+    first = len(requests)
+    assert pipeline.analyze(REQUIREMENTS)['partial']
+    assert len(requests) == 2 * first
+
+
+def test_transient_failure_is_retried_and_cached(tmp_path):
+    failures = {"Store": 1}
+
+    def answer(prompt):
+        name = prompt.split("Component: ", 1)[1].split("\n", 1)[0] if "Component: " in prompt else None
+        if failures.get(name):
+            failures[name] -= 1
+            raise ConnectionError("reset")
+        return answers()(prompt)
+
+    pipeline = make_pipeline(tmp_path, answer)
+    result = pipeline.analyze(REQUIREMENTS)
+    assert 'partial' not in result
+    assert result['components'][1]['technologies'][0]['name'] == "Lambda"
+    pipeline.processor.request_json = None
+    assert pipeline.analyze(REQUIREMENTS) == result
@@ -0,0 +1,86 @@
+# tests/test_rate_limit.py
+import asyncio
+
+import pytest
+
+from utils import rate_limit
+from utils.rate_limit import RateLimiter, TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock that asyncio.sleep advances instead of waiting"""
+    state = {"now": 1000.0, "slept": 0.0}
+
+    async def sleep(seconds):
+        state["now"] += seconds
+        state["slept"] += seconds
+
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: state["now"])
+    monkeypatch.setattr(rate_limit.asyncio, "sleep", sleep)
+    return state
+
+
+def test_bucket_queues_once_empty(clock):
+    bucket = TokenBucket(2, period=60)
+
+    async def take(n):
+        for _ in range(n):
+            await bucket.acquire()
+
+    asyncio.run(take(2))
+    assert clock["slept"] == 0
+    asyncio.run(take(1))
+    assert clock["slept"] == pytest.approx(30)
+
+
+def test_oversized_request_is_capped_at_capacity(clock):
+    bucket = TokenBucket(100, period=60)
+    asyncio.run(bucket.acquire(1000))
+    assert clock["slept"] == 0
+    assert bucket.level == pytest.approx(0)
+
+
+def test_adjust_refunds_up_to_capacity_and_charges_below_zero(clock):
+    bucket = TokenBucket(60, period=60)
+    asyncio.run(bucket.acquire(10))
+    bucket.adjust(50)
+    assert bucket.level == 60
+    bucket.adjust(-90)
+    assert bucket.level == pytest.approx(-30)
+    asyncio.run(bucket.acquire(1))
+    assert clock["slept"] == pytest.approx(31)
+
+
+def test_drain_delays_the_next_acquire(clock):
+    bucket = TokenBucket(60, period=60)
+    bucket.drain(10)
+    asyncio.run(bucket.acquire(1))
+    assert clock["slept"] == pytest.approx(11)
+
+
+def test_limiter_reconciles_usage_and_counts_throttling(clock):
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=1000)
+    asyncio.run(limiter.acquire(400))
+    limiter.record_usage(400, 900)
+    assert limiter.tokens.level == pytest.approx(100)
+    # Unknown usage leaves the estimate in place
+    limiter.record_usage(400, None)
+    assert limiter.tokens.level == pytest.approx(100)
+    asyncio.run(limiter.acquire(400))
+    assert limiter.throttled_seconds == pytest.approx(18)
+
+
+def test_back_off_pauses_both_buckets(clock):
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=6000)
+    limiter.back_off(5)
+    asyncio.run(limiter.acquire(100))
+    assert limiter.throttled_seconds == pytest.approx(6)
+
+
+def test_unlimited_limiter_never_waits(clock):
+    limiter = RateLimiter()
+    asyncio.run(limiter.acquire(10 ** 9))
+    limiter.record_usage(1, 2)
+    limiter.back_off(60)
+    assert limiter.throttled_seconds == 0 and clock["slept"] == 0
@@ -0,0 +1,48 @@
+# tests/test_response_cache.py
+from utils.ai_processor import AIProcessor, ProcessorConfig, ResponseCache, prompt_template_id
+
+
+def make_processor(tmp_path):
+    config = ProcessorConfig(api_key="test", similarity_threshold=None)
+    return AIProcessor(config, cache=ResponseCache(tmp_path / "cache.sqlite3"))
+
+
+def key_for(processor, requirements, build_prompt):
+    template = prompt_template_id(build_prompt, requirements)
+    return ResponseCache.make_key(requirements, processor.config.model, processor.config.temperature, template)
+
+
+def test_description_whitespace_does_not_change_the_key(tmp_path):
+    processor = make_processor(tmp_path)
+    preferences = {"database": "DynamoDB"}
+    spaced = {"description": "Design  a URL\nshortener ", "preferences": preferences}
+    plain = {"description": "Design a URL shortener", "preferences": preferences}
+    assert key_for(processor, spaced, processor._generate_prompt) == key_for(processor, plain, processor._generate_prompt)
+
+
+def test_template_preferences_and_wording_change_the_key(tmp_path):
+    processor = make_processor(tmp_path)
+    requirements = {"description": "Design a URL shortener", "preferences": {"database": "DynamoDB"}}
+    other = {"description": "Design a URL shortener", "preferences": {"database": "PostgreSQL"}}
+    single = key_for(processor, requirements, processor._generate_prompt)
+    assert single != key_for(processor, requirements, processor._generate_structured_prompt)
+    assert single != key_for(processor, other, processor._generate_prompt)
+    assert single != key_for(processor, {"description": "Design a chat app", "preferences": {}},
+                             processor._generate_prompt)
+
+
+def test_put_get_and_lru_cap(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite3", max_entries=2)
+    cache.put("a", {"overview": "a"})
+    cache.put("b", {"overview": "b"})
+    assert cache.get("a") == {"overview": "a"}
+    cache.put("c", {"overview": "c"})
+    # b was the least recently used
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_expired_entries_miss(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite3", ttl_seconds=-1)
+    cache.put("a", {"overview": "a"})
+    assert cache.get("a") is None
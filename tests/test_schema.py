@@ -0,0 +1,67 @@
+# tests/test_schema.py
+import json
+
+from utils.schema import (ANALYSIS_VALIDATOR, COMPONENT_SCHEMA, Validator, format_path, outline,
+                          outline_json)
+
+COMPONENT = {
+    "name": "API",
+    "purpose": "Entry point",
+    "steps": [{"step": 1, "action": "Receive", "details": ["TLS"]}],
+    "technologies": [{"name": "Nginx", "purpose": "Proxy", "configuration": "workers=4"}],
+    "data_flow": {"input": "Request", "process": "Route", "output": "Response"},
+}
+
+
+def analysis(**overrides):
+    data = {"overview": "x", "components": [dict(COMPONENT)], "diagram": "graph TD\n    A --> B"}
+    data.update(overrides)
+    return data
+
+
+def paths(errors):
+    return [format_path(error.path) for error in errors]
+
+
+def test_valid_analysis_has_no_errors():
+    assert ANALYSIS_VALIDATOR.validate(analysis()) == []
+    # flow_steps is optional, but checked when present
+    assert ANALYSIS_VALIDATOR.validate(analysis(flow_steps=[])) == []
+
+
+def test_errors_point_at_the_failing_subtree():
+    component = dict(COMPONENT, data_flow={"input": "Request", "process": "Route"})
+    component["technologies"] = [{"name": "Nginx", "purpose": "Proxy"}]
+    errors = ANALYSIS_VALIDATOR.validate(analysis(components=[dict(COMPONENT), component]))
+    assert paths(errors) == ["$.components[1].technologies[0].configuration",
+                             "$.components[1].data_flow.output"]
+    assert str(errors[0]).endswith("missing required key")
+
+
+def test_every_error_is_collected():
+    errors = ANALYSIS_VALIDATOR.validate({"overview": 3, "components": []})
+    assert paths(errors) == ["$.diagram", "$.overview", "$.components"]
+    assert "expected at least 1 items" in errors[-1].message
+
+
+def test_bool_is_not_a_number_and_unions_accept_either():
+    steps = Validator(COMPONENT_SCHEMA["properties"]["steps"])
+    assert steps.validate([{"step": "1a", "action": "a", "details": []}]) == []
+    errors = steps.validate([{"step": True, "action": "a", "details": []}])
+    assert paths(errors) == ["$[0].step"]
+    assert errors[0].message == "expected string or number, got bool"
+
+
+def test_wrong_container_type_stops_descent():
+    errors = ANALYSIS_VALIDATOR.validate(analysis(components={"name": "API"}))
+    assert paths(errors) == ["$.components"]
+    assert ANALYSIS_VALIDATOR.validate(analysis(), path=("root",)) == []
+    assert paths(ANALYSIS_VALIDATOR.validate([], path=("root",))) == ["$.root"]
+
+
+def test_outline_describes_the_shape():
+    shape = outline(COMPONENT_SCHEMA)
+    assert shape["steps"] == [{"step": "string", "action": "string", "details": ["string"]}]
+    assert shape["data_flow"] == {"input": "string", "process": "string", "output": "string"}
+    assert json.loads(outline_json(COMPONENT_SCHEMA)) == shape
+    assert " " not in outline_json(COMPONENT_SCHEMA)
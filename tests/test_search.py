@@ -0,0 +1,38 @@
+# tests/test_search.py
+from utils.models import Analysis
+from utils.search import build_match_query, diagram_labels, facet_token, search_document
+
+
+def test_facet_token_is_one_alphanumeric_word():
+    assert facet_token("cloud_provider", "Google Cloud") == "cloudprovidergooglecloud"
+
+
+def test_diagram_labels_cover_every_shape():
+    diagram = 'graph TD\n    A[Client] --> B((Gateway))\n    B --> C[(Orders DB)]\n    C --> D{"Valid?"}'
+    assert diagram_labels(diagram) == ["Client", "Gateway", "Orders DB", "Valid?"]
+    assert diagram_labels(None) == []
+
+
+def test_match_query_quotes_terms_and_prefixes_the_last():
+    query = build_match_query('redis "AND* OR (cache', {"database": "PostgreSQL", "frontend": ""})
+    terms = query.split(" AND ")
+    assert len(terms) == 5
+    assert terms[0].endswith(': "redis"') and terms[3].endswith(': "cache"*')
+    assert terms[4] == 'facets:"databasepostgresql"'
+    assert build_match_query("  ()* ") is None
+
+
+def test_search_document_flattens_the_analysis():
+    analysis = Analysis.from_dict({
+        "components": [{
+            "name": "Cache",
+            "steps": [{"action": "Lookup", "details": ["TTL 60s"]}],
+            "technologies": [{"name": "Redis", "purpose": "Hot keys"}],
+        }],
+        "diagram": "graph TD\n    A[Client] --> B[Cache]",
+    })
+    document = search_document("Title", analysis, {"database": "PostgreSQL", "frontend": None})
+    assert document["components"] == "Cache" and document["technologies"] == "Redis"
+    assert document["details"] == "Hot keys\nLookup\nTTL 60s"
+    assert document["diagram"] == "Client\nCache"
+    assert document["facets"] == "databasepostgresql"
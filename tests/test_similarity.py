@@ -0,0 +1,87 @@
+# tests/test_similarity.py
+import random
+
+import pytest
+
+from utils.ai_processor import AIProcessor, ProcessorConfig, ResponseCache
+from utils.similarity import MinHasher, NearDuplicateIndex, lsh_bands, normalize_description, shingles
+
+BASE = ("Design a URL shortening service where a user enters a long URL in a React form, "
+        "processed through API Gateway and stored in DynamoDB")
+
+
+def jaccard(first, second):
+    a, b = shingles(first), shingles(second)
+    return len(a & b) / len(a | b)
+
+
+def test_normalize_and_shingles():
+    assert normalize_description("  Hello,   WORLD!\n") == "hello world"
+    assert shingles("abc") == {"abc"}
+    assert shingles("") == set()
+    assert shingles("abcdef", size=5) == {"abcde", "bcdef"}
+
+
+def test_minhash_estimates_jaccard():
+    hasher = MinHasher(num_perm=256)
+    other = BASE.replace("React form", "Vue page")
+    estimate = MinHasher.similarity(hasher.signature(BASE), hasher.signature(other))
+    assert abs(estimate - jaccard(BASE, other)) < 0.1
+    assert MinHasher.similarity(hasher.signature(BASE), hasher.signature(BASE + " ")) == 1.0
+
+
+def test_signature_round_trips_through_bytes():
+    signature = MinHasher(num_perm=16).signature(BASE)
+    assert MinHasher.from_bytes(MinHasher.to_bytes(signature)) == signature
+
+
+def test_empty_text_has_a_signature():
+    assert len(MinHasher(num_perm=8).signature("")) == 8
+
+
+@pytest.mark.parametrize("threshold", [0.5, 0.7, 0.9])
+def test_lsh_bands_fit_the_signature(threshold):
+    bands, rows = lsh_bands(128, threshold)
+    assert bands * rows <= 128
+    # Candidate probability crosses one half near the threshold
+    crossing = (1 - 0.5 ** (1 / bands)) ** (1 / rows)
+    assert abs(crossing - threshold) < 0.15
+
+
+def test_index_scopes_threshold_and_removal():
+    hasher = MinHasher()
+    index = NearDuplicateIndex(threshold=0.8)
+    index.add("a", "scope1", hasher.signature(BASE))
+    index.add("b", "scope1", hasher.signature("Design a chat application with presence"))
+    near = hasher.signature(BASE + " with rate limiting")
+
+    matches = index.query("scope1", near)
+    assert [key for key, _ in matches] == ["a"]
+    assert index.query("scope2", near) == []
+    assert index.query("scope1", near, exclude="a") == []
+    index.remove("a")
+    assert index.query("scope1", near) == [] and len(index) == 1
+
+
+def test_lookup_never_crosses_prompt_templates(tmp_path):
+    config = ProcessorConfig(api_key="test", similarity_threshold=0.9)
+    processor = AIProcessor(config, cache=ResponseCache(tmp_path / "cache.sqlite3"))
+    first = {"description": BASE, "preferences": {"database": "DynamoDB"}}
+    second = {"description": BASE + ".", "preferences": {"database": "DynamoDB"}}
+    processor.remember("single-key", first, {"overview": "single"}, "single-template")
+
+    assert processor.lookup(second, "structured-key", "structured-template") is None
+    assert processor.lookup(second, "other-key", "single-template") == {"overview": "single"}
+
+
+def test_reuse_is_off_by_default(tmp_path):
+    processor = AIProcessor(ProcessorConfig(api_key="test"), cache=ResponseCache(tmp_path / "cache.sqlite3"))
+    requirements = {"description": BASE, "preferences": {}}
+    processor.remember("key", requirements, {"overview": "x"}, "template")
+    assert processor.similar is None
+    assert processor.lookup(requirements, "other-key", "template") is None
+
+
+def test_minhash_is_deterministic_across_instances():
+    text = ' '.join(random.Random(1).choice(["api", "cache", "queue", "db"]) for _ in range(50))
+    assert MinHasher(seed=3).signature(text) == MinHasher(seed=3).signature(text)
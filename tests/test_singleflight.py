@@ -0,0 +1,90 @@
+# tests/test_singleflight.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"items": [1]}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", work)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("k", work))) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while flight.coalesced < 4 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert len(calls) == 1 and len(results) == 5
+    assert flight.stats() == {"executed": 1, "coalesced": 4, "in_flight": 0}
+    # Followers get copies; mutating one does not touch the others
+    results[1]["items"].append(2)
+    assert sum(len(r["items"]) for r in results) == 6
+
+
+def test_errors_reach_every_caller_and_the_key_is_released():
+    flight = SingleFlight()
+    call, leader = flight.begin("k")
+    follower, is_leader = flight.begin("k")
+    assert leader and not is_leader and follower is call
+    flight.finish("k", call, error=ValueError("boom"))
+    with pytest.raises(ValueError):
+        follower.wait()
+    assert flight.do("k", lambda: 3) == 3
+
+
+def test_async_followers_share_and_survive_cancellation():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return [1]
+
+    async def scenario():
+        leader = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(flight.do("k", work))
+        follower = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        return await leader, await follower
+
+    first, second = asyncio.run(scenario())
+    assert first == second == [1] and first is not second
+    assert len(calls) == 1 and flight.coalesced == 2
+
+
+def test_async_errors_propagate():
+    flight = AsyncSingleFlight()
+
+    async def fail():
+        raise KeyError("x")
+
+    with pytest.raises(KeyError):
+        asyncio.run(flight.do("k", fail))
+
+    async def ok():
+        return 1
+
+    assert asyncio.run(flight.do("k", ok)) == 1
@@ -0,0 +1,80 @@
+# tests/test_stream_parser.py
+import json
+
+import pytest
+
+from utils.stream_parser import IncrementalAnalysisParser
+
+ANALYSIS = {
+    "overview": "Routes {requests} with \"quotes\"",
+    "components": [
+        {"name": "API", "steps": [{"details": ["a } b", "[x]"]}]},
+        {"name": "DB", "data_flow": {"input": "row"}},
+    ],
+    "flow_steps": [{"step": "1"}],
+}
+DIAGRAM = "graph TD\n    A{Decide} --> B[\"x\"]"
+
+
+def response():
+    body = json.dumps(ANALYSIS, indent=2)[:-2] + ',\n  "diagram": `' + DIAGRAM + '`\n}'
+    return "Sure! Here is the design:\n```json\n" + body + "\n```\ntrailing { prose"
+
+
+def feed_all(text, size):
+    parser = IncrementalAnalysisParser()
+    events = []
+    for i in range(0, len(text), size):
+        events.extend(parser.feed(text[i:i + size]))
+    return parser, events
+
+
+@pytest.mark.parametrize("size", [1, 7, 10_000])
+def test_events_in_order_whatever_the_chunking(size):
+    parser, events = feed_all(response(), size)
+    assert events == [
+        ("overview", ANALYSIS["overview"]),
+        ("component", ANALYSIS["components"][0]),
+        ("component", ANALYSIS["components"][1]),
+        ("diagram", DIAGRAM),
+    ]
+    assert parser.finished
+
+
+
+def test_text_can_be_read_while_streaming():
+    text = response()
+    parser = IncrementalAnalysisParser()
+    events = []
+    for i in range(0, len(text), 3):
+        events.extend(parser.feed(text[i:i + 3]))
+        # Reading text joins what has been fed without disturbing later slices
+        if not parser.finished:
+            assert parser.text == text[:i + 3]
+    assert [kind for kind, _ in events] == ["overview", "component", "component", "diagram"]
+    assert events[2] == ("component", ANALYSIS["components"][1])
+
+def test_component_is_emitted_as_soon_as_it_closes():
+    text = response()
+    cut = text.index('"DB"')
+    parser = IncrementalAnalysisParser()
+    kinds = [kind for kind, _ in parser.feed(text[:cut])]
+    assert kinds == ["overview", "component"]
+    assert not parser.finished
+
+
+def test_nothing_after_the_object_is_read():
+    parser, _ = feed_all(response(), 50)
+    assert parser.feed('{"overview": "again"}') == []
+
+
+def test_malformed_component_is_left_for_the_final_parse():
+    parser = IncrementalAnalysisParser()
+    events = parser.feed('{"components": [{"name": "A",}, {"name": "B"}]}')
+    assert events == [("component", {"name": "B"})]
+    assert parser.text.endswith("]}")
+
+
+def test_escaped_quotes_do_not_end_strings():
+    parser = IncrementalAnalysisParser()
+    assert parser.feed('{"overview": "say \\"}\\" now"}') == [("overview", 'say "}" now')]
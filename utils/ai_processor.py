@@ -107,33 +107,722 @@
 
 
 # utils/ai_processor.py
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
 import groq
-import streamlit as st
+import httpx
+from utils.json_extract import JSONExtractionError, extract_json, is_truncated
+from utils.mermaid_lint import LintResult, lint_diagram
+from utils.rate_limit import RateLimiter
+from utils.similarity import MinHasher, NearDuplicateIndex
+from utils.schema import ANALYSIS_SCHEMA, ANALYSIS_VALIDATOR, COMPONENT_SCHEMA, Validator, format_path, outline_json
+from utils.singleflight import AsyncSingleFlight, SingleFlight
+from utils.stream_parser import IncrementalAnalysisParser
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
 import json
-import re
 
-class AIProcessor:
+DEFAULT_CACHE_PATH = Path(".cache") / "analysis_cache.sqlite3"
+DIAGRAM_REPAIR_MAX_TOKENS = 3000
+SUBTREE_MAX_TOKENS = 1500
+
+
+
+def prompt_template_id(build_prompt: Callable[[Dict[str, Any]], str], requirements: Dict[str, Any]) -> str:
+    """
+    Fingerprint of a prompt builder's wording: the prompt rendered around a
+    placeholder description, hashed. Editing the template changes it; the
+    description's whitespace does not.
+    """
+    rendered = build_prompt({**requirements, 'description': '{description}'})
+    return hashlib.sha256(rendered.encode('utf-8')).hexdigest()[:16]
+
+class ResponseCache:
+    """
+    Disk-backed LRU cache of parsed analyses with a TTL and an entry cap
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=500, ttl_seconds=7 * 24 * 3600):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)"
+        )
+        # MinHash signature of the request behind each response, for near-duplicate lookups
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS signatures (
+                key TEXT PRIMARY KEY,
+                scope TEXT NOT NULL,
+                signature BLOB NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(requirements: Dict[str, Any], model: str, temperature: float, template: str) -> str:
+        """
+        Hash everything that influences the completion into a stable key.
+        template identifies the prompt wording (see prompt_template_id); the
+        rendered prompt itself is left out, since it embeds the raw
+        description and would undo the whitespace normalization.
+        """
+        description = ' '.join(requirements.get('description', '').split())
+        payload = json.dumps(
+            {
+                "description": description,
+                "preferences": requirements.get('preferences', {}),
+                "model": model,
+                "temperature": temperature,
+                "template": template,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                # Expired entries count as a miss and are dropped eagerly
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(value)
+
+    def put(self, key: str, value: Dict[str, Any], scope: Optional[str] = None, signature: Optional[bytes] = None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            if signature is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO signatures (key, scope, signature) VALUES (?, ?, ?)",
+                    (key, scope or '', signature),
+                )
+            # Drop expired entries, then the least recently used ones over the cap
+            self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+            self._conn.execute(
+                """DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,),
+            )
+            self._conn.execute(
+                "DELETE FROM signatures WHERE key NOT IN (SELECT key FROM responses)"
+            )
+            self._conn.commit()
+
+    def signatures(self) -> List[Tuple[str, str, bytes]]:
+        """(key, scope, signature) of every cached response recorded with one"""
+        with self._lock:
+            return self._conn.execute("SELECT key, scope, signature FROM signatures").fetchall()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.execute("DELETE FROM signatures")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": size}
+
+
+@dataclass
+class ProcessorConfig:
+    """Everything AIProcessor needs to talk to the API, injected by the caller"""
+    api_key: str
+    base_url: Optional[str] = None
+    model: str = "llama-3.3-70b-versatile"
+    temperature: float = 0.1
+    max_tokens: int = 4000
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 120.0
+    timeout: float = 120.0
+    connect_timeout: float = 10.0
+    # Used by AsyncAIProcessor; None disables the corresponding limit
+    max_concurrency: int = 4
+    requests_per_minute: Optional[int] = 30
+    tokens_per_minute: Optional[int] = None
+    max_rate_limit_retries: int = 5
+    # Follow-up requests allowed to finish a response cut off at max_tokens
+    max_continuations: int = 2
+    # Serve the cached analysis of an earlier request whose description is at
+    # least this similar (estimated Jaccard over shingles); None disables.
+    # Off by default: character shingles cannot tell "with analytics" from
+    # "without analytics" (about 0.93), so any value is a trade-off
+    similarity_threshold: Optional[float] = None
+    similarity_num_perm: int = 128
+    # Diagram-only re-requests allowed when the linter finds errors it cannot fix
+    max_diagram_repairs: int = 1
+
+    def http_client_options(self) -> Dict[str, Any]:
+        """Keep-alive pool limits and timeouts for the underlying httpx client"""
+        return {
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            "timeout": httpx.Timeout(self.timeout, connect=self.connect_timeout),
+        }
+
+
+class Reporter:
+    """
+    Fan-out of structured processor events to subscribed callbacks.
+
+    Events and their data:
+      raw_response        text
+      diagram             diagram
+      parse_error         error, text
+      missing_components  missing
+      similar_match       similarity, key
+      diagram_lint        diagnostics, repaired, needs_repair
+    With no subscribers, emitting is a no-op.
+    """
+
     def __init__(self):
-        self.client = groq.Client(api_key=st.secrets["GROQ_API_KEY"])
-    
-    def analyze_process(self, requirements):
-        prompt = self._generate_prompt(requirements)
-        
+        self._subscribers: List[Callable[[str, Dict[str, Any]], None]] = []
+
+    def subscribe(self, callback: Callable[[str, Dict[str, Any]], None]):
+        self._subscribers.append(callback)
+
+    def emit(self, event: str, **data):
+        for callback in self._subscribers:
+            callback(event, data)
+
+
+class AIProcessor:
+    # Identical concurrent requests share one in-flight completion
+    inflight_class = SingleFlight
+
+    def __init__(
+        self,
+        config: ProcessorConfig,
+        cache: Optional[ResponseCache] = None,
+        reporter: Optional[Reporter] = None,
+    ):
+        self.config = config
+        # One pooled keep-alive HTTP client per processor; share the processor
+        # to reuse TLS connections across requests
+        self.client = self._make_client(config)
+        self.cache = cache if cache is not None else ResponseCache()
+        self.reporter = reporter if reporter is not None else Reporter()
+        self.inflight = self.inflight_class()
+        self._init_similarity()
+
+    @staticmethod
+    def _make_client(config: ProcessorConfig):
+        return groq.Client(
+            api_key=config.api_key,
+            base_url=config.base_url,
+            http_client=groq.DefaultHttpxClient(**config.http_client_options()),
+        )
+
+    def _init_similarity(self):
+        self.minhasher = MinHasher(self.config.similarity_num_perm)
+        self.similar = None
+        if self.config.similarity_threshold:
+            self.similar = NearDuplicateIndex(self.config.similarity_threshold, self.config.similarity_num_perm)
+            for key, scope, signature in self.cache.signatures():
+                self.similar.add(key, scope, MinHasher.from_bytes(signature))
+
+    def _similarity_scope(self, requirements, template: str) -> str:
+        # Only requests with the same preferences, model and prompt template
+        # are interchangeable: a structured or pipeline request must never be
+        # answered with a single-request result that skipped its validation
+        payload = json.dumps(
+            {"preferences": requirements.get('preferences', {}), "model": self.config.model, "template": template},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+    def lookup(self, requirements, cache_key, template):
+        """
+        Cached analysis for exactly this request, else the one of the most
+        similar earlier request above the threshold (reported as similar_match)
+        """
+        cached = self.cache.get(cache_key)
+        if cached is not None or self.similar is None:
+            return cached
+
+        signature = self.minhasher.signature(requirements.get('description', ''))
+        scope = self._similarity_scope(requirements, template)
+        for key, similarity in self.similar.query(scope, signature, exclude=cache_key):
+            cached = self.cache.get(key)
+            if cached is None:
+                # Expired or evicted since it was indexed
+                self.similar.remove(key)
+                continue
+            self.reporter.emit("similar_match", similarity=similarity, key=key)
+            return cached
+        return None
+
+    def remember(self, cache_key, requirements, result, template):
+        """Cache a result along with the signature of the request that produced it"""
+        scope = self._similarity_scope(requirements, template)
+        signature = self.minhasher.signature(requirements.get('description', ''))
+        self.cache.put(cache_key, result, scope=scope, signature=MinHasher.to_bytes(signature))
+        if self.similar is not None:
+            self.similar.add(cache_key, scope, signature)
+
+    def warm_up(self) -> bool:
+        """
+        Open a pooled connection ahead of the first analysis so the TLS
+        handshake is off the request's critical path
+        """
         try:
+            self.client.models.list()
+            return True
+        except Exception:
+            return False
+    
+    def analyze_process(self, requirements, bypass_cache=False):
+        return self._analyze(self._generate_prompt, self._complete, requirements, bypass_cache)
+
+    def _prepare(self, build_prompt, requirements):
+        """Prompt, template id and cache key of a request; shared with AsyncAIProcessor"""
+        prompt = build_prompt(requirements)
+        template = prompt_template_id(build_prompt, requirements)
+        cache_key = ResponseCache.make_key(requirements, self.config.model, self.config.temperature, template)
+        return prompt, template, cache_key
+
+    def _analyze(self, build_prompt, complete, requirements, bypass_cache):
+        """The cached result, else complete(), shared by identical concurrent requests"""
+        prompt, template, cache_key = self._prepare(build_prompt, requirements)
+        if not bypass_cache:
+            cached = self.lookup(requirements, cache_key, template)
+            if cached is not None:
+                return cached
+
+        return self.inflight.do(cache_key, lambda: complete(requirements, prompt, cache_key, template))
+
+    def _chat(self, prompt, max_tokens=None, response_format=None):
+        """
+        Chat completion that resumes truncated output: while the response is
+        cut off, the partial text is sent back as an assistant prefix and the
+        continuation is stitched on, so only the missing tokens are generated
+        """
+        text = ''
+        for _ in range(self.config.max_continuations + 1):
+            options = {"response_format": response_format} if response_format else {}
             completion = self.client.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
-                model="llama-3.3-70b-versatile",
-                temperature=0.1,
-                max_tokens=4000,
+                messages=self._continuation_messages(prompt, text),
+                model=self.config.model,
+                temperature=self.config.temperature,
+                max_tokens=max_tokens or self.config.max_tokens,
+                **options,
             )
-            
-            response_text = completion.choices[0].message.content
-            return self._parse_response(response_text)
+            choice = completion.choices[0]
+            text = self._stitch(text, choice.message.content or '')
+            if not self._needs_continuation(text, choice.finish_reason):
+                break
+        return text
+
+    def analyze_process_structured(self, requirements, bypass_cache=False):
+        """
+        JSON-mode variant of analyze_process: the API is asked for a JSON object,
+        the result is checked against ANALYSIS_SCHEMA, and only the subtrees that
+        fail validation are re-requested
+        """
+        return self._analyze(self._generate_structured_prompt, self._complete_structured, requirements, bypass_cache)
+
+    def _complete_structured(self, requirements, prompt, cache_key, template):
+        try:
+            data = self.request_json(prompt)
+            errors = ANALYSIS_VALIDATOR.validate(data)
+            if errors:
+                data = self._repair_subtrees(requirements, data, errors)
+        except Exception as e:
+            raise Exception(f"Analysis error: {str(e)}")
+
+        data = self.finish_diagram(requirements, data)
+        self.remember(cache_key, requirements, data, template)
+        return data
+
+    def request_json(self, prompt, max_tokens=None):
+        """One JSON-mode completion, continued if truncated, parsed into a dict"""
+        text = self._chat(prompt, max_tokens=max_tokens, response_format={"type": "json_object"})
+        return extract_json(text)
+
+    def finish_diagram(self, requirements, data):
+        """Clean data['diagram'], report it, then lint and if needed repair it"""
+        data['diagram'] = self._clean_diagram(data['diagram'])
+        self.reporter.emit("diagram", diagram=data['diagram'])
+        return self._check_diagram(requirements, data)
+
+    def _repair_subtrees(self, requirements, data, errors):
+        """Re-request just the invalid top-level fields or components, in parallel"""
+        requests = self._subtree_requests(requirements, data, errors)
+        with ThreadPoolExecutor(max_workers=min(len(requests), self.config.max_concurrency)) as pool:
+            replies = list(pool.map(
+                lambda request: self.request_json(request[2], max_tokens=SUBTREE_MAX_TOKENS), requests
+            ))
+        return self._merge_replies(data, requests, replies)
+
+    @classmethod
+    def _subtree_requests(cls, requirements, data, errors):
+        """(root, schema, prompt) for each subtree that failed validation"""
+        return [
+            (root, *cls._subtree_prompt(requirements, data, root, root_errors))
+            for root, root_errors in cls._error_roots(data, errors).items()
+        ]
+
+    @classmethod
+    def _merge_replies(cls, data, requests, replies):
+        values = {
+            root: cls._checked_subtree(schema, reply.get('value'), root)
+            for (root, schema, _), reply in zip(requests, replies)
+        }
+        return cls._merge_subtrees(data, values)
+
+    @staticmethod
+    def _error_roots(data, errors):
+        """Validation errors grouped by the subtree that gets re-requested"""
+        if not isinstance(data, dict):
+            raise ValueError(f"Schema validation failed: {errors[0]}")
+
+        roots = {}
+        for error in errors:
+            path = error.path
+            root = path[:2] if len(path) >= 2 and path[0] == 'components' and isinstance(path[1], int) else path[:1]
+            roots.setdefault(root, []).append(error)
+        return roots
+
+    @staticmethod
+    def _merge_subtrees(data, values):
+        for root, value in values.items():
+            if len(root) == 2:
+                data['components'][root[1]] = value
+            else:
+                data[root[0]] = value
+
+        remaining = ANALYSIS_VALIDATOR.validate(data)
+        if remaining:
+            details = '; '.join(str(error) for error in remaining[:5])
+            raise ValueError(f"Schema validation failed after repair: {details}")
+        return data
+
+    @staticmethod
+    def _subtree_prompt(requirements, data, root, errors):
+        if len(root) == 2:
+            schema = COMPONENT_SCHEMA
+            current = data['components'][root[1]]
+        else:
+            schema = ANALYSIS_SCHEMA['properties'][root[0]]
+            current = data.get(root[0])
+
+        problems = '\n'.join(f"- {error}" for error in errors)
+        prompt = f"""A system design JSON document has an invalid part at {format_path(root)}.
+
+System Requirements:
+{requirements['description']}
+
+Architecture overview:
+{data.get('overview', '')}
+
+Current value:
+{json.dumps(current, ensure_ascii=False)[:2000]}
+
+Validation errors:
+{problems}
+
+Return a JSON object {{"value": ...}} where value is the corrected part with this exact shape:
+{outline_json(schema)}"""
+        return schema, prompt
+
+    @staticmethod
+    def _checked_subtree(schema, value, root):
+        sub_errors = Validator(schema).validate(value, root)
+        if sub_errors:
+            raise ValueError(f"Schema validation failed: {sub_errors[0]}")
+        return value
+
+    def _check_diagram(self, requirements, data):
+        steps = self._diagram_checks(requirements, data)
+        try:
+            prompt = next(steps)
+            while True:
+                try:
+                    reply = self.request_json(prompt, max_tokens=DIAGRAM_REPAIR_MAX_TOKENS)
+                except Exception:
+                    reply = None
+                prompt = steps.send(reply)
+        except StopIteration as done:
+            return done.value
+
+    def _diagram_checks(self, requirements, data):
+        """
+        Lint the diagram before it is cached or shown. Whatever the linter can
+        fix is fixed in place; if errors remain, only the diagram is
+        re-requested, with the diagnostics, instead of the whole analysis.
+
+        A generator so the sync and async processors share it: it yields each
+        repair prompt, is sent the parsed reply (None if the request failed)
+        and returns the data.
+        """
+        result = self._lint(data)
+        if result is None:
+            return data
+        repaired = False
+        for _ in range(self.config.max_diagram_repairs):
+            if not result.needs_repair:
+                break
+            reply = yield self._diagram_repair_prompt(requirements, data, result)
+            if reply is None:
+                # Keep the best-effort fixed diagram
+                break
+            diagram = reply.get('diagram', '')
+            result, repaired = self._prefer(result, lint_diagram(self._clean_diagram(diagram))), True
+        return self._apply_lint(data, result, repaired)
+
+    @staticmethod
+    def _lint(data) -> Optional[LintResult]:
+        if not isinstance(data, dict) or not isinstance(data.get('diagram'), str):
+            return None
+        return lint_diagram(data['diagram'])
+
+    @staticmethod
+    def _prefer(current: LintResult, candidate: LintResult) -> LintResult:
+        # A repaired diagram only replaces the original if it is no worse
+        if not candidate.needs_repair or len(candidate.problems) < len(current.problems):
+            return candidate
+        return current
+
+    def _apply_lint(self, data, result: LintResult, repaired: bool):
+        data['diagram'] = result.diagram
+        if result.diagnostics or repaired:
+            self.reporter.emit(
+                "diagram_lint",
+                diagnostics=result.diagnostics,
+                repaired=repaired,
+                needs_repair=result.needs_repair,
+            )
+        return data
+
+    @staticmethod
+    def _diagram_repair_prompt(requirements, data, result: LintResult) -> str:
+        components = '\n'.join(
+            f"- {c['name']}" for c in data.get('components', []) if isinstance(c, dict) and c.get('name')
+        )
+        problems = '\n'.join(f"- {d}" for d in result.problems)
+        return f"""This Mermaid flowchart for a system design does not render.
+
+System Requirements:
+{requirements['description']}
+
+Components:
+{components}
+
+Current diagram:
+{result.diagram[:6000]}
+
+Problems:
+{problems}
+
+Rewrite the diagram so it fixes these problems and keeps every node and connection that is correct.
+Start with 'graph TD', one node or connection per line, node ids without spaces,
+nodes as A[Label], A((Label)) or A[(Label)], connections as A --> B or A -->|label| B,
+no special characters in labels and no --- config --- block.
+
+Return only this JSON structure:
+{{"diagram": "mermaid flowchart code"}}"""
+
+    @staticmethod
+    def _continuation_messages(prompt, partial):
+        messages = [{"role": "user", "content": prompt}]
+        if partial:
+            messages.append({"role": "assistant", "content": partial})
+        return messages
+
+    @staticmethod
+    def _needs_continuation(text, finish_reason):
+        if finish_reason == "length":
+            return True
+        # Cheap check first: a finished response ends with its closing brace or fence
+        tail = text.rstrip()
+        if tail.endswith('}') or tail.endswith('```'):
+            return False
+        return is_truncated(text)
+
+    @staticmethod
+    def _stitch(partial, continuation, max_overlap=200):
+        """Append a continuation, dropping any text it repeats from the end of partial"""
+        if not partial:
+            return continuation
+        for size in range(min(max_overlap, len(partial), len(continuation)), 15, -1):
+            if partial.endswith(continuation[:size]):
+                return partial + continuation[size:]
+        return partial + continuation
+
+    def _complete(self, requirements, prompt, cache_key, template):
+        try:
+            response_text = self._chat(prompt)
+            result = self._parse_response(response_text)
             
         except Exception as e:
             raise Exception(f"Analysis error: {str(e)}")
+
+        result = self._check_diagram(requirements, result)
+        # A bypassed request still refreshes the cache with the new result
+        self.remember(cache_key, requirements, result, template)
+        return result
+
+    def analyze_process_stream(self, requirements, bypass_cache=False) -> Iterator[Tuple[str, Any]]:
+        """
+        Streaming variant of analyze_process.
+
+        Yields ('overview', str) and one ('component', dict) per component as
+        soon as each closes in the completion, then ('diagram', str) and finally
+        ('analysis', dict) with the fully parsed and cleaned result.
+        """
+        prompt, template, cache_key = self._prepare(self._generate_prompt, requirements)
+        if not bypass_cache:
+            cached = self.lookup(requirements, cache_key, template)
+            if cached is not None:
+                yield from self._replay_events(cached)
+                return
+
+        call, leader = self.inflight.begin(cache_key)
+        if not leader:
+            # Someone else is already generating this exact design
+            yield from self._replay_events(call.wait())
+            return
+
+        parser = IncrementalAnalysisParser()
+        try:
+            for _ in range(self.config.max_continuations + 1):
+                stream = self.client.chat.completions.create(
+                    messages=self._continuation_messages(prompt, parser.text),
+                    model=self.config.model,
+                    temperature=self.config.temperature,
+                    max_tokens=self.config.max_tokens,
+                    stream=True,
+                )
+
+                finish_reason = None
+                # On a continuation, hold back the first characters until any
+                # text repeated from the partial output can be trimmed
+                head = None if not parser.text else ''
+                for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    choice = chunk.choices[0]
+                    finish_reason = choice.finish_reason or finish_reason
+                    delta = choice.delta.content or ''
+                    if head is not None:
+                        head += delta
+                        if len(head) < 200:
+                            continue
+                        delta = self._stitch(parser.text, head)[len(parser.text):]
+                        head = None
+                    yield from self._feed(parser, delta)
+                if head:
+                    yield from self._feed(parser, self._stitch(parser.text, head)[len(parser.text):])
+
+                if not self._needs_continuation(parser.text, finish_reason):
+                    break
+
+            result = self._parse_response(parser.text)
+            result = self._check_diagram(requirements, result)
+
+        except BaseException as e:
+            # Also covers a consumer abandoning the stream, so followers never hang
+            error = e if not isinstance(e, Exception) else Exception(f"Analysis error: {str(e)}")
+            self.inflight.finish(cache_key, call, error=error)
+            raise error
+
+        self.remember(cache_key, requirements, result, template)
+        self.inflight.finish(cache_key, call, result=result)
+        if 'diagram' in result:
+            yield 'diagram', result['diagram']
+        yield 'analysis', result
+
+    @staticmethod
+    def _feed(parser, delta) -> Iterator[Tuple[str, Any]]:
+        for kind, value in parser.feed(delta):
+            # The diagram is emitted from the cleaned, fully parsed result
+            if kind != 'diagram':
+                yield kind, value
+
+    @staticmethod
+    def _replay_events(analysis: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+        if 'overview' in analysis:
+            yield 'overview', analysis['overview']
+        for component in analysis.get('components', []):
+            yield 'component', component
+        if 'diagram' in analysis:
+            yield 'diagram', analysis['diagram']
+        yield 'analysis', analysis
     
+    def _generate_structured_prompt(self, requirements: Dict[str, Any]) -> str:
+        preferences = '\n'.join(
+            f"- {key.replace('_', ' ').title()}: {value}"
+            for key, value in requirements.get('preferences', {}).items()
+        )
+        return f"""Analyze this system design requirement and answer with a single JSON object.
+
+System Requirements:
+{requirements['description']}
+
+Technical Preferences:
+{preferences}
+
+Cover scalability, reliability, security, monitoring, error handling, caching, messaging and deployment.
+List components in data-flow order, starting with user interaction. Give specific technologies,
+algorithms and configuration values.
+
+The "diagram" value is a Mermaid flowchart: start with 'graph TD', one node or connection per line,
+nodes as A[Label], A((Label)) or A[(Label)], connections as A --> B or A -->|label| B,
+no special characters in labels.
+
+JSON shape (every key is required, "string" marks a text value):
+{outline_json(ANALYSIS_SCHEMA)}"""
+
     def _generate_prompt(self, requirements: Dict[str, Any]) -> str:
         return f"""Analyze this system design requirement and provide a detailed technical implementation flow. Format the response as a structured JSON document.
 
@@ -461,91 +1150,51 @@ IMPORTANT: The final diagram must include ALL components listed above with their
         More robust response parser that handles different diagram formats
         """
         try:
-            # First, let's print the raw response for debugging
-            st.write("Raw response received:")
-            st.code(response_text[:200] + "...", language="text")
+            # Let subscribers inspect the raw response for debugging
+            self.reporter.emit("raw_response", text=response_text)
 
-            # Remove markdown code blocks
-            cleaned_text = re.sub(r'```(?:json|mermaid)?\s*|\s*```', '', response_text)
-            
-            # Replace backtick-wrapped diagram with proper JSON string
-            cleaned_text = re.sub(r':\s*`\s*(graph TD[\s\S]*?)`\s*([,}])', r': "\1"\2', cleaned_text)
-            
-            # Find the JSON content between first { and last }
-            start_idx = cleaned_text.find("{")
-            end_idx = cleaned_text.rfind("}")
-            
-            if start_idx == -1 or end_idx == -1:
-                raise ValueError("No valid JSON structure found")
-            
-            json_str = cleaned_text[start_idx:end_idx + 1]
-            
-            # Normalize whitespace
-            json_str = re.sub(r'\s+', ' ', json_str)
-            
-            # Handle escaped quotes
-            json_str = json_str.replace('\\"', '"')
-            json_str = json_str.replace('""', '"')
-            
-            try:
-                # Try to parse JSON
-                data = json.loads(json_str)
-            except json.JSONDecodeError as e:
-                # If parsing fails, show context around error
-                st.error(f"JSON Parse Error at position {e.pos}:")
-                context_start = max(0, e.pos - 100)
-                context_end = min(len(json_str), e.pos + 100)
-                st.code(f"...{json_str[context_start:context_end]}...", language="json")
-                
-                # Additional cleanup for another attempt
-                json_str = re.sub(r':\s*"([^"]*?graph TD[^"]*?)"', r': "\1"', json_str)
-                json_str = json_str.replace('\n', ' ')
-                data = json.loads(json_str)  # Try one more time
+            # Single pass over the response: strips fences, converts backtick
+            # strings and repairs common JSON mistakes without touching string contents
+            data = extract_json(response_text)
                 
             # Clean up diagram if present
             if 'diagram' in data:
-                diagram = data['diagram']
-                
-                # Remove any surrounding quotes or backticks
-                diagram = diagram.strip('"`\'')
-                
-                # Ensure proper line breaks
-                diagram = diagram.replace('\\n', '\n')
-                
-                # Ensure it starts with graph TD
-                if not diagram.strip().startswith('graph'):
-                    diagram = 'graph TD\n' + diagram
-                
-                # Add style definitions if not present
-                style_defs = '''    %% Style definitions
-        classDef default fill:#f9f9f9,stroke:#333,stroke-width:1px;
-        classDef subgraphStyle fill:#e8e8e8,stroke:#666,stroke-width:2px;
-    '''
-                if '%% Style definitions' not in diagram:
-                    diagram = diagram.replace('graph TD', f'graph TD\n{style_defs}')
-                
-                # Clean up formatting
-                diagram = '\n'.join(line.strip() for line in diagram.split('\n'))
-                
-                # Store cleaned diagram
-                data['diagram'] = diagram
-                
-                # Display the diagram code
-                st.write("Diagram code:")
-                st.code(diagram, language="mermaid")
+                data['diagram'] = self._clean_diagram(data['diagram'])
+                self.reporter.emit("diagram", diagram=data['diagram'])
             
             return data
             
-        except json.JSONDecodeError as e:
-            st.error(f"JSON Parse Error: {str(e)}")
-            st.code(json_str, language="json")
+        except JSONExtractionError as e:
+            self.reporter.emit("parse_error", error=f"JSON Parse Error: {str(e)}", text=response_text)
             raise ValueError(f"Invalid JSON format: {str(e)}")
         except Exception as e:
-            st.error(f"Error: {str(e)}")
-            st.write("Response text that caused the error:")
-            st.code(response_text[:500] + "...", language="text")
+            self.reporter.emit("parse_error", error=f"Error: {str(e)}", text=response_text)
             raise ValueError(f"Error processing response: {str(e)}")
 
+    @staticmethod
+    def _clean_diagram(diagram):
+        """Normalize a Mermaid diagram returned by the model"""
+        # Remove any surrounding quotes or backticks
+        diagram = diagram.strip('"`\'')
+        
+        # Ensure proper line breaks
+        diagram = diagram.replace('\\n', '\n')
+        
+        # Ensure it starts with graph TD
+        if not diagram.strip().startswith('graph'):
+            diagram = 'graph TD\n' + diagram
+        
+        # Add style definitions if not present
+        style_defs = '''    %% Style definitions
+        classDef default fill:#f9f9f9,stroke:#333,stroke-width:1px;
+        classDef subgraphStyle fill:#e8e8e8,stroke:#666,stroke-width:2px;
+    '''
+        if '%% Style definitions' not in diagram:
+            diagram = diagram.replace('graph TD', f'graph TD\n{style_defs}', 1)
+        
+        # Clean up formatting
+        return '\n'.join(line.strip() for line in diagram.split('\n'))
+
     def _validate_keywords(self, diagram):
         """
         Separate keyword validation logic
@@ -570,8 +1219,178 @@ IMPORTANT: The final diagram must include ALL components listed above with their
                 missing[category] = missing_keywords
         
         if missing:
-            st.warning("Missing Components:")
-            for category, keywords in missing.items():
-                st.write(f"- {category}: {', '.join(keywords)}")
+            self.reporter.emit("missing_components", missing=missing)
         
-        return missing
\ No newline at end of file
+        return missing
+
+
+class AsyncAIProcessor(AIProcessor):
+    """
+    Asyncio variant of AIProcessor on the async Groq client.
+
+    A semaphore bounds in-flight requests and a RateLimiter keeps requests and
+    tokens per minute under the provider's limits, so bursts queue up instead
+    of failing with 429s. Prompting, validation, diagram checks and caching
+    are shared with AIProcessor; only the I/O is async here. Cache reads and
+    writes run in a worker thread so sqlite never blocks the event loop, and
+    analyze_process_stream raises TypeError.
+    """
+
+    inflight_class = AsyncSingleFlight
+
+    def __init__(
+        self,
+        config: ProcessorConfig,
+        cache: Optional[ResponseCache] = None,
+        reporter: Optional[Reporter] = None,
+    ):
+        super().__init__(config, cache, reporter)
+        self.limiter = RateLimiter(config.requests_per_minute, config.tokens_per_minute)
+        self._semaphore = asyncio.Semaphore(config.max_concurrency)
+
+    @staticmethod
+    def _make_client(config: ProcessorConfig):
+        return groq.AsyncClient(
+            api_key=config.api_key,
+            base_url=config.base_url,
+            http_client=groq.DefaultAsyncHttpxClient(**config.http_client_options()),
+        )
+
+    async def warm_up(self) -> bool:
+        try:
+            await self.client.models.list()
+            return True
+        except Exception:
+            return False
+
+    async def analyze_process(self, requirements, bypass_cache=False):
+        return await self._analyze(self._generate_prompt, self._complete, requirements, bypass_cache)
+
+    async def analyze_process_structured(self, requirements, bypass_cache=False):
+        return await self._analyze(self._generate_structured_prompt, self._complete_structured, requirements,
+                                   bypass_cache)
+
+    async def _analyze(self, build_prompt, complete, requirements, bypass_cache):
+        prompt, template, cache_key = self._prepare(build_prompt, requirements)
+        if not bypass_cache:
+            cached = await asyncio.to_thread(self.lookup, requirements, cache_key, template)
+            if cached is not None:
+                return cached
+
+        return await self.inflight.do(cache_key, lambda: complete(requirements, prompt, cache_key, template))
+
+    def analyze_process_stream(self, requirements, bypass_cache=False):
+        raise TypeError("AsyncAIProcessor does not stream; use AIProcessor.analyze_process_stream")
+
+    async def _chat(self, prompt, max_tokens=None, response_format=None):
+        """
+        _chat on the async client. Every request, repairs included, goes
+        through here, so the semaphore bounds all of them
+        """
+        max_tokens = max_tokens or self.config.max_tokens
+        # Rough prompt size plus the completion budget; reconciled with usage afterwards
+        estimated_tokens = len(prompt) // 4 + max_tokens
+        text = ''
+        async with self._semaphore:
+            for _ in range(self.config.max_continuations + 1):
+                completion = await self._create_completion(
+                    self._continuation_messages(prompt, text), estimated_tokens, max_tokens, response_format
+                )
+                choice = completion.choices[0]
+                text = self._stitch(text, choice.message.content or '')
+                if not self._needs_continuation(text, choice.finish_reason):
+                    break
+        return text
+
+    async def request_json(self, prompt, max_tokens=None):
+        text = await self._chat(prompt, max_tokens=max_tokens, response_format={"type": "json_object"})
+        return extract_json(text)
+
+    async def _complete(self, requirements, prompt, cache_key, template):
+        try:
+            result = self._parse_response(await self._chat(prompt))
+        except Exception as e:
+            raise Exception(f"Analysis error: {str(e)}")
+
+        result = await self._check_diagram(requirements, result)
+        await asyncio.to_thread(self.remember, cache_key, requirements, result, template)
+        return result
+
+    async def _complete_structured(self, requirements, prompt, cache_key, template):
+        try:
+            data = await self.request_json(prompt)
+            errors = ANALYSIS_VALIDATOR.validate(data)
+            if errors:
+                data = await self._repair_subtrees(requirements, data, errors)
+        except Exception as e:
+            raise Exception(f"Analysis error: {str(e)}")
+
+        data = await self.finish_diagram(requirements, data)
+        await asyncio.to_thread(self.remember, cache_key, requirements, data, template)
+        return data
+
+    async def finish_diagram(self, requirements, data):
+        data['diagram'] = self._clean_diagram(data['diagram'])
+        self.reporter.emit("diagram", diagram=data['diagram'])
+        return await self._check_diagram(requirements, data)
+
+    async def _repair_subtrees(self, requirements, data, errors):
+        requests = self._subtree_requests(requirements, data, errors)
+        replies = await asyncio.gather(
+            *(self.request_json(prompt, max_tokens=SUBTREE_MAX_TOKENS) for _, _, prompt in requests)
+        )
+        return self._merge_replies(data, requests, replies)
+
+    async def _check_diagram(self, requirements, data):
+        steps = self._diagram_checks(requirements, data)
+        try:
+            prompt = next(steps)
+            while True:
+                try:
+                    reply = await self.request_json(prompt, max_tokens=DIAGRAM_REPAIR_MAX_TOKENS)
+                except Exception:
+                    reply = None
+                prompt = steps.send(reply)
+        except StopIteration as done:
+            return done.value
+
+    async def _create_completion(self, messages, estimated_tokens, max_tokens=None, response_format=None):
+        options = {"response_format": response_format} if response_format else {}
+        for attempt in range(self.config.max_rate_limit_retries + 1):
+            await self.limiter.acquire(estimated_tokens)
+            try:
+                completion = await self.client.chat.completions.create(
+                    messages=messages,
+                    model=self.config.model,
+                    temperature=self.config.temperature,
+                    max_tokens=max_tokens or self.config.max_tokens,
+                    **options,
+                )
+            except Exception as e:
+                # A failed attempt used no tokens; credit back its estimate
+                # so retries and later requests are not charged for it
+                self.limiter.record_usage(estimated_tokens, 0)
+                if not isinstance(e, groq.RateLimitError) or attempt == self.config.max_rate_limit_retries:
+                    raise
+                # Honour the provider's hint and hold back every queued request
+                retry_after = e.response.headers.get("retry-after")
+                try:
+                    delay = float(retry_after)
+                except (TypeError, ValueError):
+                    delay = 2.0 ** attempt
+                self.limiter.back_off(delay)
+                continue
+
+            usage = getattr(completion, "usage", None)
+            self.limiter.record_usage(estimated_tokens, getattr(usage, "total_tokens", None))
+            return completion
+
+    async def analyze_many(self, requirements_list, bypass_cache=False):
+        """
+        Analyze many requirements concurrently. Results keep the input order;
+        a failed analysis is returned as its exception instead of aborting the rest.
+        """
+        return await asyncio.gather(
+            *(self.analyze_process(requirements, bypass_cache) for requirements in requirements_list),
+            return_exceptions=True,
+        )
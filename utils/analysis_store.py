@@ -0,0 +1,262 @@
+# utils/analysis_store.py
+import hashlib
+import os
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from utils.models import Analysis
+
+_ANALYSIS = 'a'
+_TEXT = 't'
+
+
+def _encode(value: Union[Analysis, str]) -> bytes:
+    if isinstance(value, Analysis):
+        return (_ANALYSIS + value.to_compact()).encode('utf-8')
+    return (_TEXT + value).encode('utf-8')
+
+
+def _decode(payload: bytes) -> Union[Analysis, str]:
+    text = payload.decode('utf-8')
+    if text[0] == _ANALYSIS:
+        return Analysis.from_compact(text[1:])
+    return text[1:]
+
+
+def _estimate_size(value: Union[Analysis, str], encoded: bytes) -> int:
+    # Decoded objects cost noticeably more than their serialized form
+    if isinstance(value, Analysis):
+        return len(encoded) * 3
+    return sys.getsizeof(value)
+
+
+def analysis_key(analysis: Analysis) -> str:
+    return hashlib.sha256(analysis.to_compact().encode('utf-8')).hexdigest()[:24]
+
+
+class AnalysisStore:
+    """
+    Process-wide store of parsed analyses and rendered diagram artifacts,
+    shared by every session. Sessions keep only keys.
+
+    Entries are evicted least-recently-used first once the byte budget is
+    exceeded. With a spill directory, evicted entries are written there
+    zlib-compressed and transparently reloaded on the next access. The
+    directory has its own budget, max_spill_bytes of compressed files, and
+    the least recently used files are deleted past it.
+
+    The lock only guards the in-memory index and counters; encoding,
+    compression and file I/O happen outside it.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        spill_dir: Optional[Union[str, Path]] = None,
+        max_spill_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.max_bytes = max_bytes
+        self.max_spill_bytes = max_spill_bytes
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._bytes = 0
+        # key -> compressed size of its spill file, least recently used first
+        self._spilled: 'OrderedDict[str, int]' = OrderedDict()
+        self._spill_bytes = 0
+        # Evicted values whose spill file is still being written
+        self._writing: Dict[str, Union[Analysis, str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.spills = 0
+        self.spill_hits = 0
+        self.spill_deletes = 0
+
+        if self.spill_dir:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            self._load_spill_index()
+
+    def _load_spill_index(self):
+        """Files left by an earlier process, oldest first, trimmed to the budget"""
+        files = []
+        for path in self.spill_dir.glob('*.z'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(files):
+            self._spilled[key] = size
+            self._spill_bytes += size
+        self._delete_spills(self._trim_spills())
+
+    def put_analysis(self, analysis: Analysis) -> str:
+        """Store an analysis under its content hash and return the key"""
+        key = analysis_key(analysis)
+        self.put(key, analysis)
+        return key
+
+    def put(self, key: str, value: Union[Analysis, str]):
+        self._insert(key, value, from_spill=False)
+
+    def _insert(self, key: str, value: Union[Analysis, str], from_spill: bool):
+        encoded = _encode(value)
+        size = _estimate_size(value, encoded)
+        stale = []
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if not from_spill and key in self._spilled:
+                # A new value for the key; the file on disk holds the old one
+                self._spill_bytes -= self._spilled.pop(key)
+                stale.append(key)
+            self._entries[key] = (value, size)
+            self._bytes += size
+            victims = self._evict()
+        self._delete_spills(stale)
+        self._spill(victims)
+
+    def get(self, key: str) -> Optional[Union[Analysis, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            pending = self._writing.get(key)
+            spilled = key in self._spilled
+            if pending is not None:
+                self.hits += 1
+            elif spilled:
+                self._spilled.move_to_end(key)
+            else:
+                self.misses += 1
+        if pending is not None:
+            # Evicted a moment ago and still being written out
+            self._insert(key, pending, from_spill=False)
+            return pending
+        if not spilled:
+            return None
+
+        payload = self._read_spill(key)
+        if payload is None:
+            with self._lock:
+                self.misses += 1
+                if key in self._spilled:
+                    self._spill_bytes -= self._spilled.pop(key)
+            return None
+
+        value = _decode(payload)
+        with self._lock:
+            self.spill_hits += 1
+        self._insert(key, value, from_spill=True)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries or key in self._spilled or key in self._writing
+
+    def _evict(self) -> list:
+        """
+        Caller holds the lock. Drops least recently used entries until the
+        budget fits and returns those that still need a spill file; the
+        newest entry always stays even if it alone exceeds the budget.
+        """
+        victims = []
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            key, (value, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            if not self.spill_dir:
+                continue
+            if key in self._spilled:
+                # Reloaded from disk and unchanged since; the file is still good
+                self._spilled.move_to_end(key)
+            else:
+                victims.append((key, value))
+                self._writing[key] = value
+        return victims
+
+    def _spill(self, victims: list):
+        for key, value in victims:
+            size = self._write_spill(key, _encode(value))
+            with self._lock:
+                self._writing.pop(key, None)
+                if key in self._entries:
+                    # Put back while the file was being written; that value wins
+                    doomed = [key]
+                else:
+                    old = self._spilled.pop(key, 0)
+                    self._spilled[key] = size
+                    self._spill_bytes += size - old
+                    self.spills += 1
+                    doomed = self._trim_spills()
+            self._delete_spills(doomed)
+
+    def _trim_spills(self) -> list:
+        # Caller holds the lock (or is still in __init__)
+        doomed = []
+        while self._spill_bytes > self.max_spill_bytes and self._spilled:
+            key, size = self._spilled.popitem(last=False)
+            self._spill_bytes -= size
+            doomed.append(key)
+        return doomed
+
+    def _delete_spills(self, keys: list):
+        for key in keys:
+            try:
+                self._spill_path(key).unlink()
+            except FileNotFoundError:
+                pass
+        if keys:
+            with self._lock:
+                self.spill_deletes += len(keys)
+
+    def _spill_path(self, key: str) -> Optional[Path]:
+        if not self.spill_dir:
+            return None
+        return self.spill_dir / f"{key}.z"
+
+    def _write_spill(self, key: str, encoded: bytes) -> int:
+        path = self._spill_path(key)
+        compressed = zlib.compress(encoded, 6)
+        # Unique per thread, so two writers of one key never share a temp file
+        tmp = path.with_suffix(f'.{threading.get_ident()}.tmp')
+        tmp.write_bytes(compressed)
+        os.replace(tmp, path)
+        return len(compressed)
+
+    def _read_spill(self, key: str) -> Optional[bytes]:
+        path = self._spill_path(key)
+        if path is None:
+            return None
+        try:
+            return zlib.decompress(path.read_bytes())
+        except (FileNotFoundError, zlib.error):
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "spills": self.spills,
+                "spill_hits": self.spill_hits,
+            }
+            if self.spill_dir:
+                stats["spilled_entries"] = len(self._spilled)
+                stats["spilled_bytes"] = self._spill_bytes
+                stats["max_spill_bytes"] = self.max_spill_bytes
+                stats["spill_deletes"] = self.spill_deletes
+        return stats
@@ -0,0 +1,198 @@
+# utils/batch.py
+"""
+Headless batch analysis over a JSONL file of requirements.
+
+Each input line is a JSON object with a "description" and optional "id" and
+"preferences". Results are written to <output>/<id>/analysis.json and
+<output>/<id>/diagram.mmd; records that already have an analysis.json are
+skipped, so an interrupted run can simply be restarted.
+
+Usage:
+    python -m utils.batch requirements.jsonl --output results --concurrency 8
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from utils.ai_processor import AIProcessor, ProcessorConfig, ResponseCache
+
+DEFAULT_PREFERENCES = {
+    "frontend": "React",
+    "database": "DynamoDB",
+    "cloud_provider": "AWS",
+    "cache_strategy": "Redis",
+}
+
+
+def load_requirements(path: Path) -> List[Dict[str, Any]]:
+    """Read the JSONL input into requirement dicts carrying a stable id"""
+    records = []
+    with open(path, encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_no}: invalid JSON: {e}")
+            if not record.get('description'):
+                raise ValueError(f"{path}:{line_no}: missing 'description'")
+
+            preferences = {**DEFAULT_PREFERENCES, **record.get('preferences', {})}
+            record_id = str(record.get('id') or _content_id(record['description'], preferences))
+            records.append({
+                "id": re.sub(r'[^A-Za-z0-9_.-]', '_', record_id),
+                "description": record['description'],
+                "preferences": preferences,
+            })
+    return records
+
+
+def _content_id(description: str, preferences: Dict[str, str]) -> str:
+    payload = json.dumps([description, preferences], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def _write_atomic(path: Path, text: str):
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    tmp.write_text(text, encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_batch(
+    processor: AIProcessor,
+    records: List[Dict[str, Any]],
+    output_dir: Path,
+    concurrency: int = 4,
+    bypass_cache: bool = False,
+) -> Dict[str, Any]:
+    """Analyze every pending record with a bounded worker pool and return run statistics"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    pending = [r for r in records if not (output_dir / r['id'] / 'analysis.json').exists()]
+    skipped = len(records) - len(pending)
+
+    latencies = []
+    failures = {}
+    similar_matches = {}
+
+    # lookup() reports a near-duplicate hit on the worker thread that asked
+    local = threading.local()
+
+    def on_event(event, data):
+        if event == "similar_match":
+            local.similar = data
+
+    processor.reporter.subscribe(on_event)
+
+    def analyze(record):
+        requirements = {"description": record['description'], "preferences": record['preferences']}
+        local.similar = None
+        started = time.perf_counter()
+        analysis = processor.analyze_process(requirements, bypass_cache=bypass_cache)
+        elapsed = time.perf_counter() - started
+
+        record_dir = output_dir / record['id']
+        record_dir.mkdir(parents=True, exist_ok=True)
+        if local.similar is not None:
+            # Another request's analysis was reused; say whose
+            source = {"similar_to": local.similar['key'], "similarity": local.similar['similarity']}
+            similar_matches[record['id']] = source
+            _write_atomic(record_dir / 'source.json', json.dumps(source, indent=2))
+        _write_atomic(record_dir / 'diagram.mmd', analysis.get('diagram', ''))
+        # analysis.json is written last: its presence marks the record as done
+        _write_atomic(record_dir / 'analysis.json', json.dumps(analysis, indent=2, ensure_ascii=False))
+        return elapsed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(analyze, record): record for record in pending}
+        for future in as_completed(futures):
+            record = futures[future]
+            try:
+                latencies.append(future.result())
+            except Exception as e:
+                failures[record['id']] = str(e)
+    wall_time = time.perf_counter() - started
+
+    return {
+        "total": len(records),
+        "completed": len(latencies),
+        "skipped": skipped,
+        "failed": len(failures),
+        "failures": failures,
+        "similar_matches": similar_matches,
+        "wall_time_s": wall_time,
+        "throughput_per_s": len(latencies) / wall_time if wall_time > 0 else 0.0,
+        "latency_s": {
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies, default=0.0),
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run system design analyses over a JSONL file")
+    parser.add_argument("input", type=Path, help="JSONL file with one requirement per line")
+    parser.add_argument("--output", type=Path, default=Path("batch_results"), help="output directory")
+    parser.add_argument("--concurrency", type=int, default=4, help="maximum in-flight requests")
+    parser.add_argument("--api-key", default=os.environ.get("GROQ_API_KEY"), help="defaults to $GROQ_API_KEY")
+    parser.add_argument("--base-url", default=os.environ.get("GROQ_BASE_URL"),
+                        help="API base URL, e.g. a local stub server")
+    parser.add_argument("--cache", type=Path, default=None, help="response cache file")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the response cache")
+    parser.add_argument("--similarity-threshold", type=float, default=0.0,
+                        help="reuse the cached analysis of a near-duplicate description at or above "
+                             "this similarity (0.95 or more recommended); 0, the default, disables. "
+                             "Reused records get a source.json naming the original")
+    args = parser.parse_args(argv)
+
+    if not args.api_key:
+        parser.error("an API key is required (--api-key or GROQ_API_KEY)")
+
+    records = load_requirements(args.input)
+    cache = ResponseCache(args.cache) if args.cache else None
+    config = ProcessorConfig(
+        api_key=args.api_key,
+        base_url=args.base_url,
+        max_connections=max(args.concurrency, 1),
+        max_keepalive_connections=max(args.concurrency, 1),
+        similarity_threshold=args.similarity_threshold or None,
+    )
+    processor = AIProcessor(config, cache=cache)
+
+    stats = run_batch(processor, records, args.output, args.concurrency, args.no_cache)
+    _write_atomic(args.output / 'summary.json', json.dumps(stats, indent=2))
+
+    latency = stats['latency_s']
+    print(f"{stats['completed']} completed, {stats['skipped']} skipped, {stats['failed']} failed "
+          f"in {stats['wall_time_s']:.2f}s ({stats['throughput_per_s']:.2f} analyses/s)")
+    if stats['similar_matches']:
+        print(f"{len(stats['similar_matches'])} reused a near-duplicate's analysis (see source.json)")
+    print(f"latency p50={latency['p50']:.2f}s p90={latency['p90']:.2f}s "
+          f"p99={latency['p99']:.2f}s max={latency['max']:.2f}s")
+    for record_id, error in stats['failures'].items():
+        print(f"  failed {record_id}: {error}", file=sys.stderr)
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
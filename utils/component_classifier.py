@@ -0,0 +1,140 @@
+# utils/component_classifier.py
+"""
+Tags analysis components with architecture categories (frontend, api,
+lambda, database, cache, ...) from a keyword table.
+
+The whole table is compiled once into an Aho-Corasick automaton, so tagging
+a component is a single pass over its name, purpose and technologies no
+matter how many keywords there are. Matches count only on word boundaries,
+which keeps "ui" from matching "build" and "db" from matching "feedback".
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.models import Component
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+# Hits in the name say more about what a component is than hits in prose
+NAME_WEIGHT = 3
+TECHNOLOGY_WEIGHT = 2
+PURPOSE_WEIGHT = 1
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase words separated by single spaces"""
+    return _NON_ALNUM.sub(' ', (text or '').lower()).strip()
+
+
+class KeywordAutomaton:
+    """Aho-Corasick matcher over normalized text, reporting whole-word hits only"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+
+        seen = {}
+        for keyword in keywords:
+            keyword = normalize_text(keyword)
+            if keyword and keyword not in seen:
+                seen[keyword] = len(self.keywords)
+                self.keywords.append(keyword)
+        for index, keyword in enumerate(self.keywords):
+            self._insert(keyword, index)
+        self._link()
+
+    def _insert(self, keyword: str, index: int):
+        state = 0
+        for char in keyword:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        self._out[state] += (index,)
+
+    def _link(self):
+        # Breadth-first, so every failure target is finished before it is used
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> List[int]:
+        """Indexes into self.keywords of every whole-word match in text, in order"""
+        text = normalize_text(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        size = len(text)
+        hits = []
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not out[state] or (position + 1 < size and text[position + 1] != ' '):
+                continue
+            for index in out[state]:
+                start = position + 1 - len(self.keywords[index])
+                if start == 0 or text[start - 1] == ' ':
+                    hits.append(index)
+        return hits
+
+
+@dataclass(slots=True)
+class Classification:
+    category: Optional[str]
+    scores: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def categories(self) -> Tuple[str, ...]:
+        """Every category with at least one hit, strongest first"""
+        return tuple(sorted(self.scores, key=lambda c: -self.scores[c]))
+
+
+class ComponentClassifier:
+    """
+    Scores each category by weighted keyword hits; the best one is the
+    component's category, with ties going to the category listed first.
+    A keyword listed under several categories counts for each of them.
+    """
+
+    def __init__(self, keywords: Dict[str, Sequence[str]]):
+        self.category_order = list(keywords)
+        categories_of: Dict[str, List[str]] = {}
+        for category, words in keywords.items():
+            for word in words:
+                owners = categories_of.setdefault(normalize_text(word), [])
+                if category not in owners:
+                    owners.append(category)
+        self.automaton = KeywordAutomaton(categories_of)
+        self._categories = [tuple(categories_of[keyword]) for keyword in self.automaton.keywords]
+
+    def _score(self, text: str, weight: int, scores: Dict[str, int]):
+        for index in self.automaton.find(text):
+            for category in self._categories[index]:
+                scores[category] = scores.get(category, 0) + weight
+
+    def classify(self, component: Component) -> Classification:
+        scores: Dict[str, int] = {}
+        self._score(component.name, NAME_WEIGHT, scores)
+        self._score(component.purpose, PURPOSE_WEIGHT, scores)
+        for tech in component.technologies:
+            self._score(tech.name, TECHNOLOGY_WEIGHT, scores)
+            self._score(tech.purpose, PURPOSE_WEIGHT, scores)
+        if not scores:
+            return Classification(None)
+        rank = {category: i for i, category in enumerate(self.category_order)}
+        best = min(scores, key=lambda c: (-scores[c], rank[c]))
+        return Classification(best, scores)
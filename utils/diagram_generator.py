@@ -1,7 +1,28 @@
 # utils/diagram_generator.py
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from utils.component_classifier import ComponentClassifier
+from utils.models import Analysis
+
+# Category -> categories its components call; the lambda rule is the old
+# "lambda connects to dynamodb, redis and caches" special case generalized
+EDGE_RULES = {
+    'frontend': ('api',),
+    'api': ('lambda',),
+    'lambda': ('database', 'cache'),
+}
+
+# Generated diagrams by content hash, shared by every generator
+MEMO_SIZE = 256
+_memo: 'OrderedDict[str, str]' = OrderedDict()
+_memo_lock = threading.Lock()
+
+
 class DiagramGenerator:
     def __init__(self):
-        self.node_counter = 0
         self.component_keywords = {
             'frontend': [
                 'frontend', 'ui', 'interface', 'client', 'browser', 'web', 
@@ -30,79 +51,124 @@ class DiagramGenerator:
                 'buffer', 'fast access', 'quick retrieval'
             ]
         }
+        self.edge_rules = EDGE_RULES
+        self.classifier = ComponentClassifier(self.component_keywords)
 
-    def generate_diagram(self, analysis_data):
+    def generate_diagram(self, analysis):
+        """
+        Mermaid text for an analysis. The output depends only on the
+        components (and this generator's keyword table and rules), so it is
+        memoized by a hash of exactly those inputs.
+        """
         try:
-            # Start with basic diagram configuration
-            diagram_lines = [
-                "%%{init: {",
-                "  'theme': 'base',",
-                "  'themeVariables': {",
-                "    'fontFamily': 'monospace',",
-                "    'fontSize': '14px'",
-                "  }",
-                "}}%%",
-                "graph TD",
-                ""
-            ]
-            
-            nodes = []
-            connections = []
-            node_registry = {}
-            
-            # Process components
-            components = analysis_data.get('components', [])
-            for component in components:
-                node_id = self._generate_node_id(component['name'])
-                node_registry[component['name']] = node_id
-                # Remove any special characters from the component name
-                clean_name = component['name'].replace('[', '').replace(']', '')
-                nodes.append(f"{node_id}[{clean_name}]")
-            
-            # Add nodes
-            diagram_lines.extend([f"    {node}" for node in nodes])
-            diagram_lines.append("")
-            
-            # Process connections
-            for i, component in enumerate(components):
-                curr_id = node_registry[component['name']]
-                
-                # Connect to next component
-                if i < len(components) - 1:
-                    next_id = node_registry[components[i + 1]['name']]
-                    connections.append(f"{curr_id} --> {next_id}")
-                
-                # Special handling for Lambda
-                if 'lambda' in component['name'].lower():
-                    for other_name, other_id in node_registry.items():
-                        if 'dynamodb' in other_name.lower():
-                            connections.append(f"{curr_id} --> {other_id}")
-                        elif 'redis' in other_name.lower():
-                            connections.append(f"{curr_id} --> {other_id}")
-                        elif 'cache' in other_name.lower():
-                            connections.append(f"{curr_id} --> {other_id}")
-            
-            # Add connections
-            diagram_lines.extend([f"    {conn}" for conn in connections])
-            
-            # Add styling
-            diagram_lines.extend([
-                "",
-                "    classDef default fill:#E6E6FA,stroke:#6528F7,stroke-width:2px;",
-                f"    class {' '.join(node_registry.values())} default;"
-            ])
-            
-            return '\n'.join(diagram_lines)
+            if isinstance(analysis, dict):
+                analysis = Analysis.from_dict(analysis)
+
+            key = self.content_key(analysis)
+            with _memo_lock:
+                diagram = _memo.get(key)
+                if diagram is not None:
+                    _memo.move_to_end(key)
+                    return diagram
+
+            diagram = self._build(analysis)
+            with _memo_lock:
+                _memo[key] = diagram
+                while len(_memo) > MEMO_SIZE:
+                    _memo.popitem(last=False)
+            return diagram
             
         except Exception as e:
             return f"""graph TD
     Error["{str(e)}"]
     style Error fill:#ffcccc,stroke:#ff0000"""
 
-    def _generate_node_id(self, name):
-        """Generate a valid node ID"""
-        self.node_counter += 1
+    def content_key(self, analysis):
+        """Hash of everything the generated diagram depends on"""
+        payload = json.dumps(
+            {
+                "components": [
+                    [c.name, c.purpose, [[t.name, t.purpose] for t in c.technologies]]
+                    for c in analysis.components
+                ],
+                "keywords": self.component_keywords,
+                "rules": self.edge_rules,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _build(self, analysis):
+        # Start with basic diagram configuration
+        diagram_lines = [
+            "%%{init: {",
+            "  'theme': 'base',",
+            "  'themeVariables': {",
+            "    'fontFamily': 'monospace',",
+            "    'fontSize': '14px'",
+            "  }",
+            "}}%%",
+            "graph TD",
+            ""
+        ]
+        
+        node_registry = {}
+        
+        # Process components; a repeated name is the same node
+        components = analysis.components
+        for component in components:
+            if component.name not in node_registry:
+                node_registry[component.name] = self._generate_node_id(component.name)
+                # Remove any special characters from the component name
+                clean_name = component.name.replace('[', '').replace(']', '')
+                diagram_lines.append(f"    {node_registry[component.name]}[{clean_name}]")
+        diagram_lines.append("")
+        
+        # Process connections: the listed order, then category rules
+        # looked up through an index of nodes by category, so the work is
+        # proportional to the edges drawn rather than components squared.
+        # Edges are kept as node positions and written sorted, so the text
+        # does not depend on which rule produced an edge first.
+        position = {name: i for i, name in enumerate(node_registry)}
+        by_category = {}
+        node_categories = []
+        for component in components:
+            category = self.classifier.classify(component).category
+            node_categories.append(category)
+            by_category.setdefault(category, []).append(position[component.name])
+
+        edges = set()
+        for i, component in enumerate(components):
+            curr = position[component.name]
+            
+            # Connect to next component
+            if i < len(components) - 1:
+                edges.add((curr, position[components[i + 1].name]))
+            
+            for target_category in self.edge_rules.get(node_categories[i], ()):
+                for other in by_category.get(target_category, ()):
+                    edges.add((curr, other))
+        
+        # Add connections
+        node_ids = list(node_registry.values())
+        diagram_lines.extend(f"    {node_ids[source]} --> {node_ids[target]}"
+                             for source, target in sorted(edges) if source != target)
+        
+        # Add styling
+        diagram_lines.extend([
+            "",
+            "    classDef default fill:#E6E6FA,stroke:#6528F7,stroke-width:2px;",
+            f"    class {' '.join(node_ids)} default;"
+        ])
+        
+        return '\n'.join(diagram_lines)
+
+    @staticmethod
+    def _generate_node_id(name):
+        """Generate a valid node ID, the same one for the same name on every call"""
         # Remove any special characters and make safe for mermaid
         safe_name = ''.join(c if c.isalnum() else '_' for c in name.lower())
-        safe_name = safe_name.replace('[', '').replace(']', '')
-        return f"n{self.node_counter}_{safe_name}"
\ No newline at end of file
+        # Names that clean up the same ("API-Gateway", "API Gateway") still get distinct ids
+        digest = hashlib.blake2b(name.encode('utf-8'), digest_size=3).hexdigest()
+        return f"n{digest}_{safe_name}"
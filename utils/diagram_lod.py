@@ -0,0 +1,270 @@
+# utils/diagram_lod.py
+"""
+Level of detail for large flowcharts.
+
+A diagram with more than LOD_THRESHOLD nodes is split into clusters: its
+top-level subgraphs when the model drew them, otherwise modularity
+communities (Louvain). The overview shows one node per cluster, with the
+edges between clusters merged and counted. expand() opens a single cluster
+inside a subgraph and keeps every other cluster collapsed. Either view is a
+small, ordinary flowchart, so only what is on screen is laid out and drawn.
+"""
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from utils.mermaid import Flowchart, Subgraph, parse_flowchart
+
+LOD_THRESHOLD = 40
+MAX_ROUNDS = 10
+OTHER_TITLE = "Other"
+
+
+@dataclass(slots=True)
+class Cluster:
+    id: str
+    title: str
+    nodes: List[str] = field(default_factory=list)
+
+
+def _subgraph_clusters(chart: Flowchart) -> List[Tuple[str, List[str]]]:
+    """(title, member ids) of each top-level subgraph, nested members included"""
+    children: Dict[str, List[Subgraph]] = {}
+    stack: List[Subgraph] = []
+    top: List[Subgraph] = []
+    for statement in chart.statements:
+        if statement[0] == "subgraph":
+            (children.setdefault(stack[-1].id, []) if stack else top).append(statement[1])
+            stack.append(statement[1])
+        elif statement[0] == "end" and stack:
+            stack.pop()
+
+    groups = []
+    claimed = set()
+    for subgraph in top:
+        members = []
+        pending = [subgraph]
+        while pending:
+            current = pending.pop()
+            for node_id in current.nodes:
+                if node_id in chart.nodes and node_id not in claimed:
+                    claimed.add(node_id)
+                    members.append(node_id)
+            pending.extend(children.get(current.id, []))
+        if members:
+            groups.append((subgraph.title, members))
+    return groups
+
+
+def _modularity_levels(adjacency: List[Dict[int, float]]) -> List[int]:
+    """
+    Louvain: move each node to the neighbouring community with the best
+    modularity gain until nothing moves, fold communities into single nodes,
+    and repeat on the smaller graph. Nodes are visited in order, so the
+    result is deterministic. adjacency holds both directions of every edge.
+    """
+    membership = list(range(len(adjacency)))
+    while True:
+        degree = [sum(weights.values()) for weights in adjacency]
+        total = sum(degree)
+        if not total:
+            return membership
+        community = list(range(len(adjacency)))
+        community_degree = list(degree)
+        moved_any = False
+        for _ in range(MAX_ROUNDS):
+            moved = False
+            for node, weights in enumerate(adjacency):
+                current = community[node]
+                community_degree[current] -= degree[node]
+                links: Dict[int, float] = {}
+                for other, weight in weights.items():
+                    if other != node:
+                        links[community[other]] = links.get(community[other], 0.0) + weight
+                best = current
+                best_gain = links.get(current, 0.0) - community_degree[current] * degree[node] / total
+                for candidate, weight in links.items():
+                    gain = weight - community_degree[candidate] * degree[node] / total
+                    if gain > best_gain + 1e-12:
+                        best, best_gain = candidate, gain
+                community[node] = best
+                community_degree[best] += degree[node]
+                if best != current:
+                    moved = moved_any = True
+            if not moved:
+                break
+        if not moved_any:
+            return membership
+
+        renumber: Dict[int, int] = {}
+        for node in range(len(adjacency)):
+            renumber.setdefault(community[node], len(renumber))
+        folded: List[Dict[int, float]] = [{} for _ in renumber]
+        for node, weights in enumerate(adjacency):
+            source = renumber[community[node]]
+            for other, weight in weights.items():
+                target = renumber[community[other]]
+                folded[source][target] = folded[source].get(target, 0.0) + weight
+        membership = [renumber[community[group]] for group in membership]
+        adjacency = folded
+
+
+def _communities(chart: Flowchart) -> List[List[str]]:
+    """Modularity communities of the undirected graph, oversized ones split"""
+    order = list(chart.nodes)
+    index = {node_id: i for i, node_id in enumerate(order)}
+    adjacency: List[Dict[int, float]] = [{} for _ in order]
+    for edge in chart.edges:
+        source, target = index[edge.source], index[edge.target]
+        if source != target:
+            adjacency[source][target] = adjacency[source].get(target, 0.0) + 1.0
+            adjacency[target][source] = adjacency[target].get(source, 0.0) + 1.0
+
+    groups: Dict[int, List[str]] = {}
+    for node, community in enumerate(_modularity_levels(adjacency)):
+        groups.setdefault(community, []).append(order[node])
+    return [piece for members in groups.values() for piece in _split(chart, members)]
+
+
+def _split(chart: Flowchart, members: List[str], size: int = LOD_THRESHOLD) -> List[List[str]]:
+    """
+    A community too big to show expanded (a long chain, say) is cut into
+    connected pieces of at most size nodes, in breadth-first order
+    """
+    if len(members) <= size:
+        return [members]
+    inside = set(members)
+    seen = set()
+    order = []
+    for start in members:
+        if start in seen:
+            continue
+        seen.add(start)
+        queue = deque([start])
+        while queue:
+            node_id = queue.popleft()
+            order.append(node_id)
+            for other in chart.successors(node_id) + chart.predecessors(node_id):
+                if other in inside and other not in seen:
+                    seen.add(other)
+                    queue.append(other)
+    pieces = -(-len(order) // size)
+    step = -(-len(order) // pieces)
+    return [order[i:i + step] for i in range(0, len(order), step)]
+
+
+class ClusteredDiagram:
+    """A parsed flowchart with its clusters and the views built from them"""
+
+    def __init__(self, chart: Flowchart, clusters: List[Cluster]):
+        self.chart = chart
+        self.clusters = clusters
+        self.cluster_of = {node_id: cluster.id for cluster in clusters for node_id in cluster.nodes}
+        self._by_id = {cluster.id: cluster for cluster in clusters}
+
+    def overview(self) -> str:
+        return self.expand(None)
+
+    def expand(self, cluster_id: Optional[str]) -> str:
+        """Mermaid text with cluster_id opened and every other cluster collapsed"""
+        chart = self.chart
+        view = Flowchart(chart.direction)
+        view.keyword = chart.keyword
+        view.class_defs = dict(chart.class_defs)
+
+        def visible(node_id: str) -> str:
+            cluster = self.cluster_of.get(node_id)
+            return node_id if cluster is None or cluster == cluster_id else cluster
+
+        for cluster in self.clusters:
+            if cluster.id == cluster_id:
+                subgraph = Subgraph(cluster.id, cluster.title, list(cluster.nodes))
+                view.subgraphs.append(subgraph)
+                view.statements.append(("subgraph", subgraph))
+                for node_id in cluster.nodes:
+                    self._copy_node(view, node_id)
+                view.statements.append(("end",))
+            else:
+                view.add_node(cluster.id, f"{cluster.title} ({len(cluster.nodes)})", "subroutine")
+                view.statements.append(("node", cluster.id, 0))
+        for node_id in chart.nodes:
+            if node_id not in self.cluster_of:
+                self._copy_node(view, node_id)
+
+        # Edges between the same two visible nodes are merged and counted
+        merged: Dict[Tuple[str, str], List] = {}
+        for edge in chart.edges:
+            source, target = visible(edge.source), visible(edge.target)
+            if source == target and source not in chart.nodes:
+                continue
+            entry = merged.setdefault((source, target), [0, edge])
+            entry[0] += 1
+        for (source, target), (count, edge) in merged.items():
+            collapsed = source != edge.source or target != edge.target
+            label = f"{count} links" if count > 1 else ("" if collapsed and not edge.label else edge.label)
+            view.add_edge(source, target, label, edge.arrow if count == 1 else "-->")
+        return view.to_mermaid()
+
+    def _copy_node(self, view: Flowchart, node_id: str):
+        node = self.chart.nodes[node_id]
+        copy = view.add_node(node_id, node.label, node.shape)
+        copy.css_class = node.css_class
+        if node_id in self.chart.styles:
+            view.styles[node_id] = self.chart.styles[node_id]
+        view.statements.append(("node", node_id, 0))
+
+    def title(self, cluster_id: str) -> str:
+        cluster = self._by_id[cluster_id]
+        return f"{cluster.title} ({len(cluster.nodes)})"
+
+
+def _split_groups(chart: Flowchart, groups: List[Tuple[str, List[str]]]) -> List[Tuple[str, List[str]]]:
+    """Every group cut to at most LOD_THRESHOLD nodes, so any expanded view stays small"""
+    result = []
+    for title, members in groups:
+        pieces = _split(chart, members)
+        if len(pieces) == 1:
+            result.append((title, members))
+            continue
+        result.extend((f"{title}, part {number}", piece) for number, piece in enumerate(pieces, 1))
+    return result
+
+
+def cluster_flowchart(chart: Flowchart) -> List[Cluster]:
+    """
+    Top-level subgraphs when they cover at least half the nodes, otherwise
+    communities. Single nodes left on their own are pooled into one cluster.
+    A subgraph or pool too big to expand is cut into parts like a community.
+    """
+    groups = _subgraph_clusters(chart)
+    if sum(len(members) for _, members in groups) * 2 < len(chart.nodes):
+        groups = []
+        loners = []
+        for members in _communities(chart):
+            if len(members) == 1:
+                loners.extend(members)
+                continue
+            # Named after its most connected member
+            hub = max(members, key=lambda n: (len(chart.out_edges[n]) + len(chart.in_edges[n]), -members.index(n)))
+            groups.append((chart.nodes[hub].label.split('\n')[0], members))
+        if loners:
+            groups.append((OTHER_TITLE, loners))
+
+    clusters = []
+    for number, (title, members) in enumerate(_split_groups(chart, groups), 1):
+        cluster_id = f"cluster{number}"
+        while cluster_id in chart.nodes:
+            cluster_id += "_"
+        clusters.append(Cluster(cluster_id, title, members))
+    return clusters
+
+
+def cluster_diagram(diagram: str, threshold: int = LOD_THRESHOLD) -> Optional[ClusteredDiagram]:
+    """Clusters for a flowchart with more than threshold nodes; None for anything smaller or not a flowchart"""
+    chart = parse_flowchart(diagram)
+    if chart.source is not None or len(chart.nodes) <= threshold:
+        return None
+    clusters = cluster_flowchart(chart)
+    if len(clusters) < 2:
+        return None
+    return ClusteredDiagram(chart, clusters)
@@ -0,0 +1,710 @@
+# utils/diagram_svg.py
+"""
+Layered layout and SVG output for parsed flowcharts, so diagrams are drawn
+on the server instead of by Mermaid in the browser.
+
+The layout follows the usual Sugiyama steps, as dagre (Mermaid's layout
+engine) does:
+  1. break cycles by reversing DFS back edges
+  2. rank nodes by longest path, every edge spanning two ranks so edge
+     labels get a rank position of their own
+  3. split long edges into chains of dummy nodes
+  4. order each rank with barycenter sweeps, keeping subgraph members
+     together and the ordering with the fewest crossings
+  5. place nodes within ranks by weighted isotonic regression toward the
+     mean position of their neighbours, which keeps the order and spacing
+  6. route edges through their dummies as smoothed polylines
+Each sweep is linear or n log n, but dummy nodes and sweeps add up: 100
+nodes and 200 edges take about 0.2 s, 300 nodes and 600 edges about 2.3 s.
+render_svg() therefore refuses charts above MAX_NODES or MAX_EDGES; callers
+show the level-of-detail overview (utils/diagram_lod.py) or let Mermaid draw
+them in the browser instead.
+"""
+import html
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from utils.mermaid import Edge, Flowchart, Node, Subgraph, parse_flowchart
+
+# Bump when the drawing changes so cached SVGs are not reused
+RENDERER_VERSION = 1
+
+# Roughly 0.3 s of layout at the limit
+MAX_NODES = 120
+MAX_EDGES = 240
+
+FONT_FAMILY = "trebuchet ms, verdana, arial, sans-serif"
+FONT_SIZE = 14
+# Average advance of the font above at FONT_SIZE; there is no font metrics
+# source on the server, so widths are estimated
+CHAR_WIDTH = 7.4
+LINE_HEIGHT = 18
+MAX_LABEL_WIDTH = 200
+PADDING_X = 15
+PADDING_Y = 10
+NODE_SEP = 40
+DUMMY_SEP = 12
+# Every edge spans two ranks, so this is half the gap between connected nodes
+RANK_SEP = 25
+MARGIN = 16
+CLUSTER_PADDING = 14
+CLUSTER_TITLE = 22
+ORDER_SWEEPS = 8
+PLACEMENT_SWEEPS = 6
+
+NODE_STYLE = {"fill": "#f4f4f4", "stroke": "#999999", "stroke-width": "1"}
+CLUSTER_STYLE = {"fill": "#fafafa", "stroke": "#bbbbbb", "stroke-width": "1"}
+EDGE_COLOR = "#555555"
+# CSS properties from classDef / style lines that map onto SVG attributes
+_STYLE_PROPERTIES = ("fill", "stroke", "stroke-width", "stroke-dasharray", "color", "opacity", "font-weight")
+
+_BREAK = re.compile(r'<br\s*/?>', re.IGNORECASE)
+_TAG = re.compile(r'<[^>]*>')
+
+
+@dataclass(slots=True)
+class NodeBox:
+    id: str
+    lines: List[str]
+    shape: str
+    x: float
+    y: float
+    width: float
+    height: float
+    style: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class EdgeRoute:
+    edge: Edge
+    points: List[Tuple[float, float]]
+    label_at: Optional[Tuple[float, float]] = None
+    lines: List[str] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class ClusterBox:
+    subgraph: Subgraph
+    x: float
+    y: float
+    width: float
+    height: float
+
+
+@dataclass(slots=True)
+class Layout:
+    width: float
+    height: float
+    nodes: Dict[str, NodeBox]
+    edges: List[EdgeRoute]
+    clusters: List[ClusterBox]
+
+
+@dataclass(slots=True)
+class _Vertex:
+    node_id: Optional[str]
+    width: float
+    height: float
+    cluster: int = -1
+    rank: int = 0
+    order: int = 0
+    x: float = 0.0
+    y: float = 0.0
+    up: List[int] = field(default_factory=list)
+    down: List[int] = field(default_factory=list)
+
+
+def label_lines(label: str) -> List[str]:
+    """Label text split on <br> and wrapped at MAX_LABEL_WIDTH"""
+    lines = []
+    for part in _BREAK.split(label.replace('#quot;', '"')):
+        current = ''
+        for word in _TAG.sub('', part).split():
+            candidate = f"{current} {word}" if current else word
+            if current and len(candidate) * CHAR_WIDTH > MAX_LABEL_WIDTH:
+                lines.append(current)
+                current = word
+            else:
+                current = candidate
+        lines.append(current)
+    return lines
+
+
+def _text_size(lines: List[str]) -> Tuple[float, float]:
+    return max(len(line) for line in lines) * CHAR_WIDTH, len(lines) * LINE_HEIGHT
+
+
+def node_size(node: Node, lines: List[str]) -> Tuple[float, float]:
+    text_width, text_height = _text_size(lines)
+    width, height = text_width + 2 * PADDING_X, text_height + 2 * PADDING_Y
+    if node.shape == "circle":
+        diameter = max(text_width, text_height) + 2 * PADDING_Y
+        return diameter, diameter
+    if node.shape == "rhombus":
+        # The text box's corners have to fit inside the diamond
+        return 2 * text_width + 2 * PADDING_Y, 2 * text_height + 2 * PADDING_Y
+    if node.shape in ("stadium", "hexagon", "asymmetric"):
+        return width + height / 2, height
+    if node.shape == "subroutine":
+        return width + 16, height
+    if node.shape == "cylinder":
+        return width, height + 16
+    return width, height
+
+
+def _break_cycles(count: int, links: List[Tuple[int, int]]) -> List[bool]:
+    """Flags the links to reverse so the graph has no cycles (DFS back edges)"""
+    out: List[List[int]] = [[] for _ in range(count)]
+    for index, (source, target) in enumerate(links):
+        out[source].append(index)
+    state = [0] * count  # 0 unvisited, 1 on the stack, 2 done
+    flipped = [False] * len(links)
+    for root in range(count):
+        if state[root]:
+            continue
+        state[root] = 1
+        stack = [(root, 0)]
+        while stack:
+            vertex, position = stack[-1]
+            if position == len(out[vertex]):
+                state[vertex] = 2
+                stack.pop()
+                continue
+            stack[-1] = (vertex, position + 1)
+            index = out[vertex][position]
+            target = links[index][1]
+            if state[target] == 1:
+                flipped[index] = True
+            elif state[target] == 0:
+                state[target] = 1
+                stack.append((target, 0))
+    return flipped
+
+
+def _rank(count: int, links: List[Tuple[int, int]]) -> List[int]:
+    """Longest-path ranks, every link at least two ranks long; sources are pulled down next to their targets"""
+    out: List[List[int]] = [[] for _ in range(count)]
+    indegree = [0] * count
+    for source, target in links:
+        out[source].append(target)
+        indegree[target] += 1
+    rank = [0] * count
+    queue = [vertex for vertex in range(count) if indegree[vertex] == 0]
+    sources = list(queue)
+    order = []
+    while queue:
+        vertex = queue.pop()
+        order.append(vertex)
+        for target in out[vertex]:
+            rank[target] = max(rank[target], rank[vertex] + 2)
+            indegree[target] -= 1
+            if indegree[target] == 0:
+                queue.append(target)
+    for vertex in sources:
+        if out[vertex]:
+            rank[vertex] = min(rank[target] for target in out[vertex]) - 2
+    low = min(rank, default=0)
+    return [value - low for value in rank]
+
+
+def _crossings(upper: List[_Vertex], vertices: List[_Vertex]) -> int:
+    """Crossings between a rank and the one below it (inversion count with a Fenwick tree)"""
+    pairs = sorted((vertices[v].order, vertices[w].order) for v in upper for w in vertices[v].down)
+    if not pairs:
+        return 0
+    size = max(order for _, order in pairs) + 1
+    tree = [0] * (size + 1)
+    total = 0
+    for seen, (_, order) in enumerate(pairs):
+        # Earlier pairs ending further right cross this one
+        index, below = order + 1, 0
+        while index > 0:
+            below += tree[index]
+            index -= index & -index
+        total += seen - below
+        index = order + 1
+        while index <= size:
+            tree[index] += 1
+            index += index & -index
+    return total
+
+
+def _sort_rank(layer: List[int], vertices: List[_Vertex], neighbours: str):
+    barycenter = {}
+    for v in layer:
+        adjacent = getattr(vertices[v], neighbours)
+        if adjacent:
+            barycenter[v] = sum(vertices[w].order for w in adjacent) / len(adjacent)
+        else:
+            barycenter[v] = float(vertices[v].order)
+    # Members of one subgraph move as a block, at their mean position
+    cluster_total: Dict[int, List[float]] = {}
+    for v in layer:
+        if vertices[v].cluster >= 0:
+            cluster_total.setdefault(vertices[v].cluster, []).append(barycenter[v])
+    cluster_mean = {cluster: sum(values) / len(values) for cluster, values in cluster_total.items()}
+
+    def key(v):
+        cluster = vertices[v].cluster
+        return (cluster_mean[cluster] if cluster >= 0 else barycenter[v], cluster, barycenter[v])
+
+    layer.sort(key=key)
+    for position, v in enumerate(layer):
+        vertices[v].order = position
+
+
+def _order(layers: List[List[int]], vertices: List[_Vertex]):
+    def total_crossings():
+        return sum(_crossings(layers[r], vertices) for r in range(len(layers) - 1))
+
+    best = total_crossings()
+    best_orders = [list(layer) for layer in layers]
+    for sweep in range(ORDER_SWEEPS):
+        if best == 0:
+            break
+        if sweep % 2 == 0:
+            for r in range(1, len(layers)):
+                _sort_rank(layers[r], vertices, "up")
+        else:
+            for r in range(len(layers) - 2, -1, -1):
+                _sort_rank(layers[r], vertices, "down")
+        crossings = total_crossings()
+        if crossings < best:
+            best, best_orders = crossings, [list(layer) for layer in layers]
+    for r, layer in enumerate(best_orders):
+        layers[r] = layer
+        for position, v in enumerate(layer):
+            vertices[v].order = position
+
+
+def _isotonic(targets: List[float], weights: List[float]) -> List[float]:
+    """Weighted least-squares fit to targets that never decreases (pool adjacent violators)"""
+    blocks: List[List[float]] = []  # [weighted sum, weight, count]
+    for target, weight in zip(targets, weights):
+        blocks.append([target * weight, weight, 1])
+        while len(blocks) > 1 and blocks[-2][0] / blocks[-2][1] > blocks[-1][0] / blocks[-1][1]:
+            total, weight_sum, count = blocks.pop()
+            blocks[-1][0] += total
+            blocks[-1][1] += weight_sum
+            blocks[-1][2] += count
+    fitted = []
+    for total, weight_sum, count in blocks:
+        fitted.extend([total / weight_sum] * int(count))
+    return fitted
+
+
+def _place_rank(layer: List[int], vertices: List[_Vertex], neighbours: str):
+    if not layer:
+        return
+    # Minimum centre-to-centre offsets turn "no overlaps" into "non-decreasing"
+    offsets = [0.0]
+    for left, right in zip(layer, layer[1:]):
+        a, b = vertices[left], vertices[right]
+        gap = NODE_SEP if a.node_id is not None and b.node_id is not None else DUMMY_SEP
+        offsets.append(offsets[-1] + (a.width + b.width) / 2 + gap)
+    targets = []
+    weights = []
+    for v, offset in zip(layer, offsets):
+        vertex = vertices[v]
+        adjacent = getattr(vertex, neighbours)
+        desired = sum(vertices[w].x for w in adjacent) / len(adjacent) if adjacent else vertex.x
+        targets.append(desired - offset)
+        # Dummies weigh more so long edges come out straight
+        weights.append((4.0 if vertex.node_id is None else 1.0) * max(len(adjacent), 1) if adjacent else 0.1)
+    for v, fitted, offset in zip(layer, _isotonic(targets, weights), offsets):
+        vertices[v].x = fitted + offset
+
+
+def _place(layers: List[List[int]], vertices: List[_Vertex]):
+    for layer in layers:
+        x = 0.0
+        for v in layer:
+            vertices[v].x = x + vertices[v].width / 2
+            x += vertices[v].width + NODE_SEP
+    for _ in range(PLACEMENT_SWEEPS):
+        for r in range(1, len(layers)):
+            _place_rank(layers[r], vertices, "up")
+        for r in range(len(layers) - 2, -1, -1):
+            _place_rank(layers[r], vertices, "down")
+
+    y = MARGIN
+    for layer in layers:
+        height = max((vertices[v].height for v in layer), default=0.0)
+        for v in layer:
+            vertices[v].y = y + height / 2
+        y += height + RANK_SEP
+    left = min((vertices[v].x - vertices[v].width / 2 for layer in layers for v in layer), default=0.0)
+    for vertex in vertices:
+        vertex.x += MARGIN - left
+
+
+def _subgraph_tree(chart: Flowchart) -> Tuple[Dict[str, List[Subgraph]], Dict[str, int]]:
+    """Child subgraphs of each subgraph, and each node's outermost subgraph"""
+    children: Dict[str, List[Subgraph]] = {}
+    outermost: Dict[str, int] = {}
+    stack: List[Subgraph] = []
+    top_index = {id(subgraph): index for index, subgraph in enumerate(chart.subgraphs)}
+    for statement in chart.statements:
+        if statement[0] == "subgraph":
+            if stack:
+                children.setdefault(stack[-1].id, []).append(statement[1])
+            stack.append(statement[1])
+        elif statement[0] == "end" and stack:
+            stack.pop()
+    parents = {child.id for kids in children.values() for child in kids}
+    for subgraph in chart.subgraphs:
+        if subgraph.id in parents:
+            continue
+        pending = [subgraph]
+        while pending:
+            current = pending.pop()
+            for node_id in current.nodes:
+                outermost.setdefault(node_id, top_index[id(subgraph)])
+            pending.extend(children.get(current.id, []))
+    return children, outermost
+
+
+def _css(text: str) -> Dict[str, str]:
+    style = {}
+    for declaration in re.split(r'[,;]', text or ''):
+        name, _, value = declaration.partition(':')
+        name, value = name.strip(), value.strip()
+        if name in _STYLE_PROPERTIES and value:
+            style[name] = value.replace('px', '') if name == "stroke-width" else value
+    return style
+
+
+def _node_style(chart: Flowchart, node: Node) -> Dict[str, str]:
+    style = dict(NODE_STYLE)
+    style.update(_css(chart.class_defs.get("default", "")))
+    if node.css_class:
+        style.update(_css(chart.class_defs.get(node.css_class, "")))
+    style.update(_css(chart.styles.get(node.id, "")))
+    return style
+
+
+def _boundary(box: NodeBox, toward: Tuple[float, float]) -> Tuple[float, float]:
+    """Where the line from the node's centre toward a point leaves its outline"""
+    dx, dy = toward[0] - box.x, toward[1] - box.y
+    if dx == 0 and dy == 0:
+        return box.x, box.y
+    half_width, half_height = box.width / 2, box.height / 2
+    if box.shape == "circle":
+        scale = half_width / (dx * dx + dy * dy) ** 0.5
+    elif box.shape == "rhombus":
+        scale = 1 / (abs(dx) / half_width + abs(dy) / half_height)
+    else:
+        scale = min(half_width / abs(dx) if dx else float('inf'), half_height / abs(dy) if dy else float('inf'))
+    return box.x + dx * scale, box.y + dy * scale
+
+
+def layout_flowchart(chart: Flowchart) -> Layout:
+    horizontal = chart.direction in ("LR", "RL")
+    node_ids = list(chart.nodes)
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    children, outermost = _subgraph_tree(chart)
+
+    lines = {node_id: label_lines(chart.nodes[node_id].label) for node_id in node_ids}
+    sizes = {node_id: node_size(chart.nodes[node_id], lines[node_id]) for node_id in node_ids}
+    vertices = []
+    for node_id in node_ids:
+        width, height = sizes[node_id]
+        # Layout always runs top-down; LR swaps the axes afterwards
+        vertices.append(_Vertex(node_id, height if horizontal else width, width if horizontal else height,
+                                cluster=outermost.get(node_id, -1)))
+
+    edges = [edge for edge in chart.edges if edge.source in index and edge.target in index]
+    links = [(index[edge.source], index[edge.target]) for edge in edges if edge.source != edge.target]
+    flipped = _break_cycles(len(vertices), links)
+    oriented = [(target, source) if flip else (source, target) for (source, target), flip in zip(links, flipped)]
+    ranks = _rank(len(vertices), oriented)
+    for vertex, rank in zip(vertices, ranks):
+        vertex.rank = rank
+
+    # Chains of vertices per edge, dummies for every rank in between
+    chains = []
+    edge_lines = []
+    link_index = 0
+    for edge in edges:
+        if edge.source == edge.target:
+            chains.append(None)
+            edge_lines.append(label_lines(edge.label) if edge.label else [])
+            continue
+        source, target = oriented[link_index]
+        flip = flipped[link_index]
+        link_index += 1
+        text = label_lines(edge.label) if edge.label else []
+        edge_lines.append(text)
+        middle = (ranks[source] + ranks[target]) // 2
+        chain = [source]
+        for rank in range(ranks[source] + 1, ranks[target]):
+            width, height = _text_size(text) if text and rank == middle else (0.0, 0.0)
+            if text and rank == middle:
+                width, height = (height, width) if horizontal else (width, height)
+                width, height = width + 8, height + 4
+            dummy = _Vertex(None, width, height, rank=rank)
+            vertices.append(dummy)
+            chain.append(len(vertices) - 1)
+        chain.append(target)
+        for upper, lower in zip(chain, chain[1:]):
+            vertices[upper].down.append(lower)
+            vertices[lower].up.append(upper)
+        chains.append((chain[::-1] if flip else chain, middle))
+
+    layers: List[List[int]] = [[] for _ in range(max((v.rank for v in vertices), default=0) + 1)]
+    # Initial order: depth-first from each root in source order, which keeps
+    # chains next to each other before any sweep
+    seen = [False] * len(vertices)
+    for root in range(len(node_ids)):
+        if seen[root] or vertices[root].up:
+            continue
+        stack = [root]
+        while stack:
+            v = stack.pop()
+            if seen[v]:
+                continue
+            seen[v] = True
+            vertices[v].order = len(layers[vertices[v].rank])
+            layers[vertices[v].rank].append(v)
+            stack.extend(reversed(vertices[v].down))
+    for v, vertex in enumerate(vertices):
+        if not seen[v]:
+            vertex.order = len(layers[vertex.rank])
+            layers[vertex.rank].append(v)
+
+    _order(layers, vertices)
+    _place(layers, vertices)
+
+    width = max((v.x + v.width / 2 for v in vertices), default=0.0) + MARGIN
+    height = max((v.y + v.height / 2 for v in vertices), default=0.0) + MARGIN
+
+    def point(vertex: _Vertex) -> Tuple[float, float]:
+        x, y = (vertex.y, vertex.x) if horizontal else (vertex.x, vertex.y)
+        if chart.direction == "BT":
+            y = height - y
+        elif chart.direction == "RL":
+            x = height - x
+        return x, y
+
+    if horizontal:
+        width, height = height, width
+    boxes = {}
+    for node_id, vertex in zip(node_ids, vertices):
+        x, y = point(vertex)
+        box_width, box_height = sizes[node_id]
+        node = chart.nodes[node_id]
+        boxes[node_id] = NodeBox(node_id, lines[node_id], node.shape, x, y, box_width, box_height,
+                                 _node_style(chart, node))
+
+    routes = []
+    for edge, chain, text in zip(edges, chains, edge_lines):
+        source = boxes[edge.source]
+        if chain is None:
+            # Self loop on the right-hand side
+            right = source.x + source.width / 2
+            points = [(right, source.y - source.height / 4), (right + 30, source.y - source.height / 2),
+                      (right + 30, source.y + source.height / 2), (right, source.y + source.height / 4)]
+            routes.append(EdgeRoute(edge, points, (right + 30, source.y) if text else None, text))
+            width = max(width, right + 40 + (max(len(line) for line in text) * CHAR_WIDTH if text else 0))
+            continue
+        path, middle = chain
+        points = [point(vertices[v]) for v in path]
+        label_at = None
+        if text:
+            label_at = next(point(vertices[v]) for v in path if vertices[v].rank == middle)
+        target = boxes[edge.target]
+        points[0] = _boundary(source, points[1])
+        points[-1] = _boundary(target, points[-2])
+        routes.append(EdgeRoute(edge, points, label_at, text))
+
+    clusters = []
+
+    def cluster_box(subgraph: Subgraph) -> Optional[Tuple[float, float, float, float]]:
+        extents = []
+        for node_id in subgraph.nodes:
+            if node_id in boxes:
+                box = boxes[node_id]
+                extents.append((box.x - box.width / 2, box.y - box.height / 2,
+                                box.x + box.width / 2, box.y + box.height / 2))
+        for child in children.get(subgraph.id, []):
+            extent = cluster_box(child)
+            if extent:
+                extents.append(extent)
+        if not extents:
+            return None
+        left = min(e[0] for e in extents) - CLUSTER_PADDING
+        top = min(e[1] for e in extents) - CLUSTER_PADDING - CLUSTER_TITLE
+        right = max(e[2] for e in extents) + CLUSTER_PADDING
+        bottom = max(e[3] for e in extents) + CLUSTER_PADDING
+        clusters.append(ClusterBox(subgraph, left, top, right - left, bottom - top))
+        return left, top, right, bottom
+
+    nested = {child.id for kids in children.values() for child in kids}
+    for subgraph in chart.subgraphs:
+        if subgraph.id not in nested:
+            cluster_box(subgraph)
+    # Outer boxes first so inner ones are drawn on top
+    clusters.sort(key=lambda c: -(c.width * c.height))
+
+    # Cluster titles can poke above the first rank; shift everything down
+    shift_x = max((MARGIN - c.x for c in clusters), default=0.0)
+    shift_y = max((MARGIN - c.y for c in clusters), default=0.0)
+    shift_x, shift_y = max(shift_x, 0.0), max(shift_y, 0.0)
+    if shift_x or shift_y:
+        for box in boxes.values():
+            box.x += shift_x
+            box.y += shift_y
+        for route in routes:
+            route.points = [(x + shift_x, y + shift_y) for x, y in route.points]
+            if route.label_at:
+                route.label_at = (route.label_at[0] + shift_x, route.label_at[1] + shift_y)
+        for cluster in clusters:
+            cluster.x += shift_x
+            cluster.y += shift_y
+    width = max([width + shift_x] + [c.x + c.width + MARGIN for c in clusters])
+    height = max([height + shift_y] + [c.y + c.height + MARGIN for c in clusters])
+    return Layout(width, height, boxes, routes, clusters)
+
+
+def _fmt(value: float) -> str:
+    return f"{value:.1f}".rstrip('0').rstrip('.')
+
+
+def _attrs(style: Dict[str, str]) -> str:
+    return ' '.join(f'{name}="{html.escape(value, quote=True)}"' for name, value in style.items()
+                    if name not in ("color", "font-weight"))
+
+
+def _text(lines: List[str], x: float, y: float, color: str = "#333333", weight: str = "normal") -> str:
+    top = y - (len(lines) - 1) * LINE_HEIGHT / 2
+    spans = ''.join(
+        f'<tspan x="{_fmt(x)}" y="{_fmt(top + i * LINE_HEIGHT)}">{html.escape(line)}</tspan>'
+        for i, line in enumerate(lines)
+    )
+    return (f'<text text-anchor="middle" dominant-baseline="central" fill="{html.escape(color, quote=True)}" '
+            f'font-weight="{html.escape(weight, quote=True)}">{spans}</text>')
+
+
+def _shape(box: NodeBox) -> str:
+    x, y, w, h = box.x - box.width / 2, box.y - box.height / 2, box.width, box.height
+    attrs = _attrs(box.style)
+    if box.shape == "circle":
+        return f'<circle cx="{_fmt(box.x)}" cy="{_fmt(box.y)}" r="{_fmt(w / 2)}" {attrs}/>'
+    if box.shape == "rhombus":
+        points = [(box.x, y), (x + w, box.y), (box.x, y + h), (x, box.y)]
+    elif box.shape == "hexagon":
+        inset = h / 4
+        points = [(x + inset, y), (x + w - inset, y), (x + w, box.y), (x + w - inset, y + h), (x + inset, y + h),
+                  (x, box.y)]
+    elif box.shape == "asymmetric":
+        points = [(x, y), (x + w, y), (x + w, y + h), (x, y + h), (x + h / 4, box.y)]
+    else:
+        points = None
+    if points:
+        return f'<polygon points="{" ".join(f"{_fmt(px)},{_fmt(py)}" for px, py in points)}" {attrs}/>'
+    if box.shape == "cylinder":
+        ry = 8
+        return (f'<path d="M{_fmt(x)},{_fmt(y + ry)} a{_fmt(w / 2)},{ry} 0 0,0 {_fmt(w)},0 '
+                f'a{_fmt(w / 2)},{ry} 0 0,0 {_fmt(-w)},0 v{_fmt(h - 2 * ry)} '
+                f'a{_fmt(w / 2)},{ry} 0 0,0 {_fmt(w)},0 v{_fmt(-(h - 2 * ry))}" {attrs}/>')
+    radius = {"round": 5, "stadium": h / 2}.get(box.shape, 0)
+    rect = (f'<rect x="{_fmt(x)}" y="{_fmt(y)}" width="{_fmt(w)}" height="{_fmt(h)}" '
+            f'rx="{_fmt(radius)}" {attrs}/>')
+    if box.shape == "subroutine":
+        rect += (f'<path d="M{_fmt(x + 8)},{_fmt(y)} v{_fmt(h)} M{_fmt(x + w - 8)},{_fmt(y)} v{_fmt(h)}" '
+                 f'{_attrs({"stroke": box.style.get("stroke", NODE_STYLE["stroke"]), "fill": "none"})}/>')
+    return rect
+
+
+def _path(points: List[Tuple[float, float]]) -> str:
+    if len(points) == 2:
+        (x1, y1), (x2, y2) = points
+        return f"M{_fmt(x1)},{_fmt(y1)} L{_fmt(x2)},{_fmt(y2)}"
+    # Catmull-Rom through the points, as cubic Bezier segments
+    parts = [f"M{_fmt(points[0][0])},{_fmt(points[0][1])}"]
+    padded = [points[0]] + points + [points[-1]]
+    for i in range(1, len(padded) - 2):
+        p0, p1, p2, p3 = padded[i - 1], padded[i], padded[i + 1], padded[i + 2]
+        c1 = (p1[0] + (p2[0] - p0[0]) / 6, p1[1] + (p2[1] - p0[1]) / 6)
+        c2 = (p2[0] - (p3[0] - p1[0]) / 6, p2[1] - (p3[1] - p1[1]) / 6)
+        parts.append(f"C{_fmt(c1[0])},{_fmt(c1[1])} {_fmt(c2[0])},{_fmt(c2[1])} {_fmt(p2[0])},{_fmt(p2[1])}")
+    return ' '.join(parts)
+
+
+def _edge(route: EdgeRoute) -> str:
+    arrow = route.edge.arrow
+    attrs = [f'd="{_path(route.points)}"', 'fill="none"', f'stroke="{EDGE_COLOR}"',
+             f'stroke-width="{3 if "=" in arrow else 1.5}"']
+    if '.' in arrow:
+        attrs.append('stroke-dasharray="3 3"')
+    head = {'>': 'arrow', 'o': 'circle', 'x': 'cross'}.get(arrow[-1])
+    if head:
+        attrs.append(f'marker-end="url(#fc-{head})"')
+    if arrow.startswith('<'):
+        attrs.append('marker-start="url(#fc-arrow-start)"')
+    svg = f'<path {" ".join(attrs)}/>'
+    if route.label_at and route.lines:
+        x, y = route.label_at
+        text_width, text_height = _text_size(route.lines)
+        svg += (f'<rect x="{_fmt(x - text_width / 2 - 4)}" y="{_fmt(y - text_height / 2 - 2)}" '
+                f'width="{_fmt(text_width + 8)}" height="{_fmt(text_height + 4)}" fill="#ffffff" opacity="0.9"/>')
+        svg += _text(route.lines, x, y)
+    return svg
+
+
+_DEFS = (
+    '<defs>'
+    f'<marker id="fc-arrow" viewBox="0 0 10 10" refX="9" refY="5" markerWidth="8" markerHeight="8" '
+    f'markerUnits="userSpaceOnUse" orient="auto"><path d="M0,0 L10,5 L0,10 z" fill="{EDGE_COLOR}"/></marker>'
+    f'<marker id="fc-arrow-start" viewBox="0 0 10 10" refX="1" refY="5" markerWidth="8" markerHeight="8" '
+    f'markerUnits="userSpaceOnUse" orient="auto"><path d="M10,0 L0,5 L10,10 z" fill="{EDGE_COLOR}"/></marker>'
+    f'<marker id="fc-circle" viewBox="0 0 10 10" refX="9" refY="5" markerWidth="8" markerHeight="8" '
+    f'markerUnits="userSpaceOnUse"><circle cx="5" cy="5" r="4" fill="{EDGE_COLOR}"/></marker>'
+    f'<marker id="fc-cross" viewBox="0 0 10 10" refX="9" refY="5" markerWidth="9" markerHeight="9" '
+    f'markerUnits="userSpaceOnUse"><path d="M1,1 L9,9 M9,1 L1,9" stroke="{EDGE_COLOR}" stroke-width="2"/></marker>'
+    '</defs>'
+)
+
+
+def layout_to_svg(layout: Layout) -> str:
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{_fmt(layout.width)}" height="{_fmt(layout.height)}" '
+        f'viewBox="0 0 {_fmt(layout.width)} {_fmt(layout.height)}" font-family="{FONT_FAMILY}" '
+        f'font-size="{FONT_SIZE}">',
+        _DEFS,
+        f'<rect width="100%" height="100%" fill="#ffffff"/>',
+    ]
+    for cluster in layout.clusters:
+        parts.append(f'<rect x="{_fmt(cluster.x)}" y="{_fmt(cluster.y)}" width="{_fmt(cluster.width)}" '
+                     f'height="{_fmt(cluster.height)}" rx="4" {_attrs(CLUSTER_STYLE)}/>')
+        parts.append(_text(label_lines(cluster.subgraph.title)[:1], cluster.x + cluster.width / 2,
+                           cluster.y + CLUSTER_TITLE / 2 + 4, weight="bold"))
+    for route in layout.edges:
+        parts.append(_edge(route))
+    for box in layout.nodes.values():
+        parts.append(_shape(box))
+        parts.append(_text(box.lines, box.x, box.y, box.style.get("color", "#333333"),
+                           box.style.get("font-weight", "normal")))
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+class DiagramTooLarge(ValueError):
+    """The flowchart has more nodes or edges than the server renderer lays out"""
+
+    def __init__(self, nodes: int, edges: int):
+        super().__init__(f"{nodes} nodes and {edges} edges is over the server renderer's "
+                         f"limit of {MAX_NODES} nodes and {MAX_EDGES} edges")
+        self.nodes = nodes
+        self.edges = edges
+
+
+def render_svg(diagram: str) -> Optional[str]:
+    """SVG for a flowchart's text; None for other diagram types, DiagramTooLarge past the limits"""
+    chart = parse_flowchart(diagram)
+    if chart.source is not None:
+        return None
+    if len(chart.nodes) > MAX_NODES or len(chart.edges) > MAX_EDGES:
+        raise DiagramTooLarge(len(chart.nodes), len(chart.edges))
+    return layout_to_svg(layout_flowchart(chart))
@@ -0,0 +1,266 @@
+# utils/history.py
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from utils.analysis_store import analysis_key
+from utils.models import Analysis
+from utils.search import FACETS, SEARCH_FIELDS, build_match_query, search_document
+
+DEFAULT_HISTORY_PATH = Path(".cache") / "history.sqlite3"
+
+
+class AnalysisHistory:
+    """
+    Persistent SQLite log of generated designs: requirements, preferences,
+    raw response, parsed analysis (compact encoding) and timing.
+
+    Listing reads only the small indexed columns, so it stays fast with tens
+    of thousands of records; the large columns are loaded per record.
+
+    Each record is also added to an FTS5 inverted index (component names,
+    technologies, step details, diagram node labels) and its preferences are
+    copied into indexed facet columns, so search() is ranked by BM25 and can
+    filter on frontend / database / cloud_provider / cache_strategy.
+
+    Records are keyed by the analysis content hash: recording a design that
+    is already there (a cache hit or a near-duplicate match shown again)
+    returns the existing record instead of adding a copy.
+    """
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_HISTORY_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS designs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at REAL NOT NULL,
+                title TEXT NOT NULL,
+                description TEXT NOT NULL,
+                preferences TEXT NOT NULL,
+                mode TEXT,
+                duration_s REAL,
+                raw_response TEXT,
+                analysis TEXT NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_designs_created ON designs (created_at DESC)")
+        self._migrate_facets()
+        self._migrate_analysis_key()
+        self._conn.execute(
+            f"""CREATE VIRTUAL TABLE IF NOT EXISTS designs_fts USING fts5(
+                {', '.join(name for name, _ in SEARCH_FIELDS)},
+                tokenize='porter unicode61'
+            )"""
+        )
+        self._index_missing()
+        self._conn.commit()
+
+    def _migrate_facets(self):
+        # Histories written before search existed lack the facet columns
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(designs)")}
+        for facet in FACETS:
+            if facet not in columns:
+                self._conn.execute(f"ALTER TABLE designs ADD COLUMN {facet} TEXT")
+                self._conn.execute(
+                    f"UPDATE designs SET {facet} = json_extract(preferences, '$.{facet}')"
+                )
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_designs_{facet} ON designs ({facet}, created_at DESC)"
+            )
+
+    def _migrate_analysis_key(self):
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(designs)")}
+        if 'analysis_key' not in columns:
+            self._conn.execute("ALTER TABLE designs ADD COLUMN analysis_key TEXT")
+        rows = self._conn.execute("SELECT id, analysis FROM designs WHERE analysis_key IS NULL").fetchall()
+        self._conn.executemany(
+            "UPDATE designs SET analysis_key = ? WHERE id = ?",
+            [(analysis_key(Analysis.from_compact(compact)), design_id) for design_id, compact in rows],
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_designs_analysis_key ON designs (analysis_key)")
+
+    def _index_missing(self):
+        # Ids only grow and records are indexed in id order, so anything past
+        # the highest indexed id is new (or predates the index)
+        rows = self._conn.execute(
+            """SELECT id, title, preferences, analysis FROM designs
+               WHERE id > (SELECT IFNULL(MAX(rowid), 0) FROM designs_fts)"""
+        ).fetchall()
+        for design_id, title, preferences, compact in rows:
+            self._index(design_id, title, Analysis.from_compact(compact), json.loads(preferences))
+
+    def _index(self, design_id: int, title: str, analysis: Analysis, preferences: Dict[str, Any]):
+        document = search_document(title, analysis, preferences)
+        names = [name for name, _ in SEARCH_FIELDS]
+        self._conn.execute(
+            f"INSERT INTO designs_fts (rowid, {', '.join(names)}) VALUES (?{', ?' * len(names)})",
+            (design_id, *(document[name] for name in names)),
+        )
+
+    def record(
+        self,
+        requirements: Dict[str, Any],
+        analysis: Analysis,
+        raw_response: Optional[str] = None,
+        duration_s: Optional[float] = None,
+        mode: Optional[str] = None,
+    ) -> int:
+        """Id of the new record, or of the existing one holding the same analysis"""
+        description = requirements.get('description', '')
+        title = ' '.join(description.split())[:100] or 'Untitled design'
+        preferences = requirements.get('preferences', {})
+        compact = analysis.to_compact()
+        key = analysis_key(analysis)
+        with self._lock:
+            existing = self._conn.execute(
+                "SELECT id FROM designs WHERE analysis_key = ? ORDER BY id LIMIT 1", (key,)
+            ).fetchone()
+            if existing is not None:
+                return existing[0]
+            cursor = self._conn.execute(
+                f"""INSERT INTO designs
+                   (created_at, title, description, preferences, mode, duration_s, raw_response, analysis,
+                    analysis_key, {', '.join(FACETS)})
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?{', ?' * len(FACETS)})""",
+                (
+                    time.time(),
+                    title,
+                    description,
+                    json.dumps(preferences, sort_keys=True),
+                    mode,
+                    duration_s,
+                    raw_response,
+                    compact,
+                    key,
+                    *(preferences.get(facet) for facet in FACETS),
+                ),
+            )
+            self._index(cursor.lastrowid, title, analysis, preferences)
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def list_recent(self, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        """Newest first; only summary columns"""
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT id, created_at, title, preferences, mode, duration_s
+                   FROM designs ORDER BY created_at DESC LIMIT ? OFFSET ?""",
+                (limit, offset),
+            ).fetchall()
+        return [self._summary(row) for row in rows]
+
+    @staticmethod
+    def _summary(row) -> Dict[str, Any]:
+        return {
+            "id": row[0],
+            "created_at": row[1],
+            "title": row[2],
+            "preferences": json.loads(row[3]),
+            "mode": row[4],
+            "duration_s": row[5],
+        }
+
+    def search(
+        self,
+        query: str = '',
+        facets: Optional[Dict[str, str]] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """
+        Designs matching every word of the query, best BM25 score first, and
+        restricted to the given facet values. Without query words this is
+        list_recent filtered by facets.
+        """
+        where = []
+        params: List[Any] = []
+        for facet, value in (facets or {}).items():
+            if facet not in FACETS:
+                raise ValueError(f"Unknown facet: {facet}")
+            if value:
+                where.append(f"d.{facet} = ?")
+                params.append(value)
+
+        match = build_match_query(query, facets)
+        columns = "d.id, d.created_at, d.title, d.preferences, d.mode, d.duration_s"
+        if match is None:
+            sql = f"SELECT {columns}, NULL FROM designs d"
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            sql += " ORDER BY d.created_at DESC LIMIT ? OFFSET ?"
+        else:
+            weights = ', '.join(str(weight) for _, weight in SEARCH_FIELDS)
+            sql = f"""SELECT {columns}, bm25(designs_fts, {weights}) AS score
+                      FROM designs_fts JOIN designs d ON d.id = designs_fts.rowid
+                      WHERE designs_fts MATCH ?"""
+            params.insert(0, match)
+            for clause in where:
+                sql += " AND " + clause
+            sql += " ORDER BY score LIMIT ? OFFSET ?"
+        params += [limit, offset]
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        results = []
+        for row in rows:
+            summary = self._summary(row)
+            # bm25() is lower-is-better; flip it so larger means more relevant
+            summary["score"] = -row[6] if row[6] is not None else None
+            results.append(summary)
+        return results
+
+    def facet_values(self) -> Dict[str, List[str]]:
+        """Distinct stored values per facet, for building filter controls"""
+        values = {}
+        with self._lock:
+            for facet in FACETS:
+                # Skip through the facet index one distinct value at a time
+                # rather than letting DISTINCT walk every row
+                found = []
+                row = self._conn.execute(f"SELECT MIN({facet}) FROM designs").fetchone()
+                while row[0] is not None:
+                    found.append(row[0])
+                    row = self._conn.execute(
+                        f"SELECT MIN({facet}) FROM designs WHERE {facet} > ?", (row[0],)
+                    ).fetchone()
+                values[facet] = found
+        return values
+
+    def get(self, design_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                """SELECT id, created_at, description, preferences, mode, duration_s, raw_response, analysis
+                   FROM designs WHERE id = ?""",
+                (design_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "created_at": row[1],
+            "description": row[2],
+            "preferences": json.loads(row[3]),
+            "mode": row[4],
+            "duration_s": row[5],
+            "raw_response": row[6],
+            "analysis": Analysis.from_compact(row[7]),
+        }
+
+    def count(self) -> int:
+        with self._lock:
+            (total,) = self._conn.execute("SELECT COUNT(*) FROM designs").fetchone()
+        return total
+
+    def delete(self, design_id: int):
+        with self._lock:
+            self._conn.execute("DELETE FROM designs WHERE id = ?", (design_id,))
+            self._conn.execute("DELETE FROM designs_fts WHERE rowid = ?", (design_id,))
+            self._conn.commit()
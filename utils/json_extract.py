@@ -0,0 +1,224 @@
+# utils/json_extract.py
+import json
+import re
+from typing import Any, Dict
+
+# Characters that need attention outside of strings
+_STRUCTURAL = re.compile(r'["`{}\[\],:]')
+# Characters that need attention inside a double-quoted string
+_IN_STRING = re.compile(r'["\\\x00-\x1f]')
+# Characters that need attention inside a backtick-quoted string
+_IN_BACKTICK = re.compile(r'[`"\\\x00-\x1f]')
+_VALID_ESCAPES = set('"\\/bfnrtu')
+_CONTROL_ESCAPES = {'\n': '\\n', '\r': '\\r', '\t': '\\t'}
+# After one of these a new value needs a separating comma
+_VALUE_END = ('"', '}', ']', 'literal')
+# A failed raw_decode costs O(position): JSONDecodeError counts the lines
+# before the error. Past this many failures the document is broken all over
+# and the rest is walked token by token.
+FAST_PATH_FAILURES = 32
+
+
+class JSONExtractionError(ValueError):
+    """Raised when no usable JSON object can be recovered from a response"""
+
+
+class TruncatedJSONError(JSONExtractionError):
+    """Raised when the response ends before its JSON object is closed"""
+
+
+# Strict, so a value with raw control characters in its strings is walked
+# and escaped rather than copied through
+_STRICT_DECODER = json.JSONDecoder()
+
+
+def _escape_control(ch: str) -> str:
+    return _CONTROL_ESCAPES.get(ch) or f'\\u{ord(ch):04x}'
+
+
+def repair_json(text: str) -> str:
+    """
+    Locate the outermost JSON object in an LLM response and repair it in a
+    single forward pass.
+
+    Handles markdown fences around or inside the object, backtick-quoted
+    values (typically the Mermaid diagram), raw newlines and control
+    characters inside strings, unescaped quotes inside strings, invalid
+    backslash escapes, trailing commas and missing commas between values.
+    String contents are preserved, newlines included.
+
+    Nested objects and arrays that are already valid JSON are copied whole
+    after a C-level raw_decode, so the Python loop only walks the parts that
+    need repair. After FAST_PATH_FAILURES failed attempts the rest is only
+    walked, so a response with errors everywhere costs little more than the
+    walk alone.
+    """
+    start = text.find('{')
+    if start == -1:
+        raise JSONExtractionError("No valid JSON structure found")
+
+    out = []
+    depth = 0
+    pos = start
+    n = len(text)
+    last = None        # last significant token emitted outside strings
+    comma_slot = None  # index in out of a comma that may turn out to be trailing
+    failures = 0
+
+    while pos < n:
+        match = _STRUCTURAL.search(text, pos)
+        if match is None:
+            break
+        idx = match.start()
+        run = text[pos:idx]
+        if run.strip():
+            # Skip fence markers and language tags, keep literals (numbers, true, null)
+            literal = run.strip()
+            if literal not in ('json', 'mermaid'):
+                if last in _VALUE_END:
+                    out.append(',')
+                out.append(run)
+                last = 'literal'
+        elif run:
+            out.append(run)
+        ch = text[idx]
+        pos = idx + 1
+
+        if ch == '`':
+            if text.startswith('``', pos):
+                # Markdown fence: drop it along with its language tag
+                eol = text.find('\n', pos)
+                pos = n if eol == -1 else eol + 1
+                continue
+            if last in _VALUE_END:
+                out.append(',')
+            pos = _copy_string(text, pos, out, '`')
+            last = '"'
+            continue
+
+        if ch == '"':
+            if last in _VALUE_END:
+                out.append(',')
+            pos = _copy_string(text, pos, out, '"')
+            last = '"'
+            continue
+
+        if ch in '{[':
+            if last in _VALUE_END:
+                out.append(',')
+            # The outermost object has just failed to decode in extract_json
+            if depth and failures < FAST_PATH_FAILURES:
+                end = _valid_value_end(text, idx)
+                if end is not None:
+                    out.append(text[idx:end])
+                    pos = end
+                    last = '}'
+                    continue
+                failures += 1
+            depth += 1
+            out.append(ch)
+            last = ch
+        elif ch in '}]':
+            if last == ',' and comma_slot is not None:
+                out[comma_slot] = ''
+            depth -= 1
+            out.append(ch)
+            last = ch
+            if depth == 0:
+                return ''.join(out)
+        elif ch == ',':
+            if last == ',':
+                continue
+            comma_slot = len(out)
+            out.append(ch)
+            last = ch
+        else:  # ':'
+            out.append(ch)
+            last = ch
+
+    raise TruncatedJSONError("Unterminated JSON object in response")
+
+
+def _copy_string(text: str, pos: int, out: list, quote: str) -> int:
+    """
+    Copy a string body starting just after its opening quote into out as a
+    valid JSON string and return the position after the closing quote
+    """
+    pattern = _IN_BACKTICK if quote == '`' else _IN_STRING
+    n = len(text)
+    out.append('"')
+    while True:
+        match = pattern.search(text, pos)
+        if match is None:
+            raise TruncatedJSONError("Unterminated string in response")
+        idx = match.start()
+        out.append(text[pos:idx])
+        ch = text[idx]
+        pos = idx + 1
+
+        if ch == quote:
+            if quote == '"' and not _closes_string(text, pos):
+                # An unescaped quote inside the string
+                out.append('\\"')
+                continue
+            out.append('"')
+            return pos
+        if ch == '"':
+            out.append('\\"')
+        elif ch == '\\':
+            nxt = text[pos] if pos < n else ''
+            if quote == '"' and nxt in _VALID_ESCAPES:
+                out.append(ch + nxt)
+                pos += 1
+            else:
+                out.append('\\\\')
+        else:
+            out.append(_escape_control(ch))
+
+
+def _valid_value_end(text: str, idx: int):
+    """End of the well-formed JSON value starting at idx, or None"""
+    try:
+        return _STRICT_DECODER.raw_decode(text, idx)[1]
+    except (json.JSONDecodeError, RecursionError):
+        return None
+
+
+def _closes_string(text: str, pos: int) -> bool:
+    """A quote closes its string when the next significant character is structural"""
+    n = len(text)
+    while pos < n and text[pos] in ' \t\r\n':
+        pos += 1
+    return pos >= n or text[pos] in ',:}]"'
+
+
+_DECODER = json.JSONDecoder(strict=False)
+
+
+def is_truncated(text: str) -> bool:
+    """True when the response opens a JSON object but never closes it"""
+    try:
+        repair_json(text)
+    except TruncatedJSONError:
+        return True
+    except JSONExtractionError:
+        return False
+    return False
+
+
+def extract_json(text: str) -> Dict[str, Any]:
+    """Extract and decode the outermost JSON object from an LLM response"""
+    start = text.find('{')
+    if start != -1:
+        # Well-formed responses decode directly; only malformed ones pay for a repair
+        try:
+            data, _ = _DECODER.raw_decode(text, start)
+            return data
+        except json.JSONDecodeError:
+            pass
+
+    repaired = repair_json(text)
+    try:
+        return json.loads(repaired)
+    except json.JSONDecodeError as e:
+        raise JSONExtractionError(f"Invalid JSON format at position {e.pos}: {e.msg}") from e
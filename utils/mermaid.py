@@ -0,0 +1,673 @@
+# utils/mermaid.py
+"""
+Parser, graph model and pretty-printer for the Mermaid flowchart subset the
+app works with: graph/flowchart headers, node shapes, plain and labelled
+arrows, & groups, comments, init directives, front matter, classDef / class /
+style, and subgraphs.
+
+The parser is a single left-to-right scan with anchored token matches, so it
+runs in linear time even on diagrams collapsed onto one line. It never raises
+on bad input; anything it cannot make sense of is kept verbatim and reported
+in Flowchart.issues with its line number and a short code.
+"""
+import bisect
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+DIRECTIONS = ("TD", "TB", "BT", "RL", "LR")
+
+# Node shape openers, longest first, with their closer and shape name
+_SHAPES = (
+    ("[(", ")]", "cylinder"),
+    ("((", "))", "circle"),
+    ("([", "])", "stadium"),
+    ("[[", "]]", "subroutine"),
+    ("{{", "}}", "hexagon"),
+    ("[", "]", "rect"),
+    ("(", ")", "round"),
+    ("{", "}", "rhombus"),
+    (">", "]", "asymmetric"),
+)
+SHAPE_DELIMITERS = {shape: (opener, closer) for opener, closer, shape in _SHAPES}
+
+_ID = re.compile(r'[A-Za-z0-9_]+(?:-[A-Za-z0-9_]+)*')
+_WORD = re.compile(r'[A-Za-z]+')
+# Headers of the other Mermaid diagram types, which are passed through as-is
+_OTHER_DIAGRAM = re.compile(
+    r'(?:sequenceDiagram|classDiagram(?:-v2)?|stateDiagram(?:-v2)?|erDiagram|journey|gantt|pie|'
+    r'quadrantChart|requirementDiagram|gitGraph|C4\w+|mindmap|timeline|sankey-beta|xychart-beta|'
+    r'block-beta|packet-beta|architecture-beta)(?![\w-])'
+)
+_INLINE_SPACE = re.compile(r'[ \t\r]*')
+_SPACE = re.compile(r'[\s;]*')
+_SHAPE_BY_OPENER = {opener: (closer, shape) for opener, closer, shape in _SHAPES}
+# Fast path for the common node forms: an id with an optional bracket-free
+# label. Labels cannot contain any bracket, so the match never backtracks;
+# quoted or nested labels fall through to the general scan.
+_SIMPLE_NODE_PATTERN = (
+    r'([A-Za-z0-9_]+(?:-[A-Za-z0-9_]+)*)'
+    r'(?:(\[\(|\(\(|\(\[|\[\[|\{\{|\[|\(|\{)([^\n"\[\](){}|]*)(\)\]|\)\)|\]\)|\]\]|\}\}|\]|\)|\}))?'
+)
+_SIMPLE_NODE = re.compile(_SIMPLE_NODE_PATTERN)
+# Whole "A[..] -->|..| B[..]" statement in one match, the bulk of model output
+_SIMPLE_EDGE = re.compile(
+    _SIMPLE_NODE_PATTERN
+    + r'[ \t]*(-->|---|==>|-\.->)[ \t]*(?:\|([^|\n"]*)\|)?[ \t]*'
+    + _SIMPLE_NODE_PATTERN
+)
+# Arrow with optional |label|, or a text arrow: A -- text --> B, A == text ==> B, A -. text .-> B.
+# The text may not run into another arrow, which keeps a failed match short
+_LINK = re.compile(
+    r'[ \t]*(?:(<?(?:-{2,}>|-{3,}|={2,}>|={3,}|-\.+->|-\.+-|--[xo]|==[xo]))[ \t]*(?:\|([^|\n]*)\|)?'
+    r'|(?:--|==|-\.)[ \t]+((?:[^\n|>=.-]|[=.-](?![=.-]))+?)[ \t]*(-{2,}>|-{3,}|={2,}>|={3,}|\.->|\.-))[ \t]*'
+)
+_GROUP_JOIN = re.compile(r'[ \t]*&[ \t]*')
+_CLASS_SUFFIX = re.compile(r':::([A-Za-z0-9_-]+)')
+_CSS = re.compile(r'[^\s;]+(?:[ \t]*,[ \t]*[^\s;]+)*')
+# class a,b name -- DiagramGenerator also writes the ids space-separated
+_CLASS_ARGS = re.compile(r'[A-Za-z0-9_-]+(?:(?:[ \t]*,[ \t]*|[ \t]+)[A-Za-z0-9_-]+)+')
+_ID_SEPARATOR = re.compile(r'[ \t]*,[ \t]*|[ \t]+')
+_REST_OF_LINE = re.compile(r'[^\n;]*')
+_HEADER_LINE = re.compile(r'^[ \t]*(?:graph|flowchart)\b', re.MULTILINE)
+# Where a comment on a collapsed one-line diagram really ends: the first
+# arrow or statement keyword after it
+_COMMENT_BREAK = re.compile(r'<?(?:-{2,}>|-{3,}|={2,}>|-\.+->)|\b(?:classDef|linkStyle|subgraph)\b')
+_LABEL_NEEDS_QUOTES = re.compile(r'[\[\](){}|"<>;]|^\s|\s$')
+
+
+@dataclass(slots=True)
+class Node:
+    id: str
+    label: str
+    shape: str = "rect"
+    line: int = 0
+    css_class: Optional[str] = None
+
+
+@dataclass(slots=True)
+class Edge:
+    source: str
+    target: str
+    label: str = ""
+    arrow: str = "-->"
+    line: int = 0
+
+
+@dataclass(slots=True)
+class Subgraph:
+    id: str
+    title: str
+    nodes: List[str] = field(default_factory=list)
+    direction: Optional[str] = None
+    line: int = 0
+
+
+@dataclass(slots=True)
+class Issue:
+    line: int
+    code: str
+    message: str
+    text: str = ""
+
+    def __str__(self):
+        return f"line {self.line}: {self.message}" + (f" ({self.text})" if self.text else "")
+
+
+class Flowchart:
+    """
+    Indexed graph of a parsed flowchart. Nodes are keyed by id in first-seen
+    order; out_edges / in_edges map a node id to indexes into edges.
+    statements keeps the source order (comments included) for printing.
+    """
+
+    def __init__(self, direction: str = "TD"):
+        self.direction = direction
+        self.keyword = "graph"
+        # Original text when the source is some other diagram type
+        self.source: Optional[str] = None
+        self.front_matter: Optional[str] = None
+        self.directives: List[str] = []
+        self.nodes: Dict[str, Node] = {}
+        self.edges: List[Edge] = []
+        self.subgraphs: List[Subgraph] = []
+        self.class_defs: Dict[str, str] = {}
+        self.styles: Dict[str, str] = {}
+        self.out_edges: Dict[str, List[int]] = {}
+        self.in_edges: Dict[str, List[int]] = {}
+        self.issues: List[Issue] = []
+        self.statements: List[tuple] = []
+
+    def add_node(self, node_id: str, label: Optional[str] = None, shape: Optional[str] = None,
+                 line: int = 0) -> Node:
+        node = self.nodes.get(node_id)
+        if node is None:
+            node = Node(node_id, label if label is not None else node_id, shape or "rect", line)
+            self.nodes[node_id] = node
+            self.out_edges[node_id] = []
+            self.in_edges[node_id] = []
+        elif label is not None:
+            if (node.label != node.id or node.shape != "rect") and (label, shape or node.shape) != (node.label, node.shape):
+                self.issues.append(Issue(line, "redefined-node", f"node {node_id} is defined again", label))
+            # Like Mermaid, a later definition overrides the label and shape
+            node.label = label
+            node.shape = shape or node.shape
+        return node
+
+    def add_edge(self, source: str, target: str, label: str = "", arrow: str = "-->", line: int = 0) -> Edge:
+        self.add_node(source, line=line)
+        self.add_node(target, line=line)
+        edge = Edge(source, target, label, arrow, line)
+        self.out_edges[source].append(len(self.edges))
+        self.in_edges[target].append(len(self.edges))
+        self.edges.append(edge)
+        self.statements.append(("edge", edge))
+        return edge
+
+    def rename_node(self, old: str, new: str):
+        """Changes a node id everywhere it is used; renaming onto an existing id merges the two"""
+        if old not in self.nodes or old == new:
+            return
+        node = self.nodes[old]
+        if new in self.nodes:
+            del self.nodes[old]
+        else:
+            node.id = new
+            self.nodes = {(new if key == old else key): value for key, value in self.nodes.items()}
+        for edge in self.edges:
+            if edge.source == old:
+                edge.source = new
+            if edge.target == old:
+                edge.target = new
+        self.reindex()
+        for index, statement in enumerate(self.statements):
+            if statement[0] == "node" and statement[1] == old:
+                self.statements[index] = ("node", new, statement[2])
+            elif statement[0] == "class" and old in statement[1]:
+                self.statements[index] = ("class", [new if node_id == old else node_id for node_id in statement[1]],
+                                          statement[2])
+        for subgraph in self.subgraphs:
+            subgraph.nodes = [new if node_id == old else node_id for node_id in subgraph.nodes]
+        if old in self.styles:
+            self.styles.setdefault(new, self.styles.pop(old))
+
+    def reindex(self):
+        """Rebuilds out_edges / in_edges after edges were changed in place"""
+        self.out_edges = {node_id: [] for node_id in self.nodes}
+        self.in_edges = {node_id: [] for node_id in self.nodes}
+        for index, edge in enumerate(self.edges):
+            self.out_edges[edge.source].append(index)
+            self.in_edges[edge.target].append(index)
+
+    def successors(self, node_id: str) -> List[str]:
+        return [self.edges[i].target for i in self.out_edges.get(node_id, ())]
+
+    def predecessors(self, node_id: str) -> List[str]:
+        return [self.edges[i].source for i in self.in_edges.get(node_id, ())]
+
+    def to_mermaid(self) -> str:
+        return format_flowchart(self)
+
+
+class _Parser:
+    def __init__(self, text: str):
+        self.text = text.replace('\r\n', '\n').replace('\\n', '\n')
+        self.pos = 0
+        self.chart = Flowchart()
+        self.subgraph_stack: List[Subgraph] = []
+        self._line_starts = [0] + [m.end() for m in re.finditer('\n', self.text)]
+        self._header_seen = False
+
+    def line(self, pos: Optional[int] = None) -> int:
+        return bisect.bisect_right(self._line_starts, self.pos if pos is None else pos)
+
+    def issue(self, code: str, message: str, text: str = "", pos: Optional[int] = None):
+        self.chart.issues.append(Issue(self.line(pos), code, message, text.split('\n', 1)[0].strip()[:80]))
+
+    def _match(self, pattern):
+        match = pattern.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+        return match
+
+    def _skip_inline(self):
+        self.pos = _INLINE_SPACE.match(self.text, self.pos).end()
+
+    def parse(self) -> Flowchart:
+        self._front_matter()
+        text = self.text
+        while True:
+            self.pos = _SPACE.match(text, self.pos).end()
+            if self.pos >= len(text):
+                break
+            if text.startswith('%%{', self.pos):
+                self._directive()
+            elif text.startswith('%%', self.pos):
+                self._comment()
+            else:
+                self._statement()
+        for subgraph in reversed(self.subgraph_stack):
+            self.issue("unclosed-subgraph", "subgraph is never closed with end", subgraph.id, pos=len(text))
+            self.chart.statements.append(("end",))
+        if not self._header_seen and self.chart.source is None and self.chart.statements:
+            self.issue("missing-header", "diagram does not start with graph or flowchart", pos=0)
+        return self.chart
+
+    def _front_matter(self):
+        self.pos = _SPACE.match(self.text, 0).end()
+        if not self.text.startswith('---', self.pos):
+            return
+        end = self.text.find('---', self.pos + 3)
+        if end == -1:
+            self.issue("unclosed-front-matter", "front matter is never closed with ---",
+                       self.text[self.pos:self.pos + 40])
+            # Resume at the graph header if there is one
+            header = _HEADER_LINE.search(self.text, self.pos + 3)
+            end = header.start() if header else len(self.text)
+            self.chart.front_matter = self.text[self.pos + 3:end].strip('\n')
+            self.pos = end
+            return
+        self.chart.front_matter = self.text[self.pos + 3:end].strip('\n')
+        self.pos = end + 3
+
+    def _directive(self):
+        end = self.text.find('}%%', self.pos)
+        end = len(self.text) if end == -1 else end + 3
+        self.chart.directives.append(self.text[self.pos:end])
+        self.pos = end
+
+    def _comment(self):
+        start = self.pos + 2
+        end = self.text.find('\n', start)
+        end = len(self.text) if end == -1 else end
+        brk = _COMMENT_BREAK.search(self.text, start, end)
+        if brk:
+            end = self._statement_start_before(brk.start(), start) if brk.group().startswith(('-', '=', '<')) \
+                else brk.start()
+        self.chart.statements.append(("comment", self.text[start:end].strip()))
+        self.pos = end
+
+    def _statement_start_before(self, arrow: int, floor: int) -> int:
+        # Walk back from an arrow over "Id[Label] " to where that node begins
+        pos = arrow
+        while pos > floor and self.text[pos - 1] in ' \t':
+            pos -= 1
+        if pos > floor and self.text[pos - 1] in ')]}':
+            for opener, closer, _ in _SHAPES:
+                if self.text.endswith(closer, floor, pos):
+                    found = self.text.rfind(opener, floor, pos - len(closer))
+                    if found != -1:
+                        pos = found
+                        break
+        while pos > floor and (self.text[pos - 1].isalnum() or self.text[pos - 1] in '_-'):
+            pos -= 1
+        return pos
+
+    def _statement(self):
+        start = self.pos
+        if not self._header_seen and not self.chart.statements:
+            other = _OTHER_DIAGRAM.match(self.text, self.pos)
+            if other:
+                self.chart.keyword = other.group()
+                self.chart.source = self.text
+                self.pos = len(self.text)
+                return
+        word = _WORD.match(self.text, self.pos)
+        keyword = word.group() if word and (word.end() >= len(self.text) or self.text[word.end()] in ' \t\n;') else None
+
+        if keyword in ("graph", "flowchart"):
+            self.pos = word.end()
+            self._skip_inline()
+            direction = _WORD.match(self.text, self.pos)
+            if direction and direction.group() in DIRECTIONS:
+                self.pos = direction.end()
+            elif direction and _REST_OF_LINE.match(self.text, direction.end()).group().strip() == "":
+                # graph XY on a line of its own: a bad direction, not a node
+                self.issue("bad-direction", f"unknown direction {direction.group()}", direction.group())
+                self.pos = direction.end()
+            if self._header_seen:
+                # The first header wins
+                self.issue("duplicate-header", "duplicate graph header", self.text[start:self.pos], pos=start)
+                return
+            self._header_seen = True
+            self.chart.keyword = keyword
+            if direction and direction.group() in DIRECTIONS:
+                self.chart.direction = direction.group()
+            return
+        if keyword == "classDef":
+            self.pos = word.end()
+            self._skip_inline()
+            name = self._match(_ID)
+            self._skip_inline()
+            css = self._match(_CSS)
+            if name is None:
+                self.issue("bad-statement", "classDef without a class name", self.text[start:self.pos])
+                return
+            self.chart.class_defs[name.group()] = css.group() if css else ""
+            self.chart.statements.append(("classDef", name.group()))
+            return
+        if keyword == "class":
+            self.pos = word.end()
+            self._skip_inline()
+            args = self._match(_CLASS_ARGS)
+            if args is None:
+                self.issue("bad-statement", "class statement needs node ids and a class name", self.text[start:start + 40])
+                return
+            *node_ids, name = _ID_SEPARATOR.split(args.group())
+            for node_id in node_ids:
+                self.chart.add_node(node_id, line=self.line(start)).css_class = name
+            self.chart.statements.append(("class", tuple(node_ids), name))
+            return
+        if keyword == "style":
+            self.pos = word.end()
+            self._skip_inline()
+            node_id = self._match(_ID)
+            self._skip_inline()
+            css = self._match(_CSS)
+            if node_id is None:
+                self.issue("bad-statement", "style without a node id", self.text[start:self.pos])
+                return
+            self.chart.styles[node_id.group()] = css.group() if css else ""
+            self.chart.add_node(node_id.group(), line=self.line(start))
+            self.chart.statements.append(("style", node_id.group()))
+            return
+        if keyword in ("linkStyle", "click"):
+            self.pos = _REST_OF_LINE.match(self.text, self.pos).end()
+            self.chart.statements.append(("raw", self.text[start:self.pos].strip()))
+            return
+        if keyword == "direction" and self.subgraph_stack:
+            self.pos = word.end()
+            self._skip_inline()
+            direction = _WORD.match(self.text, self.pos)
+            if direction and direction.group() in DIRECTIONS:
+                self.subgraph_stack[-1].direction = direction.group()
+                self.pos = direction.end()
+            return
+        if keyword == "subgraph":
+            self._subgraph(word.end())
+            return
+        if keyword == "end" and self.subgraph_stack:
+            self.pos = word.end()
+            self.subgraph_stack.pop()
+            self.chart.statements.append(("end",))
+            return
+        self._chain(start)
+
+    def _subgraph(self, pos: int):
+        line = self.line(pos)
+        self.pos = pos
+        self._skip_inline()
+        title = None
+        if self.text.startswith('"', self.pos):
+            end = self.text.find('"', self.pos + 1)
+            end = len(self.text) if end == -1 else end
+            title = self.text[self.pos + 1:end]
+            self.pos = end + 1
+            subgraph_id = re.sub(r'\W+', '_', title).strip('_') or f"subgraph{len(self.chart.subgraphs)}"
+        else:
+            match = self._match(_ID)
+            subgraph_id = match.group() if match else f"subgraph{len(self.chart.subgraphs)}"
+            self._skip_inline()
+            if self.text.startswith('[', self.pos):
+                end = self.text.find(']', self.pos)
+                end = len(self.text) if end == -1 else end
+                title = self.text[self.pos + 1:end].strip().strip('"')
+                self.pos = end + 1
+            else:
+                rest = _REST_OF_LINE.match(self.text, self.pos)
+                if rest.group().strip():
+                    # subgraph Data Layer: the whole line is the title
+                    title = (subgraph_id + rest.group()).strip()
+                    self.pos = rest.end()
+        subgraph = Subgraph(subgraph_id, title if title is not None else subgraph_id, line=line)
+        self.chart.subgraphs.append(subgraph)
+        self.subgraph_stack.append(subgraph)
+        self.chart.statements.append(("subgraph", subgraph))
+
+    def _chain(self, start: int):
+        line = self.line(start)
+        sources = self._simple_edge(line)
+        linked = sources is not None
+        if not linked:
+            sources = self._node_group(line)
+        if not sources:
+            # Skip one unrecognised token so the scan always moves forward
+            match = re.compile(r'[^\s;]+').match(self.text, self.pos)
+            self.pos = match.end() if match else self.pos + 1
+            fragment = self.text[start:self.pos]
+            self.issue("invalid", "unrecognised text", fragment, pos=start)
+            self.chart.statements.append(("invalid", fragment))
+            return
+
+        while True:
+            arrow_start = self.pos
+            link = self._match(_LINK)
+            if link is None:
+                break
+            if link.group(1):
+                arrow = link.group(1)
+                label = (link.group(2) or "").strip().strip('"')
+            else:
+                label, arrow = link.group(3), link.group(4)
+                if arrow.startswith('.'):
+                    arrow = '-' + arrow
+            targets = self._node_group(line)
+            if not targets:
+                self.issue("dangling-arrow", "arrow has no target node", self.text[arrow_start:self.pos + 20], pos=arrow_start)
+                break
+            for source in sources:
+                for target in targets:
+                    self.chart.add_edge(source, target, label, arrow, line)
+            linked = True
+            sources = targets
+
+        if not linked:
+            for node_id in sources:
+                self.chart.statements.append(("node", node_id, line))
+
+    def _simple_edge(self, line: int) -> Optional[List[str]]:
+        text = self.text
+        match = _SIMPLE_EDGE.match(text, self.pos)
+        if match is None or self.subgraph_stack:
+            return None
+        # Leave anything the fast path would cut short (a longer id, a spaced
+        # or unusual label, & groups, ::: classes) to the general scan
+        end = match.end()
+        if end < len(text) and (text[end].isalnum() or text[end] in '_-[({>"'):
+            return None
+        after = _INLINE_SPACE.match(text, end).end()
+        if after < len(text) and text[after] in '&:[({':
+            return None
+        source, opener, label, closer, arrow, edge_label, target, t_opener, t_label, t_closer = match.groups()
+        if opener and _SHAPE_BY_OPENER[opener][0] != closer:
+            return None
+        if t_opener and _SHAPE_BY_OPENER[t_opener][0] != t_closer:
+            return None
+        chart = self.chart
+        chart.add_node(source, label.strip() if opener else None,
+                       _SHAPE_BY_OPENER[opener][1] if opener else None, line)
+        chart.add_node(target, t_label.strip() if t_opener else None,
+                       _SHAPE_BY_OPENER[t_opener][1] if t_opener else None, line)
+        chart.add_edge(source, target, (edge_label or "").strip(), arrow, line)
+        self.pos = match.end()
+        # The chain may continue with more arrows from the target
+        return [target]
+
+    def _node_group(self, line: int) -> List[str]:
+        node_ids = []
+        while True:
+            node_id = self._node(line)
+            if node_id is None:
+                break
+            node_ids.append(node_id)
+            if self._match(_GROUP_JOIN) is None:
+                break
+        return node_ids
+
+    def _node(self, line: int) -> Optional[str]:
+        text = self.text
+        match = _SIMPLE_NODE.match(text, self.pos)
+        if match is None:
+            return None
+        node_id = match.group(1)
+        label = shape = None
+        opener = match.group(2)
+        if opener and _SHAPE_BY_OPENER[opener][0] == match.group(4):
+            self.pos = match.end()
+            label = match.group(3).strip()
+            shape = _SHAPE_BY_OPENER[opener][1]
+        else:
+            self.pos = match.end(1)
+            # Tolerate "A [Label]"; Mermaid itself is picky about it
+            probe = _INLINE_SPACE.match(text, self.pos).end()
+            if probe < len(text) and text[probe] in '[({>':
+                for opener, closer, shape_name in _SHAPES:
+                    at = self.pos if opener == '>' else probe
+                    if text.startswith(opener, at):
+                        label = self._label(at + len(opener), closer)
+                        shape = shape_name
+                        break
+
+        node = self.chart.add_node(node_id, label, shape, line)
+        if self.subgraph_stack and node_id not in self.subgraph_stack[-1].nodes:
+            self.subgraph_stack[-1].nodes.append(node_id)
+        if text.startswith(':::', self.pos):
+            css = self._match(_CLASS_SUFFIX)
+            if css:
+                node.css_class = css.group(1)
+        return node_id
+
+    def _label(self, start: int, closer: str) -> str:
+        text = self.text
+        if text.startswith('"', start):
+            end_quote = text.find('"', start + 1)
+            if end_quote != -1 and text.startswith(closer, end_quote + 1):
+                self.pos = end_quote + 1 + len(closer)
+                return text[start + 1:end_quote]
+        end = text.find(closer, start)
+        # Only look for a newline up to the closer, so a one-line diagram stays linear
+        newline = text.find('\n', start, end if end != -1 else len(text))
+        if end == -1 or newline != -1:
+            # Close it at the end of the line rather than lose the rest of the diagram
+            self.issue("unclosed-label", "node label is never closed", text[start - 1:start + 40], pos=start)
+            end = newline if newline != -1 else len(text)
+            self.pos = end
+            return text[start:end].strip()
+        self.pos = end + len(closer)
+        return text[start:end].strip()
+
+
+def parse_flowchart(text: str) -> Flowchart:
+    return _Parser(text or "").parse()
+
+
+def label_needs_quotes(label: str) -> bool:
+    """Whether a label has characters Mermaid would read as syntax unless quoted"""
+    return _LABEL_NEEDS_QUOTES.search(label) is not None
+
+
+def is_link(text: str) -> bool:
+    """Whether text is nothing but an arrow, with or without a label"""
+    return _LINK.fullmatch(text) is not None
+
+
+def _format_label(label: str) -> str:
+    if label_needs_quotes(label):
+        return '"' + label.replace('"', '#quot;') + '"'
+    return label
+
+
+def format_node(node: Node) -> str:
+    if node.shape == "rect" and node.label == node.id:
+        text = node.id
+    else:
+        opener, closer = SHAPE_DELIMITERS[node.shape]
+        text = f"{node.id}{opener}{_format_label(node.label)}{closer}"
+    return text
+
+
+def format_flowchart(chart: Flowchart, indent: str = "    ") -> str:
+    """
+    Deterministic text for a chart: front matter, directives, header, then
+    one statement per line in source order. A node's label and shape are
+    written where it first appears. Other diagram types come back unchanged.
+    """
+    if chart.source is not None:
+        return chart.source.strip()
+    lines = []
+    if chart.front_matter is not None:
+        lines += ["---", chart.front_matter, "---"]
+    lines += chart.directives
+    lines.append(f"{chart.keyword} {chart.direction}")
+
+    written = set()
+    class_defs_written = set()
+    classed = set()
+    styled = set()
+
+    def ref(node_id: str) -> str:
+        if node_id in written:
+            return node_id
+        written.add(node_id)
+        return format_node(chart.nodes[node_id]) if node_id in chart.nodes else node_id
+
+    depth = 1
+    for statement in chart.statements:
+        kind = statement[0]
+        prefix = indent * depth
+        if kind == "comment":
+            lines.append(f"{prefix}%% {statement[1]}".rstrip())
+        elif kind == "edge":
+            edge = statement[1]
+            label = f"|{_format_label(edge.label)}|" if edge.label else ""
+            lines.append(f"{prefix}{ref(edge.source)} {edge.arrow}{label} {ref(edge.target)}")
+        elif kind == "node":
+            # Inside a subgraph even a known node is listed, since that is what makes it a member
+            if statement[1] not in written or depth > 1:
+                lines.append(f"{prefix}{ref(statement[1])}")
+        elif kind == "subgraph":
+            subgraph = statement[1]
+            title = f"[{_format_label(subgraph.title)}]" if subgraph.title != subgraph.id else ""
+            lines.append(f"{prefix}subgraph {subgraph.id}{title}")
+            depth += 1
+            if subgraph.direction:
+                lines.append(f"{indent * depth}direction {subgraph.direction}")
+        elif kind == "end":
+            depth = max(1, depth - 1)
+            lines.append(f"{indent * depth}end")
+        elif kind in ("raw", "invalid"):
+            lines.append(f"{prefix}{statement[1]}")
+        elif kind == "classDef":
+            name = statement[1]
+            if name in chart.class_defs and name not in class_defs_written:
+                class_defs_written.add(name)
+                lines.append(f"{prefix}classDef {name} {chart.class_defs[name]};")
+        elif kind == "class":
+            node_ids = [node_id for node_id in statement[1]
+                        if node_id in chart.nodes and chart.nodes[node_id].css_class == statement[2]]
+            if node_ids:
+                classed.update(node_ids)
+                lines.append(f"{prefix}class {','.join(node_ids)} {statement[2]};")
+        elif kind == "style":
+            if statement[1] in chart.styles and statement[1] not in styled:
+                styled.add(statement[1])
+                lines.append(f"{prefix}style {statement[1]} {chart.styles[statement[1]]}")
+
+    # Whatever was never placed by a statement (nodes only named in class or
+    # style lines, ::: classes, definitions added after parsing) goes last
+    for node_id in chart.nodes:
+        if node_id not in written:
+            lines.append(f"{indent}{ref(node_id)}")
+    for name, css in chart.class_defs.items():
+        if name not in class_defs_written:
+            lines.append(f"{indent}classDef {name} {css};")
+    by_class: Dict[str, List[str]] = {}
+    for node in chart.nodes.values():
+        if node.css_class and node.id not in classed:
+            by_class.setdefault(node.css_class, []).append(node.id)
+    for name, node_ids in by_class.items():
+        lines.append(f"{indent}class {','.join(node_ids)} {name};")
+    for node_id, css in chart.styles.items():
+        if node_id not in styled:
+            lines.append(f"{indent}style {node_id} {css}")
+    return '\n'.join(lines)
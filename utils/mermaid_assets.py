@@ -0,0 +1,174 @@
+# utils/mermaid_assets.py
+"""
+Vendored mermaid.js for the in-browser renderer.
+
+The bundle lives under static/vendor/mermaid/<version>/ next to a
+manifest.json that records its SRI hash. Streamlit serves that directory
+as app/static/... (server.enableStaticServing in .streamlit/config.toml),
+so the iframe only carries a <script src> with the hash and the browser
+fetches and caches the ~1 MB bundle once instead of receiving it again on
+every rerun. load_mermaid_bundle() checks the bytes against the manifest
+before the app points the browser at them. Use scripts/vendor_mermaid.py
+to fetch or update the bundle.
+
+Until a bundle is vendored (or with static serving off) the script comes
+from jsDelivr instead, pinned to MERMAID_VERSION. jsDelivr serves the npm
+file unchanged, so a committed manifest.json pins that copy by hash too. A
+vendored bundle that fails its hash check is refused, never swapped for
+the CDN.
+"""
+import base64
+import hashlib
+import json
+import os
+from typing import Optional, Tuple
+
+MERMAID_VERSION = "9.3.0"
+BUNDLE_NAME = "mermaid.min.js"
+MANIFEST_NAME = "manifest.json"
+
+# Streamlit serves <app dir>/static/ at app/static/ when static serving is on
+STATIC_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+VENDOR_ROOT = os.path.join(STATIC_ROOT, "vendor", "mermaid")
+VENDOR_DIR = os.path.join(VENDOR_ROOT, MERMAID_VERSION)
+
+CDN_URL = f"https://cdn.jsdelivr.net/npm/mermaid@{MERMAID_VERSION}/dist/{BUNDLE_NAME}"
+
+
+class MermaidAssetError(Exception):
+    """The browser renderer cannot be used"""
+
+
+class BundleNotFoundError(MermaidAssetError):
+    """Nothing has been vendored yet"""
+
+
+class AssetIntegrityError(MermaidAssetError):
+    """The vendored bundle does not match the hash in its manifest"""
+
+
+def sri_hash(data: bytes, algorithm: str = "sha384") -> str:
+    """Subresource Integrity string, e.g. sha384-<base64 digest>"""
+    digest = hashlib.new(algorithm, data).digest()
+    return f"{algorithm}-{base64.b64encode(digest).decode('ascii')}"
+
+
+def verify_integrity(data: bytes, integrity: str) -> bool:
+    algorithm, _, expected = integrity.partition('-')
+    if algorithm not in ("sha256", "sha384", "sha512") or not expected:
+        raise AssetIntegrityError(f"unsupported integrity value: {integrity!r}")
+    return sri_hash(data, algorithm) == integrity
+
+
+def manifest_integrity(directory: str = VENDOR_DIR) -> Optional[str]:
+    """SRI hash recorded in the manifest, or None without a readable one"""
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), encoding="utf-8") as handle:
+            return json.load(handle)["integrity"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def load_mermaid_bundle(directory: str = VENDOR_DIR) -> Tuple[bytes, str]:
+    """
+    The verified bundle and its SRI hash. A missing bundle raises
+    BundleNotFoundError; one without a manifest, or whose hash does not
+    match, raises AssetIntegrityError rather than being served.
+    """
+    bundle_path = os.path.join(directory, BUNDLE_NAME)
+    if not os.path.exists(bundle_path):
+        raise BundleNotFoundError(
+            f"mermaid.js {MERMAID_VERSION} is not vendored in {directory}; "
+            "run python -m scripts.vendor_mermaid and commit the result"
+        )
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), encoding="utf-8") as handle:
+            manifest = json.load(handle)
+        integrity = manifest["integrity"]
+    except (OSError, ValueError, KeyError) as e:
+        raise AssetIntegrityError(f"unreadable manifest for {bundle_path}: {e}") from e
+
+    with open(bundle_path, "rb") as handle:
+        data = handle.read()
+    if not verify_integrity(data, integrity):
+        raise AssetIntegrityError(f"{bundle_path} does not match {integrity}; re-run scripts/vendor_mermaid.py")
+    return data, integrity
+
+
+def static_url(path: str) -> str:
+    """
+    Relative URL Streamlit serves a file under STATIC_ROOT at. The iframe is
+    a same-origin srcdoc page, so it resolves against the app's own URL.
+    """
+    relative = os.path.relpath(path, STATIC_ROOT).replace(os.sep, "/")
+    return f"app/static/{relative}"
+
+
+def cdn_script_tag(directory: str = VENDOR_DIR) -> str:
+    """<script> for the pinned CDN copy, with the manifest's hash when there is one"""
+    integrity = manifest_integrity(directory)
+    attributes = f' integrity="{integrity}"' if integrity else ''
+    return f'<script src="{CDN_URL}"{attributes} crossorigin="anonymous"></script>'
+
+
+def mermaid_script_tag(directory: str = VENDOR_DIR, static_serving: bool = True) -> str:
+    """
+    <script> element for the iframe: the verified bundle by URL, with its
+    hash, so the browser caches it and refuses a copy that was changed.
+    Falls back to the CDN when nothing is vendored or static serving is off.
+    """
+    try:
+        _, integrity = load_mermaid_bundle(directory)
+    except BundleNotFoundError:
+        return cdn_script_tag(directory)
+    if not static_serving:
+        return cdn_script_tag(directory)
+    src = static_url(os.path.join(directory, BUNDLE_NAME))
+    return f'<script src="{src}" integrity="{integrity}" crossorigin="anonymous"></script>'
+
+
+def mermaid_iframe_html(diagram: str, script_tag: str) -> str:
+    """Standalone page that renders one diagram with mermaid.js"""
+    return f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            {script_tag}
+            <style>
+                .mermaid {{
+                    background: white;
+                    padding: 20px;
+                    border-radius: 10px;
+                    box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+                    margin: 10px 0;
+                    overflow: auto;
+                }}
+                .mermaid svg {{
+                    max-width: 100%;
+                    height: auto;
+                }}
+            </style>
+        </head>
+        <body>
+            <div class="mermaid">
+                {diagram}
+            </div>
+            <script>
+                mermaid.initialize({{
+                    startOnLoad: true,
+                    securityLevel: 'loose',
+                    theme: 'neutral',
+                    flowchart: {{
+                        htmlLabels: true,
+                        curve: 'basis',
+                        useMaxWidth: true,
+                        padding: 20,
+                        rankSpacing: 50,
+                        nodeSpacing: 50,
+                        diagramPadding: 20
+                    }}
+                }});
+            </script>
+        </body>
+        </html>
+        """
@@ -0,0 +1,276 @@
+# utils/mermaid_lint.py
+"""
+Server-side checks for model-generated Mermaid flowcharts, run before a
+diagram reaches the browser so a bad diagram is caught here instead of as a
+failed render inside the mermaid@9.3.0 iframe.
+
+lint_diagram() parses the diagram, applies every fix it can (dropping front
+matter, closing labels and subgraphs, quoting labels, renaming reserved or
+clashing ids, removing dangling arrows) and returns the fixed text with
+line-level diagnostics. Diagnostics that are errors and could not be fixed
+set needs_repair; the caller can then ask the model for the diagram alone.
+"""
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Tuple
+
+from utils.mermaid import Flowchart, is_link, label_needs_quotes, parse_flowchart
+
+# Words Mermaid reads as keywords, so they cannot be node ids
+RESERVED_IDS = ("end", "graph", "flowchart", "subgraph", "class", "classDef", "style", "linkStyle", "click",
+                "direction", "default")
+
+_FRONT_MATTER_FENCE = re.compile(r'^[ \t]*---[ \t]*$', re.MULTILINE)
+
+# Parser issue code -> (severity, fixed, what the fix was)
+_ISSUE_FIXES = {
+    "unclosed-front-matter": ("warning", True, "front matter removed"),
+    "unclosed-subgraph": ("error", True, "closed with end"),
+    "missing-header": ("error", True, "added graph TD"),
+    "bad-direction": ("error", True, "using TD"),
+    "duplicate-header": ("warning", True, "removed"),
+    "bad-statement": ("warning", True, "removed"),
+    "dangling-arrow": ("error", True, "arrow removed"),
+    "unclosed-label": ("error", True, "closed at the end of the line"),
+    "redefined-node": ("warning", False, "Mermaid shows the last definition"),
+    "invalid": ("error", False, "removed"),
+}
+
+
+@dataclass(slots=True)
+class Diagnostic:
+    line: int
+    severity: str
+    code: str
+    message: str
+    fixed: bool = False
+
+    def __str__(self):
+        status = " (fixed)" if self.fixed else ""
+        return f"line {self.line}: {self.severity}: {self.message}{status}"
+
+
+@dataclass(slots=True)
+class LintResult:
+    diagram: str
+    diagnostics: List[Diagnostic] = field(default_factory=list)
+
+    @property
+    def needs_repair(self) -> bool:
+        """Errors remain that only regenerating the diagram can fix"""
+        return any(d.severity == "error" and not d.fixed for d in self.diagnostics)
+
+    @property
+    def problems(self) -> List[Diagnostic]:
+        return [d for d in self.diagnostics if not d.fixed]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"diagram": self.diagram, "diagnostics": [asdict(d) for d in self.diagnostics]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LintResult':
+        return cls(data["diagram"], [Diagnostic(**d) for d in data["diagnostics"]])
+
+
+def _strip_front_matter(text: str) -> Tuple[str, List[int]]:
+    """
+    Blanks out closed --- blocks wherever they are (cleaning may have put a
+    graph TD line above one). The bundled Mermaid 9.3 predates front matter
+    config, and the app's mermaid.initialize already sets theme and curve.
+    """
+    removed = []
+    fences = list(_FRONT_MATTER_FENCE.finditer(text))
+    pieces = []
+    last = 0
+    for opening, closing in zip(fences[0::2], fences[1::2]):
+        removed.append(text.count('\n', 0, opening.start()) + 1)
+        # Blank lines in its place keep later line numbers true to the source
+        pieces.append(text[last:opening.start()])
+        pieces.append('\n' * text.count('\n', opening.start(), closing.end()))
+        last = closing.end()
+    pieces.append(text[last:])
+    return ''.join(pieces), removed
+
+
+def _unique_id(chart: Flowchart, base: str, taken=()) -> str:
+    candidate, n = base, 2
+    while candidate in chart.nodes or candidate in taken:
+        candidate, n = f"{base}_{n}", n + 1
+    return candidate
+
+
+def _check_ids(chart: Flowchart, diagnostics: List[Diagnostic]):
+    reserved = {word.lower() for word in RESERVED_IDS}
+    for node_id in list(chart.nodes):
+        if node_id.lower() in reserved:
+            new = _unique_id(chart, node_id[0].upper() + node_id[1:] + "Node")
+            line = chart.nodes[node_id].line
+            chart.rename_node(node_id, new)
+            diagnostics.append(Diagnostic(line, "error", "reserved-id",
+                                          f"{node_id} is a Mermaid keyword and cannot be a node id; renamed to {new}",
+                                          True))
+
+    # Mermaid fails when a subgraph id is also a node id or another subgraph's id
+    seen = set()
+    for subgraph in chart.subgraphs:
+        if subgraph.id in chart.nodes or subgraph.id in seen:
+            new = _unique_id(chart, subgraph.id + "_group", seen)
+            diagnostics.append(Diagnostic(subgraph.line, "error", "duplicate-id",
+                                          f"subgraph id {subgraph.id} is already used; renamed to {new}", True))
+            subgraph.id = new
+        seen.add(subgraph.id)
+
+
+def _is_defined(chart: Flowchart, node_id: str) -> bool:
+    node = chart.nodes[node_id]
+    return node.label != node.id or node.shape != "rect"
+
+
+def _check_references(chart: Flowchart, diagnostics: List[Diagnostic]):
+    placed = {statement[1] for statement in chart.statements if statement[0] == "node"}
+    placed.update(node_id for subgraph in chart.subgraphs for node_id in subgraph.nodes)
+    # Ids that differ only by case or - / _ are almost always one component
+    # spelled two ways; the first spelling (a labelled one if any) wins
+    canonical: Dict[str, str] = {}
+    for node_id in chart.nodes:
+        folded = node_id.lower().replace('-', '_')
+        current = canonical.get(folded)
+        if current is None or (_is_defined(chart, node_id) and not _is_defined(chart, current)):
+            canonical[folded] = node_id
+
+    for node_id in list(chart.nodes):
+        node = chart.nodes[node_id]
+        connected = chart.out_edges[node_id] or chart.in_edges[node_id]
+        if not connected and node_id not in placed:
+            # Only named by class or style lines
+            del chart.nodes[node_id]
+            chart.out_edges.pop(node_id)
+            chart.in_edges.pop(node_id)
+            chart.styles.pop(node_id, None)
+            diagnostics.append(Diagnostic(node.line, "warning", "undefined-id",
+                                          f"class or style refers to undefined node {node_id}; removed", True))
+            continue
+        target = canonical[node_id.lower().replace('-', '_')]
+        if target != node_id and not _is_defined(chart, node_id):
+            chart.rename_node(node_id, target)
+            diagnostics.append(Diagnostic(node.line, "warning", "undefined-id",
+                                          f"{node_id} is not defined; using {target}", True))
+
+
+def _check_stray_words(chart: Flowchart, diagnostics: List[Diagnostic]):
+    """
+    "Client --> API Gateway" parses as an edge to API plus a lone node
+    Gateway, which Mermaid rejects since ids cannot contain spaces. A run of
+    bare words on the line of the edge next to it is joined with that edge's
+    end into one node: API_Gateway["API Gateway"].
+    """
+    statements = chart.statements
+    keep = []
+    touched = set()
+    index = 0
+    while index < len(statements):
+        statement = statements[index]
+        if statement[0] != "node" or _is_defined(chart, statement[1]):
+            keep.append(statement)
+            index += 1
+            continue
+        line = statement[2]
+        run_end = index
+        while (run_end < len(statements) and statements[run_end][0] == "node"
+               and statements[run_end][2] == line and not _is_defined(chart, statements[run_end][1])):
+            run_end += 1
+        before = statements[index - 1][1] if index > 0 and statements[index - 1][0] == "edge" else None
+        after = statements[run_end][1] if run_end < len(statements) and statements[run_end][0] == "edge" else None
+        before = before if before is not None and before.line == line and not _is_defined(chart, before.target) else None
+        after = after if after is not None and after.line == line and not _is_defined(chart, after.source) else None
+        if before is None and after is None:
+            keep.extend(statements[index:run_end])
+            index = run_end
+            continue
+
+        words = ([before.target] if before else []) + [s[1] for s in statements[index:run_end]] + \
+            ([after.source] if after else [])
+        label = ' '.join(words)
+        new = '_'.join(words)
+        node = chart.add_node(new, label, line=line)
+        touched.update(words)
+        if before:
+            before.target = node.id
+        if after:
+            after.source = node.id
+        diagnostics.append(Diagnostic(line, "error", "id-with-spaces",
+                                      f"node ids cannot contain spaces ({label}); joined as {new}", True))
+        index = run_end
+    chart.statements = keep
+    chart.reindex()
+
+    # Drop the split-off words that are no longer used anywhere
+    placed = {statement[1] for statement in keep if statement[0] == "node"}
+    placed.update(node_id for subgraph in chart.subgraphs for node_id in subgraph.nodes)
+    for node_id in touched:
+        if node_id in chart.nodes and node_id not in placed and not (chart.out_edges[node_id] or chart.in_edges[node_id]):
+            del chart.nodes[node_id]
+            del chart.out_edges[node_id]
+            del chart.in_edges[node_id]
+
+
+def _check_labels(chart: Flowchart, source_lines: List[str], diagnostics: List[Diagnostic]):
+    def check(label: str, line: int, what: str):
+        if not label_needs_quotes(label):
+            return
+        source = source_lines[line - 1] if 0 < line <= len(source_lines) else ""
+        if '"' in label:
+            diagnostics.append(Diagnostic(line, "error", "label-chars",
+                                          f"{what} contains double quotes; escaped as #quot;", True))
+        elif f'"{label}"' not in source:
+            diagnostics.append(Diagnostic(line, "error", "label-chars",
+                                          f"{what} contains characters Mermaid reads as syntax; quoted", True))
+
+    for node in chart.nodes.values():
+        if node.label != node.id:
+            check(node.label, node.line, f"label of {node.id}")
+    for edge in chart.edges:
+        if edge.label:
+            check(edge.label, edge.line, f"label of {edge.source} -> {edge.target}")
+
+
+def lint_diagram(diagram: str) -> LintResult:
+    """Fixed diagram text plus diagnostics, ordered by line"""
+    text = (diagram or "").replace('\r\n', '\n').replace('\\n', '\n')
+    text, front_matter_lines = _strip_front_matter(text)
+    chart = parse_flowchart(text)
+    if chart.source is not None:
+        # Not a flowchart; nothing to check
+        return LintResult(chart.to_mermaid())
+
+    diagnostics = [
+        Diagnostic(line, "error", "front-matter",
+                   "--- config --- front matter is not supported by the bundled Mermaid 9.3; removed", True)
+        for line in front_matter_lines
+    ]
+    for issue in chart.issues:
+        severity, fixed, fix = _ISSUE_FIXES.get(issue.code, ("error", False, ""))
+        code = issue.code
+        if code == "invalid" and is_link(issue.text):
+            # "--> B" with nothing before it
+            code, fixed, fix = "dangling-arrow", True, "arrow removed"
+        detail = f" ({issue.text})" if issue.text else ""
+        message = f"{issue.message}{detail}; {fix}" if fix else f"{issue.message}{detail}"
+        diagnostics.append(Diagnostic(issue.line, severity, code, message, fixed))
+    chart.front_matter = None
+
+    _check_stray_words(chart, diagnostics)
+    chart.statements = [statement for statement in chart.statements if statement[0] != "invalid"]
+    _check_ids(chart, diagnostics)
+    _check_references(chart, diagnostics)
+    _check_labels(chart, text.split('\n'), diagnostics)
+    if not chart.edges and not chart.nodes:
+        diagnostics.append(Diagnostic(1, "error", "empty", "diagram has no nodes"))
+
+    fixed = chart.to_mermaid()
+    leftover = parse_flowchart(fixed).issues
+    if leftover:
+        diagnostics.append(Diagnostic(leftover[0].line, "error", leftover[0].code,
+                                      f"still invalid after fixes: {leftover[0].message}"))
+    diagnostics.sort(key=lambda d: d.line)
+    return LintResult(fixed, diagnostics)
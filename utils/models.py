@@ -0,0 +1,198 @@
+# utils/models.py
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+
+
+def _text(value: Any) -> str:
+    if value is None:
+        return ''
+    return value if isinstance(value, str) else str(value)
+
+
+def _items(value: Any) -> list:
+    return value if isinstance(value, list) else []
+
+
+def _texts(value: Any) -> Tuple[str, ...]:
+    return tuple(_text(item) for item in _items(value))
+
+
+def _mapping(value: Any) -> Dict[str, Any]:
+    return value if isinstance(value, dict) else {}
+
+
+@dataclass(slots=True)
+class Step:
+    step: str
+    action: str
+    details: Tuple[str, ...]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Step':
+        data = _mapping(data)
+        return cls(_text(data.get('step')), _text(data.get('action')), _texts(data.get('details')))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"step": self.step, "action": self.action, "details": list(self.details)}
+
+
+@dataclass(slots=True)
+class Technology:
+    name: str
+    purpose: str
+    configuration: str
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Technology':
+        data = _mapping(data)
+        return cls(_text(data.get('name')), _text(data.get('purpose')), _text(data.get('configuration')))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "purpose": self.purpose, "configuration": self.configuration}
+
+
+@dataclass(slots=True)
+class DataFlow:
+    input: str
+    process: str
+    output: str
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DataFlow':
+        data = _mapping(data)
+        return cls(_text(data.get('input')), _text(data.get('process')), _text(data.get('output')))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"input": self.input, "process": self.process, "output": self.output}
+
+
+@dataclass(slots=True)
+class Component:
+    name: str
+    purpose: str
+    steps: Tuple[Step, ...]
+    technologies: Tuple[Technology, ...]
+    data_flow: DataFlow
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Component':
+        data = _mapping(data)
+        return cls(
+            _text(data.get('name')),
+            _text(data.get('purpose')),
+            tuple(Step.from_dict(step) for step in _items(data.get('steps'))),
+            tuple(Technology.from_dict(tech) for tech in _items(data.get('technologies'))),
+            DataFlow.from_dict(data.get('data_flow')),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "purpose": self.purpose,
+            "steps": [step.to_dict() for step in self.steps],
+            "technologies": [tech.to_dict() for tech in self.technologies],
+            "data_flow": self.data_flow.to_dict(),
+        }
+
+
+@dataclass(slots=True)
+class FlowStep:
+    step: str
+    title: str
+    description: str
+    technical_details: Tuple[str, ...]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'FlowStep':
+        data = _mapping(data)
+        return cls(
+            _text(data.get('step')),
+            _text(data.get('title')),
+            _text(data.get('description')),
+            _texts(data.get('technical_details')),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "step": self.step,
+            "title": self.title,
+            "description": self.description,
+            "technical_details": list(self.technical_details),
+        }
+
+
+@dataclass(slots=True)
+class Analysis:
+    """
+    Typed, immutable-by-convention view of a parsed analysis.
+
+    from_dict checks and normalizes the whole tree once, so renderers can use
+    plain attribute access: missing keys become empty strings or tuples and
+    scalar values are coerced to text.
+    """
+    overview: str
+    components: Tuple[Component, ...]
+    flow_steps: Tuple[FlowStep, ...]
+    diagram: str
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Analysis':
+        if not isinstance(data, dict):
+            raise ValueError(f"Analysis must be a JSON object, got {type(data).__name__}")
+        return cls(
+            _text(data.get('overview')),
+            tuple(Component.from_dict(component) for component in _items(data.get('components'))),
+            tuple(FlowStep.from_dict(step) for step in _items(data.get('flow_steps'))),
+            _text(data.get('diagram')),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "overview": self.overview,
+            "components": [component.to_dict() for component in self.components],
+            "flow_steps": [step.to_dict() for step in self.flow_steps],
+            "diagram": self.diagram,
+        }
+
+    def to_compact(self) -> str:
+        """Positional JSON without keys or whitespace; roughly half the size of to_dict JSON"""
+        return json.dumps(
+            [
+                self.overview,
+                [
+                    [
+                        c.name,
+                        c.purpose,
+                        [[s.step, s.action, s.details] for s in c.steps],
+                        [[t.name, t.purpose, t.configuration] for t in c.technologies],
+                        [c.data_flow.input, c.data_flow.process, c.data_flow.output],
+                    ]
+                    for c in self.components
+                ],
+                [[f.step, f.title, f.description, f.technical_details] for f in self.flow_steps],
+                self.diagram,
+            ],
+            separators=(',', ':'),
+            ensure_ascii=False,
+        )
+
+    @classmethod
+    def from_compact(cls, text: str) -> 'Analysis':
+        overview, components, flow_steps, diagram = json.loads(text)
+        return cls(
+            overview,
+            tuple(
+                Component(
+                    name,
+                    purpose,
+                    tuple(Step(step, action, tuple(details)) for step, action, details in steps),
+                    tuple(Technology(*tech) for tech in technologies),
+                    DataFlow(*data_flow),
+                )
+                for name, purpose, steps, technologies, data_flow in components
+            ),
+            tuple(FlowStep(step, title, description, tuple(details))
+                  for step, title, description, details in flow_steps),
+            diagram,
+        )
@@ -0,0 +1,265 @@
+# utils/pipeline.py
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from utils.ai_processor import AIProcessor, ResponseCache, prompt_template_id
+from utils.schema import COMPONENT_SCHEMA, FLOW_STEP_SCHEMA, Validator
+
+SKELETON_MAX_TOKENS = 1500
+COMPONENT_MAX_TOKENS = 1200
+DIAGRAM_MAX_TOKENS = 3000
+# Extra attempts for a component whose details failed, before it falls back
+DETAIL_RETRIES = 1
+
+# What each sub-request must return, in the schema language of utils/schema.py
+SKELETON_SCHEMA = {
+    "type": "object",
+    "required": ["overview", "components"],
+    "properties": {
+        "overview": {"type": "string"},
+        "components": {
+            "type": "array",
+            "min_items": 1,
+            "items": {
+                "type": "object",
+                "required": ["name"],
+                "properties": {"name": {"type": "string"}, "purpose": {"type": "string"}},
+            },
+        },
+        "flow_steps": {"type": "array", "items": FLOW_STEP_SCHEMA},
+    },
+}
+
+DETAILS_SCHEMA = {
+    "type": "object",
+    "required": ["steps", "technologies", "data_flow"],
+    "properties": {key: COMPONENT_SCHEMA["properties"][key] for key in ("steps", "technologies", "data_flow")},
+}
+
+DIAGRAM_SCHEMA = {"type": "object", "required": ["diagram"], "properties": {"diagram": {"type": "string"}}}
+
+SKELETON_VALIDATOR = Validator(SKELETON_SCHEMA)
+DETAILS_VALIDATOR = Validator(DETAILS_SCHEMA)
+DIAGRAM_VALIDATOR = Validator(DIAGRAM_SCHEMA)
+
+
+def _preferences_block(requirements: Dict[str, Any]) -> str:
+    preferences = requirements.get('preferences', {})
+    return '\n'.join(f"- {key.replace('_', ' ').title()}: {value}" for key, value in preferences.items())
+
+
+def skeleton_prompt(requirements: Dict[str, Any]) -> str:
+    return f"""Analyze this system design requirement and return a compact architecture skeleton as JSON.
+
+System Requirements:
+{requirements['description']}
+
+Technical Preferences:
+{_preferences_block(requirements)}
+
+List every component in data-flow order, starting with user interaction and covering
+networking, authentication, application services, data, messaging, monitoring and security.
+
+Return only this JSON structure:
+{{
+    "overview": "Comprehensive overview of the system architecture and design principles",
+    "components": [
+        {{"name": "Component name", "purpose": "Detailed purpose and responsibility"}}
+    ],
+    "flow_steps": [
+        {{
+            "step": "1",
+            "title": "Clear step title",
+            "description": "Detailed process description",
+            "technical_details": ["Specific implementation detail"]
+        }}
+    ]
+}}"""
+
+
+def component_prompt(requirements: Dict[str, Any], overview: str, component: Dict[str, str],
+                     component_names: List[str]) -> str:
+    return f"""You are detailing one component of a system design.
+
+System Requirements:
+{requirements['description']}
+
+Technical Preferences:
+{_preferences_block(requirements)}
+
+Architecture overview:
+{overview}
+
+All components: {', '.join(component_names)}
+
+Component: {component['name']}
+Purpose: {component.get('purpose', '')}
+
+Return only this JSON structure for this component:
+{{
+    "steps": [
+        {{
+            "step": "1",
+            "action": "Specific action or operation",
+            "details": ["Implementation detail with specific technology/algorithm", "Configuration detail with example"]
+        }}
+    ],
+    "technologies": [
+        {{
+            "name": "Technology name (specific version if relevant)",
+            "purpose": "Specific use case and benefits",
+            "configuration": "Detailed configuration with examples"
+        }}
+    ],
+    "data_flow": {{
+        "input": "Incoming data format and validation requirements",
+        "process": "Data transformation and business logic",
+        "output": "Response format and error handling"
+    }}
+}}"""
+
+
+def diagram_prompt(requirements: Dict[str, Any], overview: str, components: List[Dict[str, str]]) -> str:
+    component_lines = '\n'.join(f"- {c['name']}: {c.get('purpose', '')}" for c in components)
+    return f"""Draw the Mermaid flowchart for this system design.
+
+System Requirements:
+{requirements['description']}
+
+Architecture overview:
+{overview}
+
+Components:
+{component_lines}
+
+Follow these strict Mermaid syntax rules:
+1. Start with 'graph TD'
+2. Use simple node definitions: A[Label] for boxes, A((Label)) for circles, A[(Label)] for databases
+3. Use simple arrows: --> for connections, -->|text| for labeled connections
+4. Avoid special characters in labels
+5. Put every node definition and connection on its own line
+6. Include every component above, plus error handling, monitoring and security paths
+
+Return only this JSON structure:
+{{"diagram": "mermaid flowchart code"}}"""
+
+
+class AnalysisPipeline:
+    """
+    Fan-out alternative to AIProcessor.analyze_process.
+
+    A short skeleton request lists the components, then the per-component
+    details and the diagram are requested concurrently and merged into the
+    same analysis dict that display_analysis expects. Wall-clock time is
+    roughly the skeleton plus the slowest sub-request.
+
+    Every response is checked against its schema before it is used. The
+    fan-out is as wide as the processor's max_concurrency unless
+    max_workers says otherwise.
+
+    A component whose details still fail after DETAIL_RETRIES keeps a
+    placeholder; the result is then marked partial and is not cached.
+    """
+
+    def __init__(self, processor: AIProcessor, max_workers: Optional[int] = None):
+        self.processor = processor
+        self.max_workers = max_workers or processor.config.max_concurrency
+
+    def analyze(self, requirements: Dict[str, Any], bypass_cache: bool = False) -> Dict[str, Any]:
+        config = self.processor.config
+        prompt = skeleton_prompt(requirements)
+        # Keyed on the pipeline's own template so it never collides with single-shot results
+        template = prompt_template_id(skeleton_prompt, requirements)
+        cache_key = ResponseCache.make_key(requirements, config.model, config.temperature, template)
+
+        if not bypass_cache:
+            cached = self.processor.lookup(requirements, cache_key, template)
+            if cached is not None:
+                return cached
+
+        return self.processor.inflight.do(cache_key, lambda: self._run(requirements, prompt, cache_key, template))
+
+    def _request(self, prompt: str, max_tokens: int, validator: Validator) -> Dict[str, Any]:
+        data = self.processor.request_json(prompt, max_tokens=max_tokens)
+        errors = validator.validate(data)
+        if errors:
+            details = '; '.join(str(error) for error in errors[:3])
+            raise ValueError(f"Schema validation failed: {details}")
+        return data
+
+    def _run(self, requirements, prompt, cache_key, template):
+        try:
+            skeleton = self._request(prompt, SKELETON_MAX_TOKENS, SKELETON_VALIDATOR)
+        except Exception as e:
+            raise Exception(f"Analysis error: {str(e)}")
+
+        overview = skeleton['overview']
+        components = skeleton['components']
+        names = [c['name'] for c in components]
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(components) + 1)) as pool:
+            diagram_future = pool.submit(
+                self._request, diagram_prompt(requirements, overview, components), DIAGRAM_MAX_TOKENS,
+                DIAGRAM_VALIDATOR,
+            )
+            prompts = [component_prompt(requirements, overview, component, names) for component in components]
+            outcomes = self._details(pool, prompts, range(len(prompts)), [None] * len(prompts))
+            for _ in range(DETAIL_RETRIES):
+                failed = [i for i, outcome in enumerate(outcomes) if isinstance(outcome, Exception)]
+                if not failed:
+                    break
+                outcomes = self._details(pool, prompts, failed, outcomes)
+
+            merged_components = []
+            partial = False
+            for component, details in zip(components, outcomes):
+                if isinstance(details, Exception):
+                    # One failed sub-request should not sink the whole analysis
+                    partial = True
+                    details = {"data_flow": {"input": "", "process": f"Details unavailable: {details}", "output": ""}}
+                merged_components.append(self._merge_component(component, details))
+
+            try:
+                diagram = diagram_future.result()['diagram']
+            except Exception as e:
+                raise Exception(f"Analysis error: diagram request failed: {str(e)}")
+
+        result = {
+            "overview": overview,
+            "components": merged_components,
+            "flow_steps": skeleton.get('flow_steps', []),
+            "diagram": diagram,
+        }
+        result = self.processor.finish_diagram(requirements, result)
+        if partial:
+            # A placeholder must not be served from the cache on every repeat
+            result['partial'] = True
+        else:
+            self.processor.remember(cache_key, requirements, result, template)
+        return result
+
+    def _details(self, pool, prompts: List[str], indexes, outcomes: List[Any]) -> List[Any]:
+        """Requests the details at indexes concurrently; each outcome is the details or the exception"""
+        futures = {i: pool.submit(self._request, prompts[i], COMPONENT_MAX_TOKENS, DETAILS_VALIDATOR) for i in indexes}
+        outcomes = list(outcomes)
+        for i, future in futures.items():
+            try:
+                outcomes[i] = future.result()
+            except Exception as e:
+                outcomes[i] = e
+        return outcomes
+
+    @staticmethod
+    def _merge_component(component: Dict[str, Any], details: Dict[str, Any]) -> Dict[str, Any]:
+        data_flow = details['data_flow']
+        return {
+            "name": component['name'],
+            "purpose": component.get('purpose', ''),
+            "steps": details.get('steps', []),
+            "technologies": details.get('technologies', []),
+            "data_flow": {
+                "input": data_flow.get('input', ''),
+                "process": data_flow.get('process', ''),
+                "output": data_flow.get('output', ''),
+            },
+        }
@@ -0,0 +1,81 @@
+# utils/rate_limit.py
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Asyncio token bucket refilled continuously at capacity per period.
+
+    Waiters are served in FIFO order; a waiter that cannot be served sleeps
+    until enough capacity has accumulated instead of failing. The level may
+    go negative when usage is reconciled after the fact, which simply delays
+    the next acquisitions.
+    """
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        # Requests larger than the bucket would never fit; cap them at a full bucket
+        amount = min(float(amount), self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._level >= amount:
+                    self._level -= amount
+                    return
+                await asyncio.sleep((amount - self._level) / self.rate)
+
+    def adjust(self, delta: float):
+        """Return (positive) or charge (negative) capacity after the fact"""
+        self._refill()
+        self._level = min(self.capacity, self._level + delta)
+
+    def drain(self, seconds: float):
+        """Empty the bucket so that it only refills after roughly the given delay"""
+        self._refill()
+        self._level = min(self._level, -seconds * self.rate)
+
+    @property
+    def level(self) -> float:
+        self._refill()
+        return self._level
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits applied together"""
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.throttled_seconds = 0.0
+
+    async def acquire(self, estimated_tokens: int):
+        started = time.monotonic()
+        if self.requests:
+            await self.requests.acquire(1)
+        if self.tokens:
+            await self.tokens.acquire(estimated_tokens)
+        self.throttled_seconds += time.monotonic() - started
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Reconcile the up-front estimate with the usage reported by the API"""
+        if self.tokens and actual_tokens is not None:
+            self.tokens.adjust(estimated_tokens - actual_tokens)
+
+    def back_off(self, seconds: float):
+        """Pause every queued request after the provider reported a rate limit"""
+        for bucket in (self.requests, self.tokens):
+            if bucket:
+                bucket.drain(seconds)
@@ -0,0 +1,179 @@
+# utils/schema.py
+import json
+from typing import Any, Callable, Dict, List, Tuple
+
+Path = Tuple[Any, ...]
+
+# Compact schema language: {"type": "object", "properties": {...}, "required": [...]},
+# {"type": "array", "items": {...}, "min_items": n}, {"type": "string"},
+# {"type": ["string", "number"]}
+STEP_SCHEMA = {
+    "type": "object",
+    "required": ["step", "action", "details"],
+    "properties": {
+        "step": {"type": ["string", "number"]},
+        "action": {"type": "string"},
+        "details": {"type": "array", "items": {"type": "string"}},
+    },
+}
+
+TECHNOLOGY_SCHEMA = {
+    "type": "object",
+    "required": ["name", "purpose", "configuration"],
+    "properties": {
+        "name": {"type": "string"},
+        "purpose": {"type": "string"},
+        "configuration": {"type": "string"},
+    },
+}
+
+DATA_FLOW_SCHEMA = {
+    "type": "object",
+    "required": ["input", "process", "output"],
+    "properties": {
+        "input": {"type": "string"},
+        "process": {"type": "string"},
+        "output": {"type": "string"},
+    },
+}
+
+COMPONENT_SCHEMA = {
+    "type": "object",
+    "required": ["name", "purpose", "steps", "technologies", "data_flow"],
+    "properties": {
+        "name": {"type": "string"},
+        "purpose": {"type": "string"},
+        "steps": {"type": "array", "items": STEP_SCHEMA, "min_items": 1},
+        "technologies": {"type": "array", "items": TECHNOLOGY_SCHEMA},
+        "data_flow": DATA_FLOW_SCHEMA,
+    },
+}
+
+FLOW_STEP_SCHEMA = {
+    "type": "object",
+    "required": ["step", "title", "description", "technical_details"],
+    "properties": {
+        "step": {"type": ["string", "number"]},
+        "title": {"type": "string"},
+        "description": {"type": "string"},
+        "technical_details": {"type": "array", "items": {"type": "string"}},
+    },
+}
+
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "required": ["overview", "components", "diagram"],
+    "properties": {
+        "overview": {"type": "string"},
+        "components": {"type": "array", "items": COMPONENT_SCHEMA, "min_items": 1},
+        "flow_steps": {"type": "array", "items": FLOW_STEP_SCHEMA},
+        "diagram": {"type": "string"},
+    },
+}
+
+_PY_TYPES = {
+    "string": (str,),
+    "number": (int, float),
+    "object": (dict,),
+    "array": (list,),
+    "boolean": (bool,),
+}
+
+
+class SchemaError:
+    """A single validation failure at a JSON path"""
+    __slots__ = ("path", "message")
+
+    def __init__(self, path: Path, message: str):
+        self.path = path
+        self.message = message
+
+    def __repr__(self):
+        return f"SchemaError({format_path(self.path)}: {self.message})"
+
+    def __str__(self):
+        return f"{format_path(self.path)}: {self.message}"
+
+
+def format_path(path: Path) -> str:
+    text = '$'
+    for part in path:
+        text += f"[{part}]" if isinstance(part, int) else f".{part}"
+    return text
+
+
+_Check = Callable[[Any, Path, List[SchemaError]], None]
+
+
+def _compile(schema: Dict[str, Any]) -> _Check:
+    names = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+    # bool is an int subclass; never accept it as a number
+    accepted = tuple(t for name in names for t in _PY_TYPES[name])
+    expected = ' or '.join(names)
+
+    def check_type(value, path, errors) -> bool:
+        if isinstance(value, accepted) and not (isinstance(value, bool) and "boolean" not in names):
+            return True
+        errors.append(SchemaError(path, f"expected {expected}, got {type(value).__name__}"))
+        return False
+
+    if "object" in names:
+        required = tuple(schema.get("required", ()))
+        properties = tuple((key, _compile(sub)) for key, sub in schema.get("properties", {}).items())
+
+        def check_object(value, path, errors):
+            if not check_type(value, path, errors):
+                return
+            for key in required:
+                if key not in value:
+                    errors.append(SchemaError(path + (key,), "missing required key"))
+            for key, check in properties:
+                if key in value:
+                    check(value[key], path + (key,), errors)
+        return check_object
+
+    if "array" in names:
+        check_item = _compile(schema["items"]) if "items" in schema else None
+        min_items = schema.get("min_items", 0)
+
+        def check_array(value, path, errors):
+            if not check_type(value, path, errors):
+                return
+            if len(value) < min_items:
+                errors.append(SchemaError(path, f"expected at least {min_items} items, got {len(value)}"))
+            if check_item is not None:
+                for index, item in enumerate(value):
+                    check_item(item, path + (index,), errors)
+        return check_array
+
+    return lambda value, path, errors: check_type(value, path, errors)
+
+
+class Validator:
+    """Schema compiled once into nested closures; validate() collects every error"""
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        self._check = _compile(schema)
+
+    def validate(self, value: Any, path: Path = ()) -> List[SchemaError]:
+        errors: List[SchemaError] = []
+        self._check(value, path, errors)
+        return errors
+
+
+def outline(schema: Dict[str, Any]) -> Any:
+    """Minimal example document for a schema, used to describe the shape in prompts"""
+    names = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+    if "object" in names:
+        return {key: outline(sub) for key, sub in schema.get("properties", {}).items()}
+    if "array" in names:
+        return [outline(schema["items"])] if "items" in schema else []
+    return names[0]
+
+
+def outline_json(schema: Dict[str, Any]) -> str:
+    return json.dumps(outline(schema), separators=(',', ':'))
+
+
+ANALYSIS_VALIDATOR = Validator(ANALYSIS_SCHEMA)
@@ -0,0 +1,77 @@
+# utils/search.py
+import re
+from typing import Any, Dict, List, Optional
+
+from utils.models import Analysis
+
+# Preference keys that can be used as search filters
+FACETS = ("frontend", "database", "cloud_provider", "cache_strategy")
+
+# Searchable fields in index column order, with their BM25 weights;
+# a hit in a component or technology name counts more than one in step prose
+SEARCH_FIELDS = (
+    ("title", 2.0),
+    ("components", 4.0),
+    ("technologies", 4.0),
+    ("details", 1.0),
+    ("diagram", 2.0),
+    # Facet tokens; zero weight, they only narrow the match set so BM25 is
+    # computed for fewer rows
+    ("facets", 0.0),
+)
+
+# Node label inside any of the flowchart shapes: A[..], A((..)), A[(..)], A(..), A{..}
+_NODE_LABEL = re.compile(r'\w+\s*(?:\[\(|\(\(|\[|\(|\{)\s*"?([^\[\](){}"|]+?)"?\s*(?:\)\]|\)\)|\]|\)|\})')
+_QUERY_TERM = re.compile(r'\w+', re.UNICODE)
+_NON_ALNUM = re.compile(r'[^0-9a-z]')
+_TEXT_COLUMNS = '{' + ' '.join(name for name, weight in SEARCH_FIELDS if weight) + '}'
+
+
+def facet_token(facet: str, value: str) -> str:
+    """Single index token for a facet value, e.g. cloud_provider/Google Cloud -> cloudprovidergooglecloud"""
+    return _NON_ALNUM.sub('', f"{facet}{value}".lower())
+
+
+def diagram_labels(diagram: str) -> List[str]:
+    return [label.strip() for label in _NODE_LABEL.findall(diagram or '') if label.strip()]
+
+
+def search_document(title: str, analysis: Analysis, preferences: Dict[str, Any]) -> Dict[str, str]:
+    """Flattens an analysis into the text of each searchable field"""
+    components = []
+    technologies = []
+    details = []
+    for component in analysis.components:
+        components.append(component.name)
+        for tech in component.technologies:
+            technologies.append(tech.name)
+            details.append(tech.purpose)
+        for step in component.steps:
+            details.append(step.action)
+            details.extend(step.details)
+    return {
+        "title": title,
+        "components": '\n'.join(components),
+        "technologies": '\n'.join(technologies),
+        "details": '\n'.join(details),
+        "diagram": '\n'.join(diagram_labels(analysis.diagram)),
+        "facets": ' '.join(facet_token(facet, preferences[facet]) for facet in FACETS if preferences.get(facet)),
+    }
+
+
+def build_match_query(text: str, facets: Optional[Dict[str, str]] = None) -> Optional[str]:
+    """
+    User query to an FTS5 MATCH expression: every word must appear (in any
+    field). Words are quoted so FTS5 operators in user input are treated as
+    plain text; the last word also matches as a prefix while typing. Facet
+    values become required tokens in the facets column.
+    """
+    terms = _QUERY_TERM.findall(text or '')
+    if not terms:
+        return None
+    quoted = [f'{_TEXT_COLUMNS}: "{term}"' for term in terms]
+    quoted[-1] += '*'
+    for facet, value in (facets or {}).items():
+        if value:
+            quoted.append(f'facets:"{facet_token(facet, value)}"')
+    return ' AND '.join(quoted)
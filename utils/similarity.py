@@ -0,0 +1,144 @@
+# utils/similarity.py
+import hashlib
+import random
+import re
+import struct
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+# Mersenne prime for the (a * x + b) mod p permutation family
+_PRIME = (1 << 61) - 1
+_NON_WORD = re.compile(r'[^\w]+', re.UNICODE)
+
+Signature = Tuple[int, ...]
+
+
+def normalize_description(text: str) -> str:
+    """Lowercase, punctuation dropped, whitespace collapsed"""
+    return ' '.join(_NON_WORD.sub(' ', (text or '').lower()).split())
+
+
+def shingles(text: str, size: int = 5) -> Set[str]:
+    """
+    Overlapping character n-grams of the normalized text. Character shingles
+    keep small rewordings (a changed word, a plural, a typo) from changing
+    more than a handful of the set.
+    """
+    text = normalize_description(text)
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class MinHasher:
+    """MinHash signatures whose slot-wise agreement estimates Jaccard similarity"""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+    def signature(self, text: str) -> Signature:
+        hashes = [
+            int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+            for shingle in shingles(text, self.shingle_size)
+        ]
+        if not hashes:
+            return (_PRIME,) * self.num_perm
+        return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self._perms)
+
+    @staticmethod
+    def similarity(first: Signature, second: Signature) -> float:
+        return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+    @staticmethod
+    def to_bytes(signature: Signature) -> bytes:
+        return struct.pack(f'<{len(signature)}Q', *signature)
+
+    @staticmethod
+    def from_bytes(data: bytes) -> Signature:
+        return struct.unpack(f'<{len(data) // 8}Q', data)
+
+
+def lsh_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Bands and rows per band for a signature length, chosen so the LSH
+    candidate probability 1 - (1 - s^r)^b switches from low to high around the
+    threshold (equal weight on false positives and false negatives)
+    """
+    def area(probability, low, high, steps=100):
+        width = (high - low) / steps
+        return sum(probability(low + (i + 0.5) * width) for i in range(steps)) * width
+
+    best, best_error = (num_perm, 1), float('inf')
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        if rows == 0:
+            break
+        candidate = lambda s: 1 - (1 - s ** rows) ** bands
+        error = area(candidate, 0.0, threshold) + area(lambda s: 1 - candidate(s), threshold, 1.0)
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class NearDuplicateIndex:
+    """
+    In-memory LSH index of request signatures. Requests are only compared
+    within the same scope (preferences, model and prompt template), and LSH candidates are
+    confirmed with the estimated Jaccard similarity before being returned.
+    """
+
+    def __init__(self, threshold: float = 0.7, num_perm: int = 128):
+        self.threshold = threshold
+        self.bands, self.rows = lsh_bands(num_perm, threshold)
+        self._buckets: Dict[tuple, Set[str]] = {}
+        self._signatures: Dict[str, Tuple[str, Signature]] = {}
+        self._lock = threading.Lock()
+
+    def _band_keys(self, scope: str, signature: Signature) -> List[tuple]:
+        return [
+            (scope, band, hash(signature[band * self.rows:(band + 1) * self.rows]))
+            for band in range(self.bands)
+        ]
+
+    def add(self, key: str, scope: str, signature: Signature):
+        with self._lock:
+            self._remove(key)
+            self._signatures[key] = (scope, signature)
+            for band_key in self._band_keys(scope, signature):
+                self._buckets.setdefault(band_key, set()).add(key)
+
+    def remove(self, key: str):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key: str):
+        entry = self._signatures.pop(key, None)
+        if entry is None:
+            return
+        for band_key in self._band_keys(*entry):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def query(self, scope: str, signature: Signature, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Keys at or above the threshold, most similar first"""
+        with self._lock:
+            candidates = set()
+            for band_key in self._band_keys(scope, signature):
+                candidates |= self._buckets.get(band_key, set())
+            candidates.discard(exclude)
+            matches = []
+            for key in candidates:
+                similarity = MinHasher.similarity(signature, self._signatures[key][1])
+                if similarity >= self.threshold:
+                    matches.append((key, similarity))
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches
+
+    def __len__(self) -> int:
+        return len(self._signatures)
@@ -0,0 +1,142 @@
+# utils/stream_parser.py
+import json
+from bisect import bisect_right
+from typing import Any, List, Optional, Tuple
+
+# Top-level keys whose values are emitted as soon as they close
+SCALAR_KEYS = ('overview', 'diagram')
+ITEM_KEYS = {'components': 'component'}
+
+
+class IncrementalAnalysisParser:
+    """
+    Incremental scanner for the analysis JSON produced by a streamed completion.
+
+    Chunks are fed in as they arrive; every character is inspected exactly once.
+    As soon as a value of interest closes, an event is returned:
+      ('overview', str), ('component', dict) for each entry of components,
+      ('diagram', str)
+    Anything before the first '{' (prose, markdown fences) is ignored, and
+    backtick-quoted values are treated as strings so braces inside a
+    Mermaid diagram do not confuse the nesting depth.
+
+    Chunks are kept as a list rather than appended to one string, which would
+    copy the whole buffer on every chunk; an emitted value is sliced from the
+    chunks it spans, and text joins them only when asked for.
+    """
+
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._offsets: List[int] = []  # position of each chunk's first character
+        self._size = 0
+        self._depth = 0
+        self._started = False
+        self._quote: Optional[str] = None  # '"' or '`' while inside a string
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+        self._item_start: Optional[int] = None
+        self.finished = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        events = []
+        if not chunk or self.finished:
+            return events
+
+        base = self._size
+        self._chunks.append(chunk)
+        self._offsets.append(base)
+        self._size += len(chunk)
+        for i, ch in enumerate(chunk, base):
+            if not self._started:
+                if ch == '{':
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._quote:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\' and self._quote == '"':
+                    self._escape = True
+                elif ch == self._quote:
+                    self._quote = None
+                    self._on_string_closed(i, events)
+                continue
+
+            if ch == '"' or (ch == '`' and self._depth == 1 and self._value_start is not None):
+                self._quote = ch
+                self._string_start = i
+                if self._depth == 1 and self._value_start is not None and self._key:
+                    self._value_start = i
+            elif ch in '{[':
+                self._depth += 1
+                if self._depth == 3 and self._key in ITEM_KEYS and ch == '{':
+                    self._item_start = i
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 2 and self._item_start is not None and ch == '}':
+                    self._emit(ITEM_KEYS[self._key], self._slice(self._item_start, i + 1), events)
+                    self._item_start = None
+                elif self._depth == 1:
+                    # A nested container at the top level just closed
+                    self._value_start = None
+                elif self._depth == 0:
+                    self.finished = True
+                    break
+            elif self._depth == 1:
+                if ch == ':':
+                    self._key = self._last_string
+                    self._value_start = i + 1
+                elif ch == ',':
+                    self._key = None
+                    self._value_start = None
+
+        return events
+
+    def _on_string_closed(self, end: int, events: List[Tuple[str, Any]]):
+        if self._depth != 1:
+            return
+        raw = self._slice(self._string_start, end + 1)
+        if self._value_start is None:
+            # A string in key position
+            self._last_string = self._decode(raw)
+            return
+        if self._key in SCALAR_KEYS:
+            self._emit(self._key, raw, events)
+        self._value_start = None
+
+    @staticmethod
+    def _decode(raw: str) -> Any:
+        if raw.startswith('`'):
+            return raw[1:-1]
+        return json.loads(raw, strict=False)
+
+    def _emit(self, kind: str, raw: str, events: List[Tuple[str, Any]]):
+        try:
+            events.append((kind, self._decode(raw)))
+        except json.JSONDecodeError:
+            # Malformed fragments are left for the final full parse to repair
+            pass
+
+    def _slice(self, start: int, end: int) -> str:
+        """Characters start:end of everything fed so far, joining only the chunks they span"""
+        first = bisect_right(self._offsets, start) - 1
+        last = bisect_right(self._offsets, end - 1) - 1
+        if first == last:
+            base = self._offsets[first]
+            return self._chunks[first][start - base:end - base]
+        pieces = [self._chunks[first][start - self._offsets[first]:]]
+        pieces.extend(self._chunks[first + 1:last])
+        pieces.append(self._chunks[last][:end - self._offsets[last]])
+        return ''.join(pieces)
+
+    @property
+    def text(self) -> str:
+        if len(self._chunks) > 1:
+            # Kept joined, so asking again without new chunks costs nothing
+            self._chunks = [''.join(self._chunks)]
+            self._offsets = [0]
+        return self._chunks[0] if self._chunks else ''